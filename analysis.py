@@ -0,0 +1,397 @@
+import calendar
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from liquidity import ADV_WINDOWS, liquidity_metrics, tail_metrics
+from sessions import day_numbers as sessions_days, session_calendar
+
+# Colors from the reference image, then extras for additional periods
+PERIOD_COLORS = ['#000000', '#40B4A6', '#E4572E', '#4C6EF5', '#F2A541', '#7B2CBF']
+
+Period = namedtuple('Period', ['name', 'start', 'end', 'color'])
+
+MONTHLY_COLUMNS = ['Year', 'Month', 'Volume', 'Close', 'DollarVolume']
+
+SUMMARY_COLUMNS = ['Period', 'Date Range', 'Total Volume', 'Average Price', 'Total Dollar Volume',
+                   'VWAP'] + [f'ADV {window}' for window in ADV_WINDOWS] + ['Max Dollar Volume Z']
+
+
+def period_name(number, start, end):
+    return f'Period {number} ({start.strftime("%Y-%m-%d")} to {end.strftime("%Y-%m-%d")})'
+
+
+class PrefixSumIndex:
+    """
+    Cumulative sums of Volume, DollarVolume and Close over a sorted daily index.
+
+    PeriodAnalysis builds one over a symbol's bars and answers its period summaries,
+    monthly breakdowns and sweep windows from it: totals and mean price for any inclusive
+    date range are two searchsorted lookups and a subtraction, and whole arrays of ranges
+    are answered in one vectorized call. Live refresh appends new bars with extend(). NaN
+    marks a missing value. Sums are accumulated in extended precision so decades of dollar
+    volume still subtract to the cent.
+    """
+
+    def __init__(self, index, close, volume, dollar_volume):
+        self.index = index
+        zero = np.zeros((1,) + np.shape(close)[1:], dtype=np.longdouble)
+        self._sums = {
+            name: self._continue(zero, values)
+            for name, values in (('Close', close), ('Volume', volume), ('DollarVolume', dollar_volume))
+        }
+        # Days with a price, so means ignore missing bars
+        self._days = self._continue(zero, ~np.isnan(np.asarray(close, dtype='float64')))
+
+    @staticmethod
+    def _continue(sums, values):
+        """
+        Prefix sums `sums` followed by the running sums of values on top of their last row
+        """
+        values = np.asarray(values, dtype='float64')
+        values = np.cumsum(np.where(np.isnan(values), 0.0, values), axis=0, dtype=sums.dtype)
+        return np.concatenate((sums, sums[-1] + values))
+
+    def extend(self, index, close, volume, dollar_volume, replace=0):
+        """
+        Drop the last `replace` rows and append new ones, continuing the sums rather than redoing them
+        """
+        keep = len(self.index) - replace
+        self.index = self.index[:keep].append(index)
+        for name, values in (('Close', close), ('Volume', volume), ('DollarVolume', dollar_volume)):
+            self._sums[name] = self._continue(self._sums[name][:keep + 1], values)
+        self._days = self._continue(self._days[:keep + 1], ~np.isnan(np.asarray(close, dtype='float64')))
+
+    def positions(self, starts, ends):
+        """
+        Row positions [lo, hi) of the inclusive ranges starts[i]..ends[i]
+        """
+        lo = self.index.searchsorted(pd.DatetimeIndex(np.atleast_1d(starts)), side='left')
+        hi = self.index.searchsorted(pd.DatetimeIndex(np.atleast_1d(ends)), side='right')
+        return lo, np.maximum(hi, lo)
+
+    def totals(self, starts, ends):
+        """
+        Days, Volume, DollarVolume and AveragePrice arrays with one leading entry per range
+        """
+        lo, hi = self.positions(starts, ends)
+
+        def total(sums):
+            return (sums[hi] - sums[lo]).astype('float64')
+
+        days = total(self._days)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            average_price = np.where(days > 0, total(self._sums['Close']) / days, np.nan)
+        return {
+            'Days': days.astype('int64'),
+            'Volume': total(self._sums['Volume']),
+            'DollarVolume': total(self._sums['DollarVolume']),
+            'AveragePrice': average_price,
+        }
+
+    def range_stats(self, starts, ends):
+        """
+        Days, total Volume, total DollarVolume and Average Price for each range of a 1-D index
+        """
+        return pd.DataFrame({
+            'Start': pd.DatetimeIndex(np.atleast_1d(starts)),
+            'End': pd.DatetimeIndex(np.atleast_1d(ends)),
+            **self.totals(starts, ends),
+        })
+
+
+def calendar_windows(start, end, freq='quarter'):
+    """
+    Consecutive calendar month, quarter or year windows (inclusive start, end) covering start..end
+    """
+    offsets = {'month': 'MS', 'quarter': 'QS', 'year': 'YS'}
+    if freq not in offsets:
+        raise ValueError(f"Unknown window frequency '{freq}' (choose from {', '.join(offsets)})")
+    offset = pd.tseries.frequencies.to_offset(offsets[freq])
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    starts = pd.date_range(offset.rollback(start), end, freq=offset)
+    ends = starts + offset - pd.Timedelta(days=1)
+    return starts, ends
+
+
+def pairwise_change(values, labels):
+    """
+    Percentage change of every window (rows) against every other window (columns)
+    """
+    values = np.asarray(values, dtype='float64')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = (values[:, None] / values[None, :] - 1.0) * 100.0
+    return pd.DataFrame(change, index=labels, columns=labels)
+
+
+class PeriodAnalysis:
+    """
+    Dollar volume, period slices and per-period daily/monthly aggregates for one symbol.
+
+    Built once per symbol and read by every report builder. Periods are (start, end) pairs,
+    both inclusive; they are located with searchsorted on the sorted index rather than
+    boolean masks over the whole history, and each aggregate is computed on first use.
+    A DollarVolume column in df (daily bars rolled up from intraday ones) is used as is
+    instead of Close x Volume. Rolling liquidity metrics run over the whole of df, so the first bars of the earliest period
+    have no ADV or z-score until their windows fill. Periods are aligned by trading
+    session (see sessions.py), so bar k of every period is its k-th trading day.
+    """
+
+    def __init__(self, df, symbol, periods):
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        self.symbol = symbol
+        close = df['Close'].to_numpy(dtype='float64')
+        volume = df['Volume'].to_numpy(dtype='float64')
+        if 'DollarVolume' in df:
+            dollar_volume = df['DollarVolume'].to_numpy(dtype='float64')
+        else:
+            dollar_volume = close * volume
+        self.frame = pd.DataFrame({
+            'Close': close,
+            'Volume': volume,
+            'DollarVolume': dollar_volume,
+        }, index=df.index)
+        self.prefix = PrefixSumIndex(df.index, close, volume, dollar_volume)
+        self.periods = []
+        for i, (start, end) in enumerate(periods):
+            start, end = pd.Timestamp(start), pd.Timestamp(end)
+            self.periods.append(Period(period_name(i + 1, start, end), start, end, PERIOD_COLORS[i % len(PERIOD_COLORS)]))
+        self._cache = {}
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def bounds(self, i):
+        """
+        Row positions [lo, hi) of period i
+        """
+        period = self.periods[i]
+        lo, hi = self.prefix.positions(period.start, period.end)
+        return int(lo[0]), int(hi[0])
+
+    def daily(self, i):
+        """
+        Daily Close, Volume and DollarVolume rows of period i
+        """
+        def compute():
+            lo, hi = self.bounds(i)
+            return self.frame.iloc[lo:hi]
+        return self._cached(('daily', i), compute)
+
+    def calendar(self):
+        """
+        Session calendar covering the bars and every period
+        """
+        def compute():
+            return session_calendar(self.frame.index, min(p.start for p in self.periods), max(p.end for p in self.periods))
+        return self._cached('calendar', compute)
+
+    def sessions(self, i):
+        """
+        Trading days since the start of period i for each of its daily rows
+        """
+        def compute():
+            return self.calendar().offsets(self.daily(i).index, self.periods[i].start)
+        return self._cached(('sessions', i), compute)
+
+    def month_ticks(self, i):
+        """
+        Tick positions (trading days since the start) and month names for period i's x-axis
+        """
+        period = self.periods[i]
+        return self.calendar().month_ticks(period.start, period.end)
+
+    def aligned(self, column='DollarVolume'):
+        """
+        `column` of every period side by side by trading day, one row per session since the
+        period starts and NaN where a period has no bar, plus each later period's difference
+        from period 1 and the date of every row
+        """
+        def compute():
+            length = 1 + max((int(self.sessions(i)[-1]) for i in range(len(self.periods)) if len(self.sessions(i))), default=-1)
+            values = np.full((length, len(self.periods)), np.nan)
+            dates = np.full((length, len(self.periods)), np.datetime64('NaT'), dtype='datetime64[ns]')
+            for i in range(len(self.periods)):
+                values[self.sessions(i), i] = self.daily(i)[column].to_numpy()
+                dates[self.sessions(i), i] = self.daily(i).index.to_numpy(dtype='datetime64[ns]')
+            aligned = pd.DataFrame(index=pd.RangeIndex(length, name='Session'))
+            for i in range(len(self.periods)):
+                aligned[f'Period {i + 1} Date'] = dates[:, i]
+                aligned[f'Period {i + 1} {column}'] = values[:, i]
+            for i in range(1, len(self.periods)):
+                aligned[f'Period {i + 1} - Period 1 {column}'] = values[:, i] - values[:, 0]
+            return aligned
+        return self._cached(('aligned', column), compute)
+
+    def liquidity(self):
+        """
+        Rolling ADV, approximate VWAP and dollar-volume z-score for every bar (see liquidity.py)
+        """
+        def compute():
+            metrics = liquidity_metrics(self.frame['Volume'].to_numpy(), self.frame['DollarVolume'].to_numpy())
+            return pd.DataFrame(metrics, index=self.frame.index)
+        return self._cached('liquidity', compute)
+
+    def liquidity_daily(self, i):
+        """
+        Liquidity metric rows of period i, aligned with daily(i)
+        """
+        lo, hi = self.bounds(i)
+        return self.liquidity().iloc[lo:hi]
+
+    def monthly(self, i):
+        """
+        Per-month Volume sum, Close mean and DollarVolume sum of period i
+        """
+        def compute():
+            period = self.periods[i]
+            return self._month_rows(period, *calendar_windows(period.start, period.end, 'month'))
+        return self._cached(('monthly', i), compute)
+
+    def _month_rows(self, period, starts, ends):
+        """
+        Monthly rows of period for the calendar months starts[i]..ends[i], leaving out months without bars
+        """
+        # The first and last months are cut to the period
+        starts = starts.where(starts >= period.start, period.start)
+        ends = ends.where(ends <= period.end, period.end)
+        totals = self.prefix.totals(starts, ends)
+        keep = totals['Days'] > 0
+        return pd.DataFrame({
+            'Year': starts.year.to_numpy(dtype='int64')[keep],
+            'Month': starts.month.to_numpy(dtype='int64')[keep],
+            'Volume': totals['Volume'][keep],
+            'Close': totals['AveragePrice'][keep],
+            'DollarVolume': totals['DollarVolume'][keep],
+        }, columns=MONTHLY_COLUMNS)
+
+    def summary(self, i):
+        """
+        Total volume, average price and total dollar volume of period i, its VWAP, the ADVs
+        at its last bar and its largest dollar-volume z-score, or None if it has no rows
+        """
+        def compute():
+            period = self.periods[i]
+            stats = self.prefix.range_stats(period.start, period.end).iloc[0]
+            if stats['Days'] == 0:
+                return None
+            liquidity = self.liquidity_daily(i)
+            zscores = liquidity['DollarVolumeZ'].dropna()
+            return {
+                'Period': period.name,
+                'Date Range': f"{period.start.strftime('%Y-%m-%d')} to {period.end.strftime('%Y-%m-%d')}",
+                'Total Volume': stats['Volume'],
+                'Average Price': stats['AveragePrice'],
+                'Total Dollar Volume': stats['DollarVolume'],
+                'VWAP': stats['DollarVolume'] / stats['Volume'] if stats['Volume'] > 0 else np.nan,
+                **{f'ADV {window}': liquidity[f'ADV{window}'].iloc[-1] for window in ADV_WINDOWS},
+                'Max Dollar Volume Z': zscores.max() if len(zscores) else np.nan,
+            }
+        return self._cached(('summary', i), compute)
+
+    def window_sweep(self, start, end, freq='quarter'):
+        """
+        Stats for every calendar window in start..end, answered from the prefix-sum index
+        """
+        starts, ends = calendar_windows(start, end, freq)
+        totals = self.prefix.totals(starts, ends)
+        return pd.DataFrame({'Start': starts, 'End': ends, **totals})
+
+    def extend(self, bars):
+        """
+        Fold in bars from the last one held onward (a revised last bar replaces it) without recomputing.
+
+        The prefix sums are continued from their last row, so period totals stay two lookups;
+        only the calendar months the new bars fall in are re-aggregated, and the liquidity
+        metrics are computed for the new bars alone from the bars their windows reach. Period
+        summaries, a few lookups each, are redone on next use. Returns {period index:
+        (replaced, added)} for each period whose daily rows changed: how many of its last
+        rows were replaced and how many were appended.
+        """
+        if bars is None or bars.empty:
+            return {}
+        if not bars.index.is_monotonic_increasing:
+            bars = bars.sort_index()
+        held = self.frame.index
+        if len(held):
+            bars = bars[bars.index >= held[-1]]
+        if bars.empty:
+            return {}
+        replace = int(len(held) > 0 and bars.index[0] == held[-1])
+        keep = len(held) - replace
+        close = bars['Close'].to_numpy(dtype='float64')
+        volume = bars['Volume'].to_numpy(dtype='float64')
+        dollar_volume = bars['DollarVolume'].to_numpy(dtype='float64') if 'DollarVolume' in bars else close * volume
+        self.frame = pd.concat([self.frame.iloc[:keep], pd.DataFrame({
+            'Close': close,
+            'Volume': volume,
+            'DollarVolume': dollar_volume,
+        }, index=bars.index)])
+        self.prefix.extend(bars.index, close, volume, dollar_volume, replace)
+
+        if 'liquidity' in self._cache:
+            metrics = tail_metrics(self.frame['Volume'].to_numpy(), self.frame['DollarVolume'].to_numpy(), len(bars))
+            self._cache['liquidity'] = pd.concat([self._cache['liquidity'].iloc[:keep], pd.DataFrame(metrics, index=bars.index)])
+        if 'calendar' in self._cache and not self._cache['calendar'].covers(sessions_days(bars.index)):
+            # Rebuilt to count the new days; held bars keep their offsets, as every new day comes after them
+            del self._cache['calendar']
+
+        changes = {}
+        for i, period in enumerate(self.periods):
+            inside = (bars.index >= period.start) & (bars.index <= period.end)
+            if not inside.any():
+                continue
+            replaced = int(replace and inside[0])
+            changes[i] = (replaced, int(inside.sum()) - replaced)
+            self._cache.pop(('daily', i), None)
+            self._cache.pop(('summary', i), None)
+            if ('sessions', i) in self._cache:
+                sessions = self._cache[('sessions', i)]
+                new = self.calendar().offsets(bars.index[inside], period.start)
+                self._cache[('sessions', i)] = np.concatenate((sessions[:len(sessions) - replaced], new))
+            if ('monthly', i) in self._cache:
+                months = self._month_rows(period, *calendar_windows(bars.index[inside][0], bars.index[inside][-1], 'month'))
+                monthly = self._cache[('monthly', i)]
+                same = monthly.set_index(['Year', 'Month']).index.isin(months.set_index(['Year', 'Month']).index)
+                self._cache[('monthly', i)] = pd.concat([monthly[~same], months], ignore_index=True).sort_values(['Year', 'Month'], ignore_index=True)
+        for key in ('monthly_summary', ('aligned', 'DollarVolume')):
+            self._cache.pop(key, None)
+        return changes
+
+    def precompute(self):
+        """
+        Compute every aggregate the reports read, so building them afterwards only renders
+        """
+        for i in range(len(self.periods)):
+            self.sessions(i)
+        self.period_summary()
+        self.monthly_summary()
+        return self
+
+    def period_summary(self):
+        """
+        One summary row per period that has data
+        """
+        rows = [self.summary(i) for i in range(len(self.periods))]
+        return pd.DataFrame([row for row in rows if row is not None], columns=SUMMARY_COLUMNS)
+
+    def monthly_summary(self):
+        """
+        Monthly breakdown of every period, with Period and month-name columns
+        """
+        def compute():
+            frames = []
+            for i, period in enumerate(self.periods):
+                monthly = self.monthly(i)
+                if not monthly.empty:
+                    frames.append(monthly.assign(Period=period.name))
+            if not frames:
+                return pd.DataFrame(columns=['Period', 'MonthName'] + MONTHLY_COLUMNS)
+            monthly = pd.concat(frames, ignore_index=True)
+            monthly['MonthName'] = np.array(calendar.month_name)[monthly['Month'].to_numpy(dtype='int64')]
+            return monthly[['Period', 'MonthName'] + MONTHLY_COLUMNS]
+        return self._cached('monthly_summary', compute)
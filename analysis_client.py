@@ -0,0 +1,116 @@
+import argparse
+import http.client
+import json
+import os
+import socket
+import sys
+from urllib.parse import urlsplit
+
+# Standard library only: the client's start-up time is the query's latency floor
+
+DEFAULT_URL = 'http://127.0.0.1:8765'
+
+COLUMN_FORMATS = {
+    'Volume': ('Total Volume', '{:,.0f}'),
+    'AveragePrice': ('Average Price', '${:.2f}'),
+    'DollarVolume': ('Total Dollar Volume', '${:,.2f}'),
+    'VWAP': ('VWAP', '${:.2f}'),
+    'ADV20': ('ADV 20', '${:,.2f}'),
+    'ADV60': ('ADV 60', '${:,.2f}'),
+    'MaxDollarVolumeZ': ('Max Dollar Volume Z', '{:+.2f}'),
+}
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    HTTPConnection over a Unix socket
+    """
+
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def request(method, path, body=None, url=DEFAULT_URL, socket_path=None, timeout=120):
+    """
+    Send one request to the analysis server; returns (status, decoded JSON)
+    """
+    if socket_path:
+        connection = UnixHTTPConnection(socket_path, timeout=timeout)
+    else:
+        parts = urlsplit(url)
+        connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    try:
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload is not None else {}
+        connection.request(method, path, body=payload, headers=headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(row[i])) for row in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(str(v).rjust(w) for v, w in zip(row, widths)))
+
+
+def print_summary(result):
+    """
+    Print a summary response the way the trading summary tables show it
+    """
+    def table(rows, keys):
+        columns = [name for name in COLUMN_FORMATS if rows and name in rows[0]]
+        headers = keys + [COLUMN_FORMATS[name][0] for name in columns]
+        print_table(headers, [
+            [row[key] for key in keys] + ['' if row[name] is None else COLUMN_FORMATS[name][1].format(row[name]) for name in columns]
+            for row in rows
+        ])
+
+    print(f"{result['symbol']} Trading Summary\n")
+    table(result['periods'], ['Period'])
+    if 'monthly' in result:
+        print('\nMonthly Breakdown\n')
+        table(result['monthly'], ['Period', 'Year', 'Month'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query a running analysis_server.py for period summaries')
+    parser.add_argument('symbol', nargs='?', help='Stock symbol (e.g., AAPL)')
+    parser.add_argument('--period', dest='periods', action='append', default=[], metavar='START:END',
+                        help='Period to compare (YYYY-MM-DD:YYYY-MM-DD, both inclusive); repeat for as many periods as needed')
+    parser.add_argument('--metric', choices=['all', 'volume', 'price', 'dollar_volume', 'liquidity'], default='all', help='Figures to return (default: all)')
+    parser.add_argument('--monthly', action='store_true', help='Include the monthly breakdown')
+    parser.add_argument('--json', action='store_true', help='Print the raw JSON response')
+    parser.add_argument('--stats', action='store_true', help="Print the server's cache statistics instead")
+    parser.add_argument('--url', default=os.environ.get('DOLLARSTOCK_SERVER_URL', DEFAULT_URL), help=f'Server URL (default: $DOLLARSTOCK_SERVER_URL or {DEFAULT_URL})')
+    parser.add_argument('--socket', default=os.environ.get('DOLLARSTOCK_SERVER_SOCKET'), help='Unix socket of the server, instead of --url')
+    args = parser.parse_args()
+
+    if args.stats:
+        query = ('GET', '/stats', None)
+    elif not args.symbol or not args.periods:
+        parser.error('give a symbol and at least one --period (or --stats)')
+    else:
+        query = ('POST', '/summary', {'symbol': args.symbol, 'periods': args.periods, 'metric': args.metric, 'monthly': args.monthly})
+    try:
+        status, result = request(*query, url=args.url, socket_path=args.socket)
+    except OSError as e:
+        sys.exit(f"Cannot reach the analysis server at {args.socket or args.url}: {e}")
+    if status != 200:
+        sys.exit(f"Error: {result.get('error', status)}")
+    if args.json or args.stats:
+        print(json.dumps(result, indent=2))
+    else:
+        print_summary(result)
+
+
+if __name__ == '__main__':
+    main()
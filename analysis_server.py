@@ -0,0 +1,292 @@
+import argparse
+import json
+import math
+import os
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from analysis import PeriodAnalysis
+from bar_store import BarStore, default_store_path
+from batch import TokenBucket, make_session, rate_limited
+from options import PROVIDER_NAMES
+from providers import get_provider, period_range
+from range_cache import DEFAULT_MAX_BYTES, DEFAULT_TODAY_TTL, RangeCache
+from summary_tables import summary_frames
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Query metric -> summary columns; 'all' returns every one. The liquidity columns are
+# per period only; monthly rows leave them out
+METRIC_COLUMNS = {
+    'volume': ['Volume'],
+    'price': ['AveragePrice'],
+    'dollar_volume': ['DollarVolume'],
+    'liquidity': ['VWAP', 'ADV20', 'ADV60', 'MaxDollarVolumeZ'],
+}
+
+# Computed summaries kept for repeated queries
+DEFAULT_MAX_RESULTS = 1024
+
+
+def parse_periods(periods):
+    """
+    [start, end] pairs or START:END strings of YYYY-MM-DD dates, both inclusive, as datetimes
+    """
+    if not periods or not isinstance(periods, list):
+        raise ValueError('give at least one period')
+    parsed = []
+    for period in periods:
+        if isinstance(period, str):
+            period = period.split(':')
+        try:
+            start, end = (datetime.strptime(part, '%Y-%m-%d') for part in period)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid period {period!r}, expected [YYYY-MM-DD, YYYY-MM-DD]")
+        if end < start:
+            raise ValueError(f"period {period!r} ends before it starts")
+        parsed.append((start, end))
+    return parsed
+
+
+def json_records(df):
+    """
+    Rows of a summary frame as JSON-safe dicts: dates as YYYY-MM-DD, NaN as null
+    """
+    records = []
+    for row in df.to_dict('records'):
+        for name, value in row.items():
+            if hasattr(value, 'strftime'):
+                row[name] = value.strftime('%Y-%m-%d')
+            elif isinstance(value, float) and not math.isfinite(value):
+                row[name] = None
+            elif hasattr(value, 'item'):
+                row[name] = value.item()
+        records.append(row)
+    return records
+
+
+class AnalysisService:
+    """
+    Bars and computed period summaries held in memory across queries.
+
+    Bars come through a RangeCache, so a symbol is downloaded once and later queries only
+    fetch the edges they add. Summaries are the same figures generate_summary_table and
+    --summary-format write, and are kept per (symbol, periods) until the bars behind them
+    change (today's bar is refreshed after the cache's today TTL). Thread-safe; one
+    instance serves every request.
+    """
+
+    def __init__(self, fetch, max_bytes=DEFAULT_MAX_BYTES, today_ttl=DEFAULT_TODAY_TTL, max_results=DEFAULT_MAX_RESULTS):
+        self.bars = RangeCache(fetch, today_ttl=today_ttl, max_bytes=max_bytes)
+        self.max_results = max_results
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'queries': 0, 'result_hits': 0}
+
+    def summary(self, symbol, periods, metric='all', monthly=False):
+        """
+        Period summary (and optionally the monthly breakdown) of symbol over periods
+        """
+        if not symbol or not isinstance(symbol, str):
+            raise ValueError('give a symbol')
+        if metric != 'all' and metric not in METRIC_COLUMNS:
+            raise ValueError(f"unknown metric '{metric}' (choose from all, {', '.join(METRIC_COLUMNS)})")
+        symbol = symbol.upper()
+        periods = parse_periods(periods)
+        started = time.perf_counter()
+
+        # Same fetch range as the command line and the Streamlit app
+        df = self.bars.get(symbol, *period_range(periods))
+        if df is None or df.empty:
+            raise LookupError(f'no data available for {symbol} in the requested periods')
+        # The last bar stands in for the whole range: only today's bar is ever refetched
+        version = (len(df), int(df.index.asi8[0]), int(df.index.asi8[-1]), float(df['Close'].iloc[-1]), float(df['Volume'].iloc[-1]))
+        key = (symbol, tuple(periods))
+        with self._lock:
+            self._counters['queries'] += 1
+            cached = self._results.get(key)
+            if cached is not None and cached[0] == version:
+                self._results.move_to_end(key)
+                self._counters['result_hits'] += 1
+        if cached is None or cached[0] != version:
+            period_rows, monthly_rows = summary_frames(PeriodAnalysis(df, symbol, periods))
+            cached = (version, json_records(period_rows), json_records(monthly_rows))
+            with self._lock:
+                self._results[key] = cached
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_results:
+                    self._results.popitem(last=False)
+
+        columns = [name for names in METRIC_COLUMNS.values() for name in names] if metric == 'all' else METRIC_COLUMNS[metric]
+
+        def select(rows, keys):
+            return [{name: row[name] for name in keys + columns if name in row} for row in rows]
+
+        result = {
+            'symbol': symbol,
+            'metric': metric,
+            'periods': select(cached[1], ['Period', 'Start', 'End']),
+        }
+        if monthly:
+            result['monthly'] = select(cached[2], ['Period', 'Year', 'Month'])
+        result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters, results=len(self._results))
+        return {'bars': self.bars.stats(), 'summaries': counters}
+
+
+class AnalysisHandler(BaseHTTPRequestHandler):
+    """
+    JSON API: GET /health, GET /stats, and GET or POST /summary.
+
+    POST /summary takes {"symbol": ..., "periods": [[start, end] or "start:end", ...], "metric": ...,
+    "monthly": bool}; GET takes the same as ?symbol=&period=START:END&metric=&monthly=1
+    with period repeated.
+    """
+
+    server_version = 'dollarstock'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/health':
+            self._reply(200, {'status': 'ok'})
+        elif url.path == '/stats':
+            self._reply(200, self.server.service.stats())
+        elif url.path == '/summary':
+            params = parse_qs(url.query)
+            self._answer({
+                'symbol': params.get('symbol', [''])[0],
+                'periods': params.get('period', []),
+                'metric': params.get('metric', ['all'])[0],
+                'monthly': params.get('monthly', ['0'])[0].lower() in ('1', 'true', 'yes'),
+            })
+        else:
+            self._reply(404, {'error': f'no such endpoint: {url.path}'})
+
+    def do_POST(self):
+        if urlsplit(self.path).path != '/summary':
+            self._reply(404, {'error': f'no such endpoint: {self.path}'})
+            return
+        try:
+            query = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError:
+            self._reply(400, {'error': 'request body is not valid JSON'})
+            return
+        if not isinstance(query, dict):
+            self._reply(400, {'error': 'request body must be a JSON object'})
+            return
+        self._answer(query)
+
+    def _answer(self, query):
+        try:
+            result = self.server.service.summary(
+                query.get('symbol'),
+                query.get('periods'),
+                metric=query.get('metric', 'all'),
+                monthly=bool(query.get('monthly', False)),
+            )
+        except ValueError as e:
+            self._reply(400, {'error': str(e)})
+        except LookupError as e:
+            self._reply(404, {'error': str(e)})
+        except Exception as e:
+            self._reply(502, {'error': f'error fetching or analyzing data: {e}'})
+        else:
+            self._reply(200, result)
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix-socket clients have no address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'local'
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # A socket file left by a previous run would make bind fail
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    """
+    HTTP server for the service on host:port, or on a Unix socket when socket_path is given
+    """
+    if socket_path:
+        server = UnixHTTPServer(socket_path, AnalysisHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), AnalysisHandler)
+    server.service = service
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve period summaries over a local JSON API, keeping bars and results in memory')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Address to listen on (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--socket', type=str, help='Listen on this Unix socket instead of TCP')
+    parser.add_argument('--provider', choices=sorted(PROVIDER_NAMES), default=os.environ.get('DOLLARSTOCK_PROVIDER', 'yfinance'), help='Market data source (default: yfinance)')
+    parser.add_argument('--data-dir', type=str, default=os.environ.get('DOLLARSTOCK_DATA_DIR'), help="Data directory for the 'files' and 'universe' providers")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the 'synthetic' provider")
+    parser.add_argument('--data-url', type=str, default=os.environ.get('DOLLARSTOCK_DATA_URL'), help="Data server URL for the 'http' provider (e.g. a running data_server.py)")
+    parser.add_argument('--cache-dir', type=str, help='Directory for the local bar store (default: $DOLLARSTOCK_CACHE_DIR or ~/.cache/dollarstock)')
+    parser.add_argument('--no-cache', action='store_true', help='Download from the provider instead of using the local bar store')
+    parser.add_argument('--cache-bytes', type=int, default=DEFAULT_MAX_BYTES, help='Memory budget for cached bars (default: $DOLLARSTOCK_CACHE_BYTES or 256 MiB)')
+    parser.add_argument('--rate', type=float, default=5.0, help='Maximum remote requests per second (default: 5)')
+    parser.add_argument('--retries', type=int, default=3, help='Retries with exponential backoff for failed remote requests (default: 3)')
+    args = parser.parse_args()
+    if args.rate <= 0:
+        parser.error('--rate must be positive')
+
+    try:
+        session = make_session(4) if args.provider in ('yfinance', 'http') else None
+        provider = get_provider(args.provider, data_dir=args.data_dir, seed=args.seed, session=session, url=args.data_url)
+    except ValueError as e:
+        parser.error(str(e))
+    except OSError as e:
+        # A missing or unreadable --data-dir
+        parser.error(f"cannot read the '{args.provider}' data: {e}")
+
+    # Remote bars go through the rate limiter and the local bar store
+    fetch = provider.fetch
+    if provider.remote:
+        fetch = rate_limited(fetch, TokenBucket(args.rate), retries=args.retries)
+    if provider.remote and not args.no_cache:
+        store = BarStore(fetch, default_store_path(args.cache_dir))
+        fetch = store.get_bars
+
+    service = AnalysisService(fetch, max_bytes=args.cache_bytes)
+    server = make_server(service, args.host, args.port, args.socket)
+    where = f'unix:{args.socket}' if args.socket else f'http://{args.host}:{server.server_address[1]}'
+    print(f"Serving period summaries on {where} (Ctrl+C stops)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == '__main__':
+    main()
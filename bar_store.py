@@ -0,0 +1,204 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from providers import BAR_COLUMNS, action_dates, exchange_today
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'dollarstock')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    symbol TEXT NOT NULL,
+    date TEXT NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume INTEGER,
+    PRIMARY KEY (symbol, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    symbol TEXT NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    PRIMARY KEY (symbol, start)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS basis (
+    symbol TEXT PRIMARY KEY,
+    day TEXT NOT NULL
+) WITHOUT ROWID;
+-- Earlier versions kept monthly and yearly rollups here that nothing reads
+DROP TABLE IF EXISTS rollup_daily;
+DROP TABLE IF EXISTS rollup_buckets;
+"""
+
+
+def default_store_path(cache_dir=None):
+    """
+    Location of the bar store, honouring DOLLARSTOCK_CACHE_DIR
+    """
+    cache_dir = cache_dir or os.environ.get('DOLLARSTOCK_CACHE_DIR', DEFAULT_CACHE_DIR)
+    return os.path.join(cache_dir, 'bars.sqlite')
+
+
+def _to_day(value):
+    """
+    Truncate a date/datetime/string to a midnight datetime
+    """
+    return pd.Timestamp(value).to_pydatetime().replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+
+def merge_ranges(ranges):
+    """
+    Merge overlapping or touching (start, end) ranges
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(covered, start, end):
+    """
+    Parts of [start, end) not contained in the merged, sorted covered ranges
+    """
+    gaps = []
+    cursor = start
+    for range_start, range_end in covered:
+        if range_end <= cursor:
+            continue
+        if range_start >= end:
+            break
+        if range_start > cursor:
+            gaps.append((cursor, range_start))
+        cursor = max(cursor, range_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class BarStore:
+    """
+    On-disk per-symbol daily bar store that only fetches the date ranges it doesn't hold yet.
+
+    Ranges follow the yfinance convention: start is inclusive, end is exclusive.
+    `fetch(symbol, start, end)` is normally a remote MarketDataProvider's fetch; it must
+    raise on transport errors, so that failed downloads are never recorded as covered.
+
+    Bars are stored as the provider adjusts them (Yahoo's are adjusted for splits and
+    dividends up to the day they are fetched), and the `basis` table records the day a
+    symbol's held bars were last known to be current. A split or dividend after that day
+    puts every held price on an old basis, so those bars are dropped and the symbol's
+    whole held span is fetched again. A download only reports the actions within its own
+    range, so filling a gap also checks the days since the basis day that the gap leaves out.
+    `today()` gives the exchange's current date, before which bars are complete.
+    """
+
+    def __init__(self, fetch, path=None, today=exchange_today):
+        self.fetch = fetch
+        self.today = today
+        self.path = path or default_store_path()
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def covered_ranges(self, symbol):
+        """
+        Date ranges already held for a symbol, merged and sorted
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT start, end FROM coverage WHERE symbol = ? ORDER BY start', (symbol,)
+            ).fetchall()
+        return [(datetime.fromisoformat(s), datetime.fromisoformat(e)) for s, e in rows]
+
+    def get_bars(self, symbol, start_date, end_date):
+        """
+        Return bars for [start_date, end_date), downloading only the missing gaps
+        """
+        symbol = symbol.upper()
+        start, end = _to_day(start_date), _to_day(end_date)
+        for gap_start, gap_end in missing_ranges(self.covered_ranges(symbol), start, end):
+            # An earlier fill that started over may have covered this gap already
+            if missing_ranges(self.covered_ranges(symbol), gap_start, gap_end):
+                self._fill(symbol, gap_start, gap_end)
+        return self.read(symbol, start, end)
+
+    def read(self, symbol, start, end):
+        """
+        Read held bars for [start, end) without touching the network
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT date, open, high, low, close, volume FROM bars '
+                'WHERE symbol = ? AND date >= ? AND date < ? ORDER BY date',
+                (symbol, start.isoformat(), end.isoformat()),
+            ).fetchall()
+        df = pd.DataFrame.from_records(rows, columns=['Date'] + BAR_COLUMNS)
+        df['Date'] = pd.to_datetime(df['Date'])
+        return df.set_index('Date')
+
+    def _fill(self, symbol, start, end):
+        df = self.fetch(symbol, start, end)
+        today = _to_day(self.today())
+        held = self.covered_ranges(symbol)
+        rebase = False
+        if held:
+            # Stores written before the basis was tracked: each range was fetched after it ended
+            since = self._basis(symbol) or min(e for _, e in held)
+            actions = action_dates(df)
+            for probe_start, probe_end in missing_ranges([(start, end)], since + timedelta(days=1), today + timedelta(days=1)):
+                actions = actions.union(action_dates(self.fetch(symbol, probe_start, probe_end)))
+            rebase = len(actions) > 0 and actions.max() > since
+        if rebase:
+            start, end = min([start] + [s for s, _ in held]), max([end] + [e for _, e in held])
+            df = self.fetch(symbol, start, end)
+        records = [
+            (symbol, ts.isoformat(), row[0], row[1], row[2], row[3], None if pd.isna(row[4]) else int(row[4]))
+            for ts, row in zip(df.index, df[BAR_COLUMNS].itertuples(index=False, name=None))
+        ]
+        # Today's bar is still forming, so it is stored but never marked as covered
+        covered_end = min(end, today)
+        with self._lock, self._conn:
+            if rebase:
+                self._conn.execute('DELETE FROM bars WHERE symbol = ?', (symbol,))
+                self._conn.execute('DELETE FROM coverage WHERE symbol = ?', (symbol,))
+            self._conn.executemany('INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)', records)
+            if covered_end > start:
+                self._record_coverage(symbol, start, covered_end)
+            # Every held bar is now on today's basis: no later action was reported, or they were just refetched
+            self._conn.execute('INSERT OR REPLACE INTO basis VALUES (?, ?)', (symbol, today.isoformat()))
+
+    def _basis(self, symbol):
+        """
+        Day the symbol's held bars were last known to be on the provider's current price basis
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT day FROM basis WHERE symbol = ?', (symbol,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def _record_coverage(self, symbol, start, end):
+        rows = self._conn.execute('SELECT start, end FROM coverage WHERE symbol = ?', (symbol,)).fetchall()
+        ranges = [(datetime.fromisoformat(s), datetime.fromisoformat(e)) for s, e in rows]
+        merged = merge_ranges(ranges + [(start, end)])
+        self._conn.execute('DELETE FROM coverage WHERE symbol = ?', (symbol,))
+        self._conn.executemany(
+            'INSERT INTO coverage VALUES (?, ?, ?)',
+            [(symbol, s.isoformat(), e.isoformat()) for s, e in merged],
+        )
+
@@ -0,0 +1,118 @@
+import contextvars
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` acquisitions per second with bursts up to `capacity`
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a token is available, then take it
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def call_with_retries(fn, *args, retries=3, backoff=1.0, max_backoff=30.0, limiter=None):
+    """
+    Call fn(*args), retrying failures with jittered exponential backoff.
+
+    Every attempt, including retries, takes a token from `limiter` first.
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return fn(*args)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(min(max_backoff, backoff * 2 ** attempt) * random.uniform(0.5, 1.0))
+
+
+def rate_limited(fetch, limiter, retries=3, backoff=1.0):
+    """
+    Wrap a provider fetch so every network call is rate-limited and retried
+    """
+    def wrapper(*args):
+        return call_with_retries(fetch, *args, retries=retries, backoff=backoff, limiter=limiter)
+    return wrapper
+
+
+def make_session(pool_size):
+    """
+    HTTP session shared by all fetch threads, with a connection pool sized to match
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def read_symbols_file(path):
+    """
+    Symbols from a file, one or more per line separated by commas or whitespace; '#' starts a comment
+    """
+    symbols = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            symbols.extend(s.upper() for s in line.replace(',', ' ').split())
+    return symbols
+
+
+def fetch_many(fetch, symbols, start_date, end_date, workers=8, window=None):
+    """
+    Fetch symbols on a bounded thread pool, yielding (symbol, frame, error) as each finishes.
+
+    At most `window` fetches (default twice the workers) are queued or running at a time,
+    and each frame is let go once yielded, so memory doesn't grow with the number of symbols.
+    """
+    window = window or 2 * workers
+    symbols = iter(symbols)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+
+        def submit():
+            for symbol in itertools.islice(symbols, window - len(pending)):
+                # Each fetch runs in a copy of the caller's context, so it keeps any active timing span
+                pending[executor.submit(contextvars.copy_context().run, fetch, symbol, start_date, end_date)] = symbol
+
+        submit()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                symbol = pending.pop(future)
+                try:
+                    result, error = future.result(), None
+                except Exception as e:
+                    result, error = None, e
+                yield symbol, result, error
+            submit()
@@ -0,0 +1,285 @@
+import argparse
+import functools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import plotly
+
+from analysis import PeriodAnalysis
+from compact_bars import CompactBars
+from intraday import intraday_daily_bars
+from liquidity import liquidity_metrics
+from providers import SyntheticProvider, period_range
+from range_cache import RangeCache
+from screener import SymbolPanel, screen
+from summary_tables import format_count, format_dollars, format_price
+import stock_analyzer
+
+# setup() builds fresh inputs before every repetition and is not measured; run(*inputs) is
+Case = namedtuple('Case', ['name', 'setup', 'run'])
+
+# Histories end here rather than today, so every run sees the same bars
+END = pd.Timestamp('2025-01-01')
+
+DEFAULT_BASELINE = 'benchmark_baselines.json'
+
+# years: daily history lengths; symbols: universe sizes for the screener (over 10 years);
+# intraday: (interval, years) rolled up to daily bars
+TIERS = {
+    'small': {'years': (1, 10), 'symbols': (1, 100), 'intraday': (('5m', 1),)},
+    'medium': {'years': (1, 10, 50), 'symbols': (1, 100, 1000), 'intraday': (('5m', 1), ('1m', 1))},
+    'large': {'years': (1, 10, 50), 'symbols': (1, 100, 1000, 5000), 'intraday': (('1m', 1), ('1m', 10))},
+}
+
+
+def history_start(years):
+    return END - pd.DateOffset(years=years)
+
+
+@functools.lru_cache(maxsize=None)
+def daily_bars(years, symbol='SYNTH'):
+    return SyntheticProvider(seed=0).fetch(symbol, history_start(years), END)
+
+
+@functools.lru_cache(maxsize=None)
+def compact_universe(symbols, years):
+    provider = SyntheticProvider(seed=0)
+    return {f'S{i:05d}': CompactBars.from_frame(provider.fetch(f'S{i:05d}', history_start(years), END)) for i in range(symbols)}
+
+
+def split_periods(years, count):
+    """
+    `count` consecutive periods covering the last `years` years
+    """
+    edges = pd.date_range(history_start(years), END, periods=count + 1)
+    return [(start, end - pd.Timedelta(days=1)) for start, end in zip(edges[:-1], edges[1:])]
+
+
+def report_cases(years, output_dir):
+    def setup():
+        return (PeriodAnalysis(daily_bars(years), 'SYNTH', split_periods(years, 2)),)
+
+    builders = {
+        'volume_comparison': lambda analysis: stock_analyzer.create_volume_comparison(analysis, output_dir=output_dir),
+        'dollar_volume_comparison': lambda analysis: stock_analyzer.create_dollar_volume_comparison(analysis, output_dir=output_dir),
+        'monthly_dollar_volume': lambda analysis: stock_analyzer.create_monthly_dollar_volume_comparison(analysis, output_dir=output_dir),
+        'summary_table': lambda analysis: stock_analyzer.generate_summary_table(analysis, output_dir=output_dir),
+    }
+    return [Case(f'reports/{name}/{years}y', setup, build) for name, build in builders.items()]
+
+
+def slicing_case(years):
+    periods = split_periods(years, 12)
+
+    def run(df):
+        analysis = PeriodAnalysis(df, 'SYNTH', periods)
+        for i in range(len(periods)):
+            analysis.daily(i)
+            analysis.summary(i)
+    return Case(f'slicing/{years}y', lambda: (daily_bars(years),), run)
+
+
+def monthly_case(years):
+    periods = split_periods(years, 4)
+    return Case(f'monthly/{years}y', lambda: (PeriodAnalysis(daily_bars(years), 'SYNTH', periods),),
+                lambda analysis: analysis.monthly_summary())
+
+
+def streamlit_case(years):
+    """
+    The Streamlit app's first analysis of a symbol: cold cache fetch, analysis, every view
+    """
+    periods = split_periods(years, 2)
+
+    def setup():
+        return (RangeCache(SyntheticProvider(seed=0).fetch),)
+
+    def run(cache):
+        df = cache.get('SYNTH', *period_range(periods))
+        analysis = PeriodAnalysis(df, 'SYNTH', periods)
+        stock_analyzer.volume_comparison_figure(analysis)
+        stock_analyzer.dollar_volume_comparison_figure(analysis)
+        stock_analyzer.monthly_dollar_volume_figure(analysis)
+        period_summary = analysis.period_summary()
+        monthly_summary = analysis.monthly_summary()
+        for values in (period_summary['Total Volume'], monthly_summary['Volume']):
+            format_count(values)
+        for values in (period_summary['Average Price'], monthly_summary['Close']):
+            format_price(values)
+        for values in (period_summary['Total Dollar Volume'], monthly_summary['DollarVolume']):
+            format_dollars(values)
+    return Case(f'streamlit/{years}y', setup, run)
+
+
+def live_case(years):
+    """
+    One live refresh in the Streamlit app: poll a new bar, extend the analysis and patch every figure
+    """
+    periods = split_periods(years, 2)
+
+    def setup():
+        df = daily_bars(years)
+        cache = RangeCache(SyntheticProvider(seed=0).fetch)
+        cache.get('SYNTH', df.index[0], df.index[-1])
+        analysis = PeriodAnalysis(df.iloc[:-1], 'SYNTH', periods)
+        figures = [figure(analysis) for figure in (stock_analyzer.volume_comparison_figure,
+                                                   stock_analyzer.dollar_volume_comparison_figure,
+                                                   stock_analyzer.monthly_dollar_volume_figure)]
+        return cache, analysis, figures
+
+    def run(cache, analysis, figures):
+        changes = analysis.extend(cache.poll('SYNTH', analysis.frame.index[-1], END))
+        stock_analyzer.update_volume_figure(figures[0], analysis, changes)
+        stock_analyzer.update_dollar_volume_figure(figures[1], analysis, changes)
+        stock_analyzer.update_monthly_dollar_volume_figure(figures[2], analysis, changes)
+        analysis.period_summary()
+        analysis.monthly_summary()
+    return Case(f'live/{years}y', setup, run)
+
+
+def panel_case(symbols, years=10):
+    return Case(f'panel/{symbols}x{years}y', lambda: (compact_universe(symbols, years),), SymbolPanel.from_bars)
+
+
+def screen_case(symbols, years=10):
+    """
+    One screen of a panel built beforehand, as a run builds it once for every ranking it makes
+    """
+    periods = split_periods(years, 2)
+    return Case(f'screen/{symbols}x{years}y', lambda: (SymbolPanel.from_bars(compact_universe(symbols, years)),),
+                lambda panel: screen(panel, periods))
+
+
+def liquidity_case(symbols, years=10):
+    """
+    Rolling ADV, VWAP and z-scores over every date of a date x symbol panel
+    """
+    def setup():
+        panel = SymbolPanel.from_bars(compact_universe(symbols, years))
+        return panel.volume, panel.close * panel.volume
+    return Case(f'liquidity/{symbols}x{years}y', setup, liquidity_metrics)
+
+
+def intraday_case(interval, years):
+    # Generating the synthetic bars is part of the measured path, as downloading is for a provider
+    provider = SyntheticProvider(seed=0)
+    return Case(f'intraday/{interval}/{years}y', lambda: (),
+                lambda: intraday_daily_bars(provider, 'SYNTH', history_start(years), END, interval))
+
+
+def build_cases(tier, output_dir):
+    scales = TIERS[tier]
+    cases = []
+    for years in scales['years']:
+        cases.extend(report_cases(years, output_dir))
+        cases.append(slicing_case(years))
+        cases.append(monthly_case(years))
+        cases.append(streamlit_case(years))
+        cases.append(live_case(years))
+    cases.extend(panel_case(symbols) for symbols in scales['symbols'])
+    cases.extend(screen_case(symbols) for symbols in scales['symbols'])
+    cases.extend(liquidity_case(symbols) for symbols in scales['symbols'])
+    cases.extend(intraday_case(interval, years) for interval, years in scales['intraday'])
+    return cases
+
+
+def measure(case, repeat):
+    """
+    Best wall time of `repeat` runs, then peak traced allocation of one more
+    """
+    timings = []
+    for _ in range(repeat):
+        inputs = case.setup()
+        start = time.perf_counter()
+        case.run(*inputs)
+        timings.append(time.perf_counter() - start)
+    inputs = case.setup()
+    tracemalloc.start()
+    try:
+        case.run(*inputs)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_mb': peak / 2 ** 20}
+
+
+def regressions(name, result, baseline, threshold, min_seconds):
+    """
+    Messages for the ways result is worse than baseline by more than threshold
+    """
+    found = []
+    if result['seconds'] > baseline['seconds'] * (1 + threshold) + min_seconds:
+        found.append(f"{name}: {result['seconds']:.4f} s vs baseline {baseline['seconds']:.4f} s")
+    if result['peak_mb'] > baseline['peak_mb'] * (1 + threshold) + 1.0:
+        found.append(f"{name}: peak {result['peak_mb']:.1f} MiB vs baseline {baseline['peak_mb']:.1f} MiB")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the report builders and data paths on deterministic synthetic bars')
+    parser.add_argument('--tier', choices=sorted(TIERS), default='small', help='Input scales to run (default: small)')
+    parser.add_argument('--filter', action='append', default=[], help='Only run cases whose name contains this; repeat for several')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case; the fastest counts (default: 3)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help=f'Baseline file (default: {DEFAULT_BASELINE})')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline for the cases run')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown or memory growth over the baseline (default: 0.25, i.e. 25%%)')
+    parser.add_argument('--min-seconds', type=float, default=0.005, help='Time differences below this never count as regressions (default: 0.005)')
+    parser.add_argument('--json', type=str, help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f).get('cases', {})
+
+    results = {}
+    failures = []
+    with tempfile.TemporaryDirectory(prefix='dollarstock-bench-') as output_dir:
+        cases = [case for case in build_cases(args.tier, output_dir) if not args.filter or any(f in case.name for f in args.filter)]
+        print(f"{'case':<42} {'seconds':>10} {'peak MiB':>10} {'vs baseline':>12}")
+        for case in cases:
+            # Report builders print where they saved each file
+            with open(os.devnull, 'w') as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    result = measure(case, args.repeat)
+                finally:
+                    sys.stdout = stdout
+            results[case.name] = result
+            baseline = baselines.get(case.name)
+            change = f"{(result['seconds'] / baseline['seconds'] - 1) * 100:+.0f}%" if baseline and baseline['seconds'] else 'new'
+            print(f"{case.name:<42} {result['seconds']:>10.4f} {result['peak_mb']:>10.1f} {change:>12}", flush=True)
+            if baseline and not args.save_baseline:
+                failures.extend(regressions(case.name, result, baseline, args.threshold, args.min_seconds))
+
+    environment = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'plotly': plotly.__version__,
+        'platform': platform.platform(),
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment, 'cases': results}, f, indent=2)
+    if args.save_baseline:
+        baselines.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment, 'cases': dict(sorted(baselines.items()))}, f, indent=2)
+        print(f"Baseline for {len(results)} cases has been saved in {args.baseline}")
+
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(HERE, 'stock_analyzer.py')
+
+# Modules that must not load before the CLI needs data or charts
+HEAVY_MODULES = ('numpy', 'pandas', 'plotly', 'yfinance')
+
+
+def imported_modules(command, cwd=None):
+    """
+    Top-level package names a Python command imports, from -X importtime
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + command, capture_output=True, text=True, cwd=cwd)
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{result.stderr[-2000:]}")
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and line.count('|') == 2:
+            name = line.rsplit('|', 1)[1].strip()
+            modules.add(name.split('.')[0])
+    return modules
+
+
+def median_seconds(command, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + command, capture_output=True, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that the command line starts without heavy imports and within a time budget')
+    parser.add_argument('--budget', type=float, default=float(os.environ.get('DOLLARSTOCK_STARTUP_BUDGET', '0.15')),
+                        help='Seconds `stock_analyzer.py --help` may take beyond a bare interpreter start (default: 0.15)')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per timing; the median is compared (default: 5)')
+    args = parser.parse_args()
+
+    failures = []
+
+    loaded = imported_modules([CLI, '--help'])
+    heavy = sorted(loaded.intersection(HEAVY_MODULES))
+    if heavy:
+        failures.append(f"--help imports {', '.join(heavy)}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        loaded = imported_modules([CLI, 'AAPL', '--provider', 'synthetic', '--period', '2024-01-01:2024-03-31',
+                                   '--summary-only', '--output-dir', directory], cwd=directory)
+    if 'plotly' in loaded:
+        failures.append('--summary-only imports plotly')
+
+    interpreter = median_seconds(['-c', 'pass'], args.runs)
+    cli = median_seconds([CLI, '--help'], args.runs)
+    overhead = cli - interpreter
+    print(f"--help: {cli * 1000:.0f} ms, {overhead * 1000:.0f} ms over a bare interpreter (budget {args.budget * 1000:.0f} ms)")
+    if overhead > args.budget:
+        failures.append(f'--help startup overhead {overhead * 1000:.0f} ms exceeds {args.budget * 1000:.0f} ms')
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
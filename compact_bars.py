@@ -0,0 +1,124 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 86400 * 10 ** 9
+
+COLUMN_DTYPES = {'days': 'int64', 'close': 'float32', 'volume': 'uint64'}
+
+
+class CompactBars:
+    """
+    One symbol's bars reduced to what the analyzer reads: int64 day ordinals (days since
+    1970-01-01), float32 Close and uint64 Volume, 20 bytes a bar.
+
+    Arrays may be views into a memory-mapped BarUniverse. Missing volumes are stored as 0.
+    """
+
+    __slots__ = ('days', 'close', 'volume')
+
+    def __init__(self, days, close, volume):
+        self.days = days
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def from_frame(cls, df):
+        volume = df['Volume'].to_numpy(dtype='float64')
+        return cls(
+            df.index.asi8 // NS_PER_DAY,
+            df['Close'].to_numpy(dtype='float32'),
+            np.where(np.isnan(volume), 0, volume).astype('uint64'),
+        )
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def nbytes(self):
+        return self.days.nbytes + self.close.nbytes + self.volume.nbytes
+
+    @property
+    def index(self):
+        return pd.DatetimeIndex((np.asarray(self.days) * NS_PER_DAY).astype('datetime64[ns]'), name='Date')
+
+    def slice(self, start_date, end_date):
+        """
+        Bars in [start_date, end_date), as views
+        """
+        lo, hi = np.searchsorted(self.days, [day_ordinal(start_date), day_ordinal(end_date)])
+        return CompactBars(self.days[lo:hi], self.close[lo:hi], self.volume[lo:hi])
+
+    def to_frame(self):
+        """
+        Date-indexed frame with float64 Close and Volume
+        """
+        return pd.DataFrame({'Close': self.close.astype('float64'), 'Volume': self.volume.astype('float64')}, index=self.index)
+
+
+def day_ordinal(value):
+    return pd.Timestamp(value).normalize().value // NS_PER_DAY
+
+
+class BarUniverse:
+    """
+    Many symbols' CompactBars stored column-wise in three flat arrays plus per-symbol offsets.
+
+    save() writes one .npy file per column and load() memory-maps them, so a whole market's
+    history costs page cache rather than heap, and forked workers share the same pages.
+    """
+
+    def __init__(self, symbols, offsets, days, close, volume):
+        self.symbols = list(symbols)
+        self.offsets = offsets
+        self.days = days
+        self.close = close
+        self.volume = volume
+        self._positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_bars(cls, bars):
+        """
+        Build from a {symbol: CompactBars} mapping
+        """
+        symbols = sorted(bars)
+        lengths = [len(bars[s]) for s in symbols]
+        offsets = np.concatenate(([0], np.cumsum(lengths, dtype='int64')))
+        columns = {
+            name: np.concatenate([getattr(bars[s], name) for s in symbols]) if symbols else np.empty(0, dtype=dtype)
+            for name, dtype in COLUMN_DTYPES.items()
+        }
+        return cls(symbols, offsets, columns['days'], columns['close'], columns['volume'])
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        with open(os.path.join(directory, 'symbols.json'), encoding='utf-8') as f:
+            symbols = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+                  for name in ['offsets'] + list(COLUMN_DTYPES)}
+        return cls(symbols, arrays['offsets'], arrays['days'], arrays['close'], arrays['volume'])
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in ['offsets'] + list(COLUMN_DTYPES):
+            np.save(os.path.join(directory, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(directory, 'symbols.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.symbols, f)
+
+    def __contains__(self, symbol):
+        return symbol in self._positions
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __getitem__(self, symbol):
+        i = self._positions[symbol]
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return CompactBars(self.days[lo:hi], self.close[lo:hi], self.volume[lo:hi])
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.days.nbytes + self.close.nbytes + self.volume.nbytes
+
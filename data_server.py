@@ -0,0 +1,115 @@
+import argparse
+import os
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import pandas as pd
+
+from options import PROVIDER_NAMES
+from providers import get_provider
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8766
+
+
+class BarsHandler(BaseHTTPRequestHandler):
+    """
+    GET /bars/SYMBOL?start=YYYY-MM-DD&end=YYYY-MM-DD returns the daily bars in [start, end)
+    as CSV (Date, Open, High, Low, Close, Volume), after the server's simulated latency
+    """
+
+    server_version = 'dollarstock-data'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        if url.path == '/health':
+            self._reply(200, 'ok\n', 'text/plain')
+            return
+        if len(parts) != 2 or parts[0] != 'bars' or not parts[1]:
+            self._reply(404, f'no such endpoint: {url.path}\n', 'text/plain')
+            return
+        params = parse_qs(url.query)
+        try:
+            start = pd.Timestamp(params['start'][0])
+            end = pd.Timestamp(params['end'][0])
+        except (KeyError, ValueError):
+            self._reply(400, 'give start and end as YYYY-MM-DD\n', 'text/plain')
+            return
+
+        server = self.server
+        delay = server.latency + random.uniform(0.0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if server.failure_rate and random.random() < server.failure_rate:
+            self._reply(503, 'simulated failure\n', 'text/plain')
+            return
+        try:
+            df = server.provider.fetch(unquote(parts[1]).upper(), start, end)
+        except Exception as e:
+            self._reply(502, f'error reading bars: {e}\n', 'text/plain')
+            return
+        self._reply(200, df.to_csv(index_label='Date', date_format='%Y-%m-%d'), 'text/csv')
+
+    def _reply(self, status, text, content_type):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(provider, host=DEFAULT_HOST, port=DEFAULT_PORT, latency=0.0, jitter=0.0, failure_rate=0.0, quiet=False):
+    """
+    HTTP server answering bar requests from provider; port 0 picks a free port
+    """
+    server = ThreadingHTTPServer((host, port), BarsHandler)
+    server.daemon_threads = True
+    server.provider = provider
+    server.latency = latency
+    server.jitter = jitter
+    server.failure_rate = failure_rate
+    server.quiet = quiet
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve daily bars over HTTP as a local stand-in for a remote data source (read with --provider http)")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Address to listen on (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--provider', choices=sorted(set(PROVIDER_NAMES) - {'http'}), default='synthetic', help='Where the served bars come from (default: synthetic)')
+    parser.add_argument('--data-dir', type=str, default=os.environ.get('DOLLARSTOCK_DATA_DIR'), help="Data directory for the 'files' and 'universe' providers")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the 'synthetic' provider")
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before answering each request (default: 0)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many extra random seconds per request (default: 0)')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of requests answered with a 503, to exercise retries (default: 0)')
+    parser.add_argument('--quiet', action='store_true', help="Don't log each request")
+    args = parser.parse_args()
+
+    try:
+        provider = get_provider(args.provider, data_dir=args.data_dir, seed=args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    except OSError as e:
+        # A missing or unreadable --data-dir
+        parser.error(f"cannot read the '{args.provider}' data: {e}")
+    server = make_server(provider, args.host, args.port, args.latency, args.jitter, args.failure_rate, args.quiet)
+    print(f"Serving {args.provider} bars on http://{args.host}:{server.server_address[1]} (Ctrl+C stops)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
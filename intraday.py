@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from providers import BAR_COLUMNS
+
+DAY_COLUMNS = BAR_COLUMNS + ['DollarVolume', 'Bars']
+
+NS_PER_DAY = 86400 * 10 ** 9
+
+
+class DailyRollup:
+    """
+    Streaming reduction of intraday bars to one row per trading day.
+
+    Chunks are folded in as they arrive and then dropped, so memory holds the daily rows
+    plus one chunk. A day split across chunks (a file block ending mid-session) is
+    carried over and merged with the next chunk. DollarVolume is the sum of each bar's
+    Close x Volume, which tracks the traded value more closely than daily Close x Volume.
+    """
+
+    def __init__(self):
+        self._blocks = []
+        self._carry = None
+
+    def add(self, bars):
+        bars = bars.dropna(subset=['Close', 'Volume'])
+        if bars.empty:
+            return
+        if not bars.index.is_monotonic_increasing:
+            bars = bars.sort_index()
+        keys = bars.index.asi8 // NS_PER_DAY
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+        ends = np.append(starts[1:], len(keys))
+        close = bars['Close'].to_numpy(dtype='float64')
+        volume = bars['Volume'].to_numpy(dtype='float64')
+        days = {
+            'Date': keys[starts],
+            'Open': bars['Open'].to_numpy(dtype='float64')[starts],
+            'High': np.fmax.reduceat(bars['High'].to_numpy(dtype='float64'), starts),
+            'Low': np.fmin.reduceat(bars['Low'].to_numpy(dtype='float64'), starts),
+            'Close': close[ends - 1],
+            'Volume': np.add.reduceat(volume, starts),
+            'DollarVolume': np.add.reduceat(close * volume, starts),
+            'Bars': ends - starts,
+        }
+        if self._carry is not None:
+            carry = self._carry
+            if carry['Date'][0] == days['Date'][0]:
+                # The carried day continues in this chunk: fold it into the first row
+                days['Open'][0] = carry['Open'][0]
+                days['High'][0] = np.fmax(days['High'][0], carry['High'][0])
+                days['Low'][0] = np.fmin(days['Low'][0], carry['Low'][0])
+                for column in ('Volume', 'DollarVolume', 'Bars'):
+                    days[column][0] += carry[column][0]
+            else:
+                self._blocks.append(carry)
+        # The last day may still continue in the next chunk
+        self._blocks.append({column: values[:-1] for column, values in days.items()})
+        self._carry = {column: values[-1:] for column, values in days.items()}
+
+    def frame(self):
+        """
+        Daily rows so far, with DAY_COLUMNS and a Date index
+        """
+        blocks = self._blocks + ([self._carry] if self._carry is not None else [])
+        if not blocks:
+            return pd.DataFrame(columns=DAY_COLUMNS, index=pd.DatetimeIndex([], name='Date'), dtype='float64')
+        columns = {column: np.concatenate([block[column] for block in blocks]) for column in ['Date'] + DAY_COLUMNS}
+        index = pd.DatetimeIndex((columns.pop('Date') * NS_PER_DAY).astype('datetime64[ns]'), name='Date')
+        return pd.DataFrame(columns, index=index)
+
+
+def intraday_daily_bars(provider, symbol, start_date, end_date, interval, chunk_days=None, fetch=None):
+    """
+    Daily bars for [start_date, end_date) aggregated from the provider's intraday bars chunk by chunk
+    """
+    rollup = DailyRollup()
+    for chunk in provider.intraday_chunks(symbol, start_date, end_date, interval, chunk_days=chunk_days, fetch=fetch):
+        rollup.add(chunk)
+    return rollup.frame()
@@ -0,0 +1,125 @@
+import numpy as np
+
+# Trailing windows, in bars: average daily dollar volume, approximate VWAP and the
+# dollar-volume z-score's baseline
+ADV_WINDOWS = (20, 60)
+VWAP_WINDOW = 20
+ZSCORE_WINDOW = 60
+
+# liquidity_metrics columns, in the order the summaries show them
+LIQUIDITY_COLUMNS = [f'ADV{window}' for window in ADV_WINDOWS] + [f'VWAP{VWAP_WINDOW}', 'DollarVolumeZ']
+
+
+def prefix_sums(values):
+    """
+    Cumulative sums along the first axis with a leading row of zeros, NaN counted as 0, and
+    the matching counts of non-NaN values
+    """
+    values = np.asarray(values, dtype='float64')
+    valid = ~np.isnan(values)
+    zero = np.zeros((1,) + values.shape[1:])
+    sums = np.concatenate((zero, np.cumsum(np.where(valid, values, 0.0), axis=0)))
+    counts = np.concatenate((zero, np.cumsum(valid, axis=0, dtype='float64')))
+    return sums, counts
+
+
+def window_diff(prefix, window, lag=0):
+    """
+    Sum of the `window` rows ending `lag` rows before each row, from prefix sums; windows
+    are cut short at the first row
+    """
+    hi = np.arange(1 - lag, len(prefix) - lag).clip(0)
+    lo = (hi - window).clip(0)
+    return prefix[hi] - prefix[lo]
+
+
+def rolling_mean(values, window, min_periods=None):
+    """
+    Mean of the trailing `window` rows at every row, skipping NaN; NaN where fewer than
+    min_periods (default: window) rows have values
+    """
+    sums, counts = prefix_sums(values)
+    total, count = window_diff(sums, window), window_diff(counts, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count >= (min_periods or window), total / count, np.nan)
+
+
+def rolling_vwap(dollar_volume, volume, window, min_periods=None):
+    """
+    Volume-weighted average price over the trailing `window` rows: dollar volume over volume.
+
+    With daily bars dollar volume is Close x Volume, so this approximates VWAP with the
+    close as each day's price; bars rolled up from intraday data carry their summed
+    DollarVolume and come closer to the true figure.
+    """
+    dollar_volume = np.asarray(dollar_volume, dtype='float64')
+    volume = np.asarray(volume, dtype='float64')
+    # A bar counts only when it has both
+    missing = np.isnan(dollar_volume) | np.isnan(volume)
+    dollars, count = prefix_sums(np.where(missing, np.nan, dollar_volume))
+    shares, _ = prefix_sums(np.where(missing, np.nan, volume))
+    total_shares = window_diff(shares, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where((window_diff(count, window) >= (min_periods or window)) & (total_shares > 0),
+                        window_diff(dollars, window) / total_shares, np.nan)
+
+
+def rolling_zscore(values, window, min_periods=None):
+    """
+    How many standard deviations each row is from the mean of the `window` rows before it.
+
+    Mean and sample standard deviation come from prefix sums of the values and their
+    squares. The values are centred on their overall mean first, so the squares of large
+    dollar volumes don't swamp the differences between windows. NaN where the window has
+    fewer than min_periods (default: window) values or no spread.
+    """
+    values = np.asarray(values, dtype='float64')
+    with np.errstate(invalid='ignore'):
+        centred = values - np.nanmean(values, axis=0) if values.size else values
+    sums, counts = prefix_sums(centred)
+    squares, _ = prefix_sums(centred * centred)
+    total, count, total_squares = window_diff(sums, window, lag=1), window_diff(counts, window, lag=1), window_diff(squares, window, lag=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        variance = np.maximum(total_squares - total * mean, 0.0) / (count - 1)
+        std = np.sqrt(variance)
+        return np.where((count >= (min_periods or window)) & (std > 0), (centred - mean) / std, np.nan)
+
+
+def liquidity_metrics(volume, dollar_volume, adv_windows=ADV_WINDOWS, vwap_window=VWAP_WINDOW, zscore_window=ZSCORE_WINDOW):
+    """
+    Rolling ADV, approximate VWAP and dollar-volume z-score for one symbol or a whole panel.
+
+    Volume and dollar volume are 1-D (one symbol's bars) or 2-D date x symbol arrays with
+    NaN for missing bars; every window is an O(n) difference of prefix sums computed for
+    all symbols at once. Returns {column: array shaped like the input}, keyed as
+    LIQUIDITY_COLUMNS for the default windows.
+    """
+    metrics = {f'ADV{window}': rolling_mean(dollar_volume, window) for window in adv_windows}
+    metrics[f'VWAP{vwap_window}'] = rolling_vwap(dollar_volume, volume, vwap_window)
+    metrics['DollarVolumeZ'] = rolling_zscore(dollar_volume, zscore_window)
+    return metrics
+
+
+def window_reach(adv_windows=ADV_WINDOWS, vwap_window=VWAP_WINDOW, zscore_window=ZSCORE_WINDOW):
+    """
+    Rows before a bar that its liquidity_metrics read
+    """
+    return max(max(adv_windows), vwap_window, zscore_window + 1)
+
+
+def tail_metrics(volume, dollar_volume, count, **windows):
+    """
+    liquidity_metrics for the last `count` rows, computed from just the bars their windows reach back over
+    """
+    lo = max(len(volume) - count - window_reach(**windows), 0)
+    metrics = liquidity_metrics(volume[lo:], dollar_volume[lo:], **windows)
+    return {name: values[len(values) - count:] for name, values in metrics.items()}
+
+
+def metrics_at(volume, dollar_volume, row, **windows):
+    """
+    liquidity_metrics at a single row of a date x symbol panel
+    """
+    metrics = tail_metrics(volume[:row + 1], dollar_volume[:row + 1], 1, **windows)
+    return {name: values[-1] for name, values in metrics.items()}
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+MANIFEST_NAME = 'dollarstock_manifest.jsonl'
+
+# Bump when report contents change for the same inputs, so every output is rebuilt once
+REPORT_VERSION = 3
+
+
+def report_key(df, params):
+    """
+    Hash of the bars a report is built from (dates, Close, Volume, any DollarVolume) and its JSON-serializable parameters
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({'version': REPORT_VERSION, **params}, sort_keys=True, default=str).encode('utf-8'))
+    digest.update(np.ascontiguousarray(df.index.asi8).tobytes())
+    for column in [c for c in ('Close', 'Volume', 'DollarVolume') if c in df]:
+        digest.update(np.ascontiguousarray(df[column].to_numpy(dtype='float64')).tobytes())
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Journal of the reports already built in an output directory, keyed by input hash.
+
+    Each completed symbol is appended as one JSON line and flushed right away, so an
+    interrupted run keeps everything it finished; the latest line for a symbol wins.
+    A symbol is current when its key matches and every output it listed still exists.
+    `compact` rewrites the journal with one line per symbol at the end of a run.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short by an interrupted run
+                        continue
+                    self.entries[entry['symbol']] = entry
+        self._journal = open(self.path, 'a', encoding='utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def is_current(self, symbol, key):
+        entry = self.entries.get(symbol)
+        return (entry is not None and entry['key'] == key
+                and all(os.path.exists(os.path.join(self.directory, path)) for path in entry['outputs']))
+
+    def record(self, symbol, key, outputs):
+        # Outputs are stored relative to the manifest, so the check works from any working directory
+        outputs = [os.path.relpath(path, self.directory) for path in outputs]
+        entry = {'symbol': symbol, 'key': key, 'outputs': outputs, 'built_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        self.entries[symbol] = entry
+        self._journal.write(json.dumps(entry) + '\n')
+        self._journal.flush()
+
+    def compact(self):
+        """
+        Rewrite the journal with only the latest entry per symbol
+        """
+        self._journal.close()
+        temporary = f'{self.path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            for symbol in sorted(self.entries):
+                f.write(json.dumps(self.entries[symbol]) + '\n')
+        os.replace(temporary, self.path)
+        self._journal = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        self._journal.close()
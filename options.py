@@ -0,0 +1,30 @@
+from collections import namedtuple
+
+# Choices and option types the command line needs before any data is touched. This module
+# imports only the standard library, so parsing arguments (or printing --help) never pays
+# for numpy, pandas or plotly; the modules that use these re-export them.
+
+# webgl: draw line traces with Scattergl; max_points: downsample each trace to about this
+# many points (None keeps every bar); method: 'lttb' or 'minmax'
+RenderOptions = namedtuple('RenderOptions', ['webgl', 'max_points', 'method'])
+
+DEFAULT_RENDER = RenderOptions(webgl=False, max_points=None, method='lttb')
+
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
+# Intraday bar sizes and their length in minutes
+INTRADAY_INTERVALS = {'1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30, '60m': 60, '90m': 90, '1h': 60}
+
+# Names of providers.PROVIDERS
+PROVIDER_NAMES = ('yfinance', 'files', 'synthetic', 'universe', 'http')
+
+RANK_COLUMNS = {
+    'volume': 'Volume Change %',
+    'dollar_volume': 'Dollar Volume Change %',
+    'price': 'Average Price Change %',
+    'adv': 'ADV 20',
+    'zscore': 'Dollar Volume Z',
+}
+
+# Names of summary_tables.DATA_FORMATS
+SUMMARY_FORMATS = ('csv', 'parquet', 'arrow')
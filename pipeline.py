@@ -0,0 +1,160 @@
+import asyncio
+import contextvars
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Standard library only: stock_analyzer imports this at startup
+
+# function(key, value) returns the value handed to the next stage, or None to drop the item.
+# Stages run `workers` calls at a time on threads; inline stages run on the event loop
+# thread, one at a time, and must be quick (bookkeeping, not I/O or number crunching).
+Stage = namedtuple('Stage', ['name', 'function', 'workers', 'inline'], defaults=(1, False))
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class StageMetrics:
+    """
+    Items, errors, busy time, waits and input queue depth of one pipeline stage.
+
+    `starved` is worker time spent waiting for input and `blocked` time spent waiting for
+    room in the next stage's queue; a stage that is busy nearly all the time while the ones
+    before it block is the bottleneck.
+    """
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self.max_depth = 0
+        self._depth_total = 0
+        self._depth_samples = 0
+
+    def sample(self, depth):
+        self.max_depth = max(self.max_depth, depth)
+        self._depth_total += depth
+        self._depth_samples += 1
+
+    def to_dict(self, elapsed):
+        elapsed = elapsed or 1e-9
+        return {
+            'Stage': self.name,
+            'Workers': self.workers,
+            'Items': self.items,
+            'Errors': self.errors,
+            'Busy s': self.busy,
+            'Utilization %': self.busy / (elapsed * self.workers) * 100.0,
+            'Starved s': self.starved,
+            'Blocked s': self.blocked,
+            'Max queue': self.max_depth,
+            'Mean queue': self._depth_total / self._depth_samples if self._depth_samples else 0.0,
+            'Items/s': self.items / elapsed,
+        }
+
+
+class Pipeline:
+    """
+    Stages connected by bounded asyncio queues, so each stage works on later items while the
+    next one is still busy with earlier ones.
+
+    Items are (key, value) pairs. Every queue holds at most `queue_size` items, so a slow
+    stage holds back the ones before it instead of letting their results pile up: with
+    downloads in front of report building, at most (fetch workers + queue_size) frames
+    wait in memory however long the symbol list is. Blocking stage functions run on a
+    thread pool and keep the caller's context variables (timing spans included).
+    `on_done(key, value)` and `on_error(stage_name, key, error)` are called on the event
+    loop thread; a failed item is dropped.
+    """
+
+    def __init__(self, stages, queue_size=4, on_done=None, on_error=None):
+        if queue_size < 1:
+            raise ValueError('queue_size must be at least 1')
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.on_done = on_done
+        self.on_error = on_error
+        self.metrics = [StageMetrics(stage.name, 1 if stage.inline else stage.workers) for stage in self.stages]
+        self.elapsed = 0.0
+
+    def run(self, items):
+        """
+        Push every (key, value) item through the stages; returns when all are done
+        """
+        started = time.perf_counter()
+        try:
+            asyncio.run(self._run(items))
+        finally:
+            self.elapsed = time.perf_counter() - started
+
+    def report(self):
+        """
+        One row of metrics per stage
+        """
+        return [metrics.to_dict(self.elapsed) for metrics in self.metrics]
+
+    async def _run(self, items):
+        loop = asyncio.get_running_loop()
+        threads = sum(stage.workers for stage in self.stages if not stage.inline) or 1
+        executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='pipeline')
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+
+        async def put(i, item):
+            # Time spent here is the upstream stage's blocked time
+            await queues[i].put(item)
+            self.metrics[i].sample(queues[i].qsize())
+
+        async def feed():
+            for item in items:
+                await put(0, item)
+            for _ in range(self.metrics[0].workers):
+                await queues[0].put(_DONE)
+
+        async def worker(i):
+            stage, metrics = self.stages[i], self.metrics[i]
+            while True:
+                waited = time.perf_counter()
+                item = await queues[i].get()
+                metrics.starved += time.perf_counter() - waited
+                if item is _DONE:
+                    return
+                key, value = item
+                started = time.perf_counter()
+                try:
+                    if stage.inline:
+                        result = stage.function(key, value)
+                    else:
+                        result = await loop.run_in_executor(executor, contextvars.copy_context().run, stage.function, key, value)
+                except Exception as e:
+                    metrics.errors += 1
+                    if self.on_error is not None:
+                        self.on_error(stage.name, key, e)
+                    continue
+                finally:
+                    metrics.busy += time.perf_counter() - started
+                metrics.items += 1
+                if result is None:
+                    continue
+                if i + 1 == len(self.stages):
+                    if self.on_done is not None:
+                        self.on_done(key, result)
+                    continue
+                waited = time.perf_counter()
+                await put(i + 1, (key, result))
+                metrics.blocked += time.perf_counter() - waited
+
+        async def stage(i):
+            await asyncio.gather(*(worker(i) for _ in range(self.metrics[i].workers)))
+            if i + 1 < len(self.stages):
+                for _ in range(self.metrics[i + 1].workers):
+                    await queues[i + 1].put(_DONE)
+
+        try:
+            await asyncio.gather(feed(), *(stage(i) for i in range(len(self.stages))))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
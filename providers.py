@@ -0,0 +1,410 @@
+import io
+import os
+import zlib
+from urllib.parse import quote
+from urllib.request import urlopen
+
+import numpy as np
+import pandas as pd
+
+from compact_bars import BarUniverse
+from options import INTRADAY_INTERVALS
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Bars are dated by the exchange's calendar day, which is what decides whether today's bar is complete
+EXCHANGE_TIMEZONE = 'America/New_York'
+
+# Vendor columns marking splits and dividends; normalize_bars keeps only their dates
+ACTION_COLUMNS = ['Stock Splits', 'Dividends']
+
+
+def normalize_bars(df, intraday=False):
+    """
+    Flatten any provider frame to tz-naive daily rows holding exactly BAR_COLUMNS.
+
+    Handles yf.download's (field, symbol) MultiIndex columns, Ticker.history's tz-aware
+    index and lower-case vendor column names. With intraday=True timestamps keep their
+    exchange-local wall-clock time and the index is named 'Datetime'. Dates with a split
+    or dividend are kept in the frame's attrs (see action_dates).
+    """
+    name = 'Datetime' if intraday else 'Date'
+    if df is None or df.empty:
+        return pd.DataFrame(columns=BAR_COLUMNS, index=pd.DatetimeIndex([], name=name), dtype='float64')
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    df.columns = [str(c).strip().title() for c in df.columns]
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = (index if intraday else index.normalize()).rename(name)
+    actions = df.reindex(columns=ACTION_COLUMNS).fillna(0.0).to_numpy(dtype='float64')
+    action_index = df.index[(actions != 0).any(axis=1)]
+    df = df.reindex(columns=BAR_COLUMNS)
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    df.attrs['actions'] = sorted(set(action_index))
+    return df
+
+
+def action_dates(df):
+    """
+    Dates with a split or dividend in a frame from normalize_bars (empty when the source doesn't report them)
+    """
+    return pd.DatetimeIndex(df.attrs.get('actions', []) if df is not None else [])
+
+
+def exchange_today():
+    """
+    The current date in New York, as a naive midnight Timestamp; the host's own clock may
+    already be on the next day (or still on the previous one)
+    """
+    return pd.Timestamp.now(tz=EXCHANGE_TIMEZONE).normalize().tz_localize(None)
+
+
+def date_chunks(start_date, end_date, days):
+    """
+    Consecutive [start, end) windows of whole days covering [start_date, end_date)
+    """
+    if days < 1:
+        raise ValueError('chunks must be at least 1 day long')
+    start, end = pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize()
+    while start < end:
+        stop = min(start + pd.Timedelta(days=days), end)
+        yield start, stop
+        start = stop
+
+
+def period_range(periods):
+    """
+    [start, end) fetch range for inclusive (start, end) periods: the earliest start up to the day after the latest end
+    """
+    return pd.Timestamp(min(start for start, _ in periods)), pd.Timestamp(max(end for _, end in periods)) + pd.Timedelta(days=1)
+
+
+def slice_range(df, start_date, end_date):
+    """
+    Rows of a sorted frame in [start_date, end_date)
+    """
+    lo = df.index.searchsorted(pd.Timestamp(start_date), side='left')
+    hi = df.index.searchsorted(pd.Timestamp(end_date), side='left')
+    return df.iloc[lo:hi]
+
+
+class MarketDataProvider:
+    """
+    Source of daily bars. fetch() returns a frame normalized by normalize_bars for
+    [start_date, end_date) and raises on transport errors.
+    """
+
+    name = None
+    # Remote providers are fronted by the local BarStore; local ones are read directly
+    remote = False
+    # Days of intraday bars per request, by interval
+    chunk_days = {}
+
+    def fetch(self, symbol, start_date, end_date):
+        raise NotImplementedError
+
+    def fetch_intraday(self, symbol, start_date, end_date, interval):
+        """
+        Intraday bars for [start_date, end_date), normalized with intraday=True
+        """
+        raise NotImplementedError(f"The '{self.name}' provider has no intraday bars")
+
+    def intraday_chunks(self, symbol, start_date, end_date, interval, chunk_days=None, fetch=None):
+        """
+        Intraday bars for [start_date, end_date) as a sequence of frames of a few days each.
+
+        `fetch` replaces fetch_intraday for the requests, e.g. with a rate-limited wrapper.
+        """
+        fetch = fetch or self.fetch_intraday
+        if chunk_days is None:
+            chunk_days = self.chunk_days.get(interval, 30)
+        for start, end in date_chunks(start_date, end_date, chunk_days):
+            yield fetch(symbol, start, end, interval)
+
+
+class YFinanceProvider(MarketDataProvider):
+    """
+    Bars from Yahoo Finance
+    """
+
+    name = 'yfinance'
+    remote = True
+    # Yahoo serves at most 8 days of 1m bars, 60 days of 2m-90m bars and 730 days of hourly bars per request
+    chunk_days = {'1m': 7, '2m': 59, '5m': 59, '15m': 59, '30m': 59, '90m': 59, '60m': 729, '1h': 729}
+
+    def __init__(self, session=None):
+        self.session = session
+
+    def fetch(self, symbol, start_date, end_date):
+        import yfinance as yf
+        from yfinance.exceptions import YFPricesMissingError
+
+        try:
+            # Prices are adjusted for every split and dividend up to now; the actions themselves
+            # come back too, so the bar store can tell when its older bars went stale
+            df = yf.Ticker(symbol, session=self.session).history(start=start_date, end=end_date, auto_adjust=True, actions=True,
+                                                                 raise_errors=True)
+        except YFPricesMissingError:
+            # Yahoo has no bars in this range (holidays, before listing); that is a valid answer
+            df = None
+        return normalize_bars(df)
+
+    def fetch_intraday(self, symbol, start_date, end_date, interval):
+        import yfinance as yf
+        from yfinance.exceptions import YFPricesMissingError
+
+        try:
+            df = yf.Ticker(symbol, session=self.session).history(start=start_date, end=end_date, interval=interval, raise_errors=True)
+        except YFPricesMissingError:
+            df = None
+        return normalize_bars(df, intraday=True)
+
+
+class FileProvider(MarketDataProvider):
+    """
+    Bars from a directory of per-symbol files named SYMBOL.parquet or SYMBOL.csv.
+
+    The first CSV column (or the Parquet index / a Date column) holds the dates; column
+    names are matched case-insensitively and extra columns are ignored. Intraday bars
+    live in SYMBOL_INTERVAL files (e.g. AAPL_1m.csv), sorted by time, and are streamed
+    in blocks of `block_rows` rows rather than read whole.
+    """
+
+    name = 'files'
+    block_rows = 500000
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path_for(self, symbol, interval=None):
+        suffix = f'_{interval}' if interval else ''
+        for name in (symbol, symbol.upper(), symbol.lower()):
+            for ext in ('.parquet', '.csv'):
+                path = os.path.join(self.directory, name + suffix + ext)
+                if os.path.exists(path):
+                    return path
+        return None
+
+    def read(self, symbol):
+        """
+        The whole file for a symbol, normalized
+        """
+        path = self.path_for(symbol)
+        if path is None:
+            raise FileNotFoundError(f"No data file for {symbol} in {self.directory}")
+        if path.endswith('.parquet'):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path, index_col=0, parse_dates=[0])
+        date_column = next((c for c in df.columns if str(c).lower() in ('date', 'datetime')), None)
+        if date_column is not None:
+            df = df.set_index(date_column)
+        return normalize_bars(df)
+
+    def fetch(self, symbol, start_date, end_date):
+        return slice_range(self.read(symbol), start_date, end_date)
+
+    def read_blocks(self, path):
+        """
+        Successive blocks of an intraday file, each normalized
+        """
+        if path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+
+            blocks = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=self.block_rows))
+        else:
+            blocks = pd.read_csv(path, index_col=0, parse_dates=[0], chunksize=self.block_rows)
+        for df in blocks:
+            date_column = next((c for c in df.columns if str(c).lower() in ('date', 'datetime')), None)
+            if date_column is not None:
+                df = df.set_index(date_column)
+            yield normalize_bars(df, intraday=True)
+
+    def intraday_chunks(self, symbol, start_date, end_date, interval, chunk_days=None, fetch=None):
+        path = self.path_for(symbol, interval)
+        if path is None:
+            raise FileNotFoundError(f"No {interval} data file for {symbol} in {self.directory}")
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        for block in self.read_blocks(path):
+            if len(block) and block.index[0] >= end:
+                break
+            yield slice_range(block, start, end)
+
+    def fetch_intraday(self, symbol, start_date, end_date, interval):
+        chunks = list(self.intraday_chunks(symbol, start_date, end_date, interval))
+        return pd.concat(chunks) if chunks else normalize_bars(None, intraday=True)
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic random-walk bars, for running without network access.
+
+    Each (seed, symbol) pair always produces the same bar for the same business day,
+    whatever range is requested.
+    """
+
+    name = 'synthetic'
+    origin = pd.Timestamp('1970-01-01')
+
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def fetch(self, symbol, start_date, end_date):
+        start, end = pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize()
+        days = np.arange(self.origin.to_datetime64(), max(end, self.origin).to_datetime64(), dtype='datetime64[D]')
+        dates = pd.DatetimeIndex(days[np.is_busday(days)].astype('datetime64[ns]'), name='Date')
+        seeds = np.random.SeedSequence([self.seed, zlib.crc32(symbol.upper().encode())]).spawn(4)
+        # One generator per series keeps every draw aligned to its business day
+        params_rng, returns_rng, spread_rng, volume_rng = [np.random.default_rng(s) for s in seeds]
+        n = len(dates)
+        base_price = params_rng.uniform(10, 500)
+        base_volume = params_rng.uniform(2e5, 5e7)
+        close = base_price * np.exp(np.cumsum(returns_rng.standard_normal(n) * 0.012))
+        open_ = np.concatenate((close[:1], close[:-1]))
+        spread = np.abs(spread_rng.standard_normal(n)) * 0.01
+        volume = (base_volume * volume_rng.lognormal(0.0, 0.35, n)).astype('int64')
+        df = pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) * (1 + spread),
+            'Low': np.minimum(open_, close) * (1 - spread),
+            'Close': close,
+            'Volume': volume,
+        }, index=dates)
+        return slice_range(df, start, end)
+
+    def fetch_intraday(self, symbol, start_date, end_date, interval):
+        """
+        Regular-session bars from 09:30 whose closes bridge each day's open to its daily close
+        and whose volumes add up to its daily volume, so intraday and daily runs agree
+        """
+        minutes = INTRADAY_INTERVALS[interval]
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        daily = self.fetch(symbol, start.normalize(), end.normalize() + pd.Timedelta(days=1))
+        if daily.empty:
+            return normalize_bars(None, intraday=True)
+        steps = -(-390 // minutes)
+        offsets = pd.Timedelta(hours=9, minutes=30) + pd.to_timedelta(np.arange(steps) * minutes, unit='min')
+        # U-shaped volume profile: busy open and close, quiet midday
+        position = np.linspace(-1.0, 1.0, steps)
+        profile = 1.0 + 1.5 * position ** 2
+        crc = zlib.crc32(symbol.upper().encode())
+        frames = []
+        for day, bar in zip(daily.index, daily.itertuples()):
+            rng = np.random.default_rng([self.seed, crc, (day - self.origin).days])
+            # Brownian bridge in log price from the open to the close
+            walk = np.cumsum(rng.standard_normal(steps)) * 0.002
+            walk -= np.linspace(walk[0], walk[-1], steps)
+            close = np.exp(np.linspace(np.log(bar.Open), np.log(bar.Close), steps + 1)[1:] + walk)
+            close[-1] = bar.Close
+            open_ = np.concatenate(([bar.Open], close[:-1]))
+            weights = profile * rng.lognormal(0.0, 0.3, steps)
+            volume = np.floor(bar.Volume * weights / weights.sum()).astype('int64')
+            volume[-1] += int(bar.Volume) - volume.sum()
+            spread = np.abs(rng.standard_normal(steps)) * 0.001
+            frames.append(pd.DataFrame({
+                'Open': open_,
+                'High': np.maximum(open_, close) * (1 + spread),
+                'Low': np.minimum(open_, close) * (1 - spread),
+                'Close': close,
+                'Volume': volume,
+            }, index=pd.DatetimeIndex(day + offsets, name='Datetime')))
+        return slice_range(pd.concat(frames), start, end)
+
+
+class UniverseProvider(MarketDataProvider):
+    """
+    Bars from a compact universe directory written with --save-universe.
+
+    The columns are memory-mapped, so opening even a whole market's history is instant
+    and every process reading it shares the same pages. Only Close and Volume are kept
+    (Close as float32); Open, High and Low come back as NaN.
+    """
+
+    name = 'universe'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.universe = BarUniverse.load(directory)
+
+    def fetch(self, symbol, start_date, end_date):
+        symbol = symbol.upper()
+        if symbol not in self.universe:
+            return normalize_bars(None)
+        return self.universe[symbol].slice(start_date, end_date).to_frame().reindex(columns=BAR_COLUMNS)
+
+
+class HTTPProvider(MarketDataProvider):
+    """
+    Daily bars from an HTTP server answering GET /bars/SYMBOL?start=&end= with CSV, such as
+    data_server.py standing in for a remote source. Treated as remote, so requests go
+    through the rate limiter, retries and local bar store like Yahoo's.
+    """
+
+    name = 'http'
+    remote = True
+
+    def __init__(self, url, session=None, timeout=60):
+        self.url = url.rstrip('/')
+        self.session = session
+        self.timeout = timeout
+
+    def fetch(self, symbol, start_date, end_date):
+        url = (f"{self.url}/bars/{quote(symbol.upper())}"
+               f"?start={pd.Timestamp(start_date).strftime('%Y-%m-%d')}&end={pd.Timestamp(end_date).strftime('%Y-%m-%d')}")
+        if self.session is not None:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            body = response.content
+        else:
+            # urlopen raises HTTPError for error statuses
+            with urlopen(url, timeout=self.timeout) as response:
+                body = response.read()
+        df = pd.read_csv(io.BytesIO(body), index_col=0, parse_dates=[0])
+        return normalize_bars(df)
+
+
+PROVIDERS = {
+    YFinanceProvider.name: YFinanceProvider,
+    FileProvider.name: FileProvider,
+    SyntheticProvider.name: SyntheticProvider,
+    UniverseProvider.name: UniverseProvider,
+    HTTPProvider.name: HTTPProvider,
+}
+
+
+def get_provider(name, data_dir=None, seed=0, session=None, url=None):
+    """
+    Build a provider by name ('yfinance', 'files', 'synthetic', 'universe' or 'http')
+    """
+    if name == 'yfinance':
+        return YFinanceProvider(session=session)
+    if name == 'files':
+        if not data_dir:
+            raise ValueError("The 'files' provider needs a data directory")
+        return FileProvider(data_dir)
+    if name == 'synthetic':
+        return SyntheticProvider(seed=seed)
+    if name == 'universe':
+        if not data_dir:
+            raise ValueError("The 'universe' provider needs a data directory")
+        return UniverseProvider(data_dir)
+    if name == 'http':
+        if not url:
+            raise ValueError("The 'http' provider needs a data server URL")
+        return HTTPProvider(url, session=session)
+    raise ValueError(f"Unknown data provider '{name}' (choose from {', '.join(PROVIDERS)})")
+
+
+def provider_from_env():
+    """
+    Provider configured by DOLLARSTOCK_PROVIDER / DOLLARSTOCK_DATA_DIR / DOLLARSTOCK_SEED / DOLLARSTOCK_DATA_URL
+    """
+    return get_provider(
+        os.environ.get('DOLLARSTOCK_PROVIDER', 'yfinance'),
+        data_dir=os.environ.get('DOLLARSTOCK_DATA_DIR'),
+        seed=int(os.environ.get('DOLLARSTOCK_SEED', '0')),
+        url=os.environ.get('DOLLARSTOCK_DATA_URL'),
+    )
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import pandas as pd
+
+from providers import exchange_today, slice_range
+
+DEFAULT_TODAY_TTL = float(os.environ.get('DOLLARSTOCK_TODAY_TTL', '300'))
+DEFAULT_MAX_BYTES = int(os.environ.get('DOLLARSTOCK_CACHE_BYTES', str(256 * 1024 * 1024)))
+
+CacheEntry = namedtuple('CacheEntry', ['frame', 'start', 'end', 'refreshed_at', 'nbytes'])
+
+
+class RangeCache:
+    """
+    Thread-safe in-memory per-symbol bar cache that keeps the widest range fetched so far.
+
+    Any sub-range is served from memory; a wider request fetches only the missing left and
+    right edges and merges them in. Once an entry reaches today, today's still-forming bar
+    is refetched when it is older than `today_ttl` seconds; `today()` gives the exchange's
+    current date. Ranges are [start, end) as for MarketDataProvider.fetch.
+
+    One instance can be shared by every session in the process. Entries are evicted least
+    recently used first to stay within `max_bytes`, and concurrent requests that need a
+    download for the same symbol wait on the one in flight instead of issuing duplicates.
+    """
+
+    def __init__(self, fetch, today_ttl=DEFAULT_TODAY_TTL, max_bytes=DEFAULT_MAX_BYTES, clock=time.time, today=exchange_today):
+        self.fetch = fetch
+        self.today = today
+        self.today_ttl = today_ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._counters = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0}
+
+    def __contains__(self, symbol):
+        with self._lock:
+            return symbol.upper() in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Hit, miss, coalesced-wait and eviction counters plus current size
+        """
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+
+    def get(self, symbol, start_date, end_date):
+        """
+        Bars for [start_date, end_date), fetching only what the cache doesn't hold
+        """
+        symbol = symbol.upper()
+        start, end = pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize()
+        waited = False
+        while True:
+            with self._lock:
+                entry = self._entries.get(symbol)
+                ranges = self._missing(entry, start, end)
+                if not ranges:
+                    self._entries.move_to_end(symbol)
+                    self._counters['coalesced' if waited else 'hits'] += 1
+                    return slice_range(entry.frame, start, end)
+                flight = self._inflight.get(symbol)
+                if flight is None:
+                    flight = self._inflight[symbol] = threading.Event()
+                    break
+            # Someone else is downloading this symbol; wait, then re-check what is still missing
+            flight.wait()
+            waited = True
+
+        try:
+            pieces = [self.fetch(symbol, range_start, range_end) for range_start, range_end in ranges]
+            with self._lock:
+                self._counters['misses'] += 1
+                entry = self._merge(self._entries.get(symbol), pieces, ranges)
+                self._store(symbol, entry)
+            return slice_range(entry.frame, start, end)
+        finally:
+            with self._lock:
+                del self._inflight[symbol]
+            flight.set()
+
+    def poll(self, symbol, since, end_date):
+        """
+        Fetch [since, end_date) now, whatever the cache holds, and merge it into the symbol's entry.
+
+        For live views: since is the last bar already shown, so its revision and any newer
+        bars come back (and nothing older is downloaded again).
+        """
+        symbol = symbol.upper()
+        since, end = pd.Timestamp(since).normalize(), pd.Timestamp(end_date).normalize()
+        bars = self.fetch(symbol, since, end)
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None or since > entry.end:
+                # Not contiguous with what is held; keep it out of the cache
+                return bars
+            self._counters['misses'] += 1
+            self._store(symbol, self._merge(entry, [bars], [(since, end)]))
+        return bars
+
+    def _missing(self, entry, start, end):
+        """
+        [start, end) ranges to download so the entry covers start..end with a fresh today
+        """
+        if entry is None:
+            return [(start, end)]
+        ranges = []
+        if start < entry.start:
+            ranges.append((start, entry.start))
+        today = self.today()
+        stale = end > today and entry.end > today and self.clock() - entry.refreshed_at > self.today_ttl
+        if end > entry.end or stale:
+            refresh_from = entry.end
+            if stale:
+                # Refetch from the last held bar, which may be today's partial one
+                held = entry.frame.index
+                refresh_from = min(held[-1], today, entry.end) if len(held) else min(today, entry.end)
+            ranges.append((refresh_from, max(end, entry.end)))
+        return ranges
+
+    def _merge(self, entry, pieces, ranges):
+        refreshed_at = self.clock()
+        if entry is not None:
+            # Only a download reaching the right edge refreshes today's bar
+            if all(range_end < entry.end for _, range_end in ranges):
+                refreshed_at = entry.refreshed_at
+            pieces = [entry.frame] + pieces
+            ranges = [(entry.start, entry.end)] + ranges
+        frame = pd.concat([piece for piece in pieces if not piece.empty] or pieces[:1])
+        frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+        nbytes = int(frame.memory_usage(index=True).sum())
+        return CacheEntry(frame, min(s for s, _ in ranges), max(e for _, e in ranges), refreshed_at, nbytes)
+
+    def _store(self, symbol, entry):
+        old = self._entries.pop(symbol, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[symbol] = entry
+        self._bytes += entry.nbytes
+        # Evict least recently used entries, but always keep the one just stored
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self._counters['evictions'] += 1
@@ -0,0 +1,97 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from options import DEFAULT_RENDER, DOWNSAMPLE_METHODS, RenderOptions
+
+
+def minmax_indices(y, n_out):
+    """
+    Indices of the minimum and maximum of each of n_out // 2 equal buckets, plus both ends
+    """
+    n = len(y)
+    buckets = max(1, n_out // 2 - 1)
+    edges = np.linspace(0, n, buckets + 1).astype('int64')
+    starts = edges[:-1][np.diff(edges) > 0]
+    bucket_of = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+    picked = [np.array([0, n - 1])]
+    for reduce in (np.fmin, np.fmax):
+        extreme = reduce.reduceat(y, starts)
+        hits = np.flatnonzero(y == extreme[bucket_of])
+        # First hit in each bucket
+        _, first = np.unique(bucket_of[hits], return_index=True)
+        picked.append(hits[first])
+    return np.unique(np.concatenate(picked))
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of n_out points that keep the visual shape of y
+    """
+    n = len(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype('int64')
+    picked = np.empty(n_out, dtype='int64')
+    picked[0], picked[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        lo, hi = edges[bucket], max(edges[bucket + 1], edges[bucket] + 1)
+        next_lo, next_hi = hi, max(edges[bucket + 2] if bucket + 2 < len(edges) else n, hi + 1)
+        next_x, next_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        # Twice the area of the triangle (previous point, candidate, next bucket's mean)
+        area = np.abs((x[previous] - next_x) * (y[lo:hi] - y[previous])
+                      - (x[previous] - x[lo:hi]) * (next_y - y[previous]))
+        previous = lo + int(np.nanargmax(area)) if np.isfinite(area).any() else lo
+        picked[bucket + 1] = previous
+    return picked
+
+
+def downsample_indices(x, y, max_points, method='lttb'):
+    """
+    Indices of the points to draw, or None when the trace is already small enough
+    """
+    if not max_points or len(y) <= max_points or max_points < 3:
+        return None
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    if method == 'minmax':
+        return minmax_indices(y, max_points)
+    if method == 'lttb':
+        return lttb_indices(x, y, max_points)
+    raise ValueError(f"Unknown downsampling method '{method}' (choose from {', '.join(DOWNSAMPLE_METHODS)})")
+
+
+def line_trace(x, y, options=DEFAULT_RENDER, text=None, customdata=None, **kwargs):
+    """
+    Line trace (Scatter or Scattergl) with x, y, text and customdata downsampled together
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    keep = downsample_indices(x, y, options.max_points, options.method)
+    if keep is not None:
+        x, y = x[keep], y[keep]
+        text = None if text is None else np.asarray(text)[keep]
+        customdata = None if customdata is None else np.asarray(customdata)[keep]
+    trace = go.Scattergl if options.webgl else go.Scatter
+    return trace(x=x, y=y, text=text, customdata=customdata, **kwargs)
+
+
+def extend_trace(trace, replaced, x, y, text=None, customdata=None):
+    """
+    Drop the last `replaced` points of a line trace and append new ones, in place.
+
+    Downsampling always keeps the last point, so this holds for downsampled traces too;
+    the appended points are drawn as they are until the figure is next built.
+    """
+    keep = len(trace.x) - replaced
+    update = {'x': np.concatenate((np.asarray(trace.x)[:keep], x)), 'y': np.concatenate((np.asarray(trace.y)[:keep], y))}
+    if text is not None:
+        update['text'] = np.concatenate((np.asarray(trace.text)[:keep], text))
+    if customdata is not None:
+        update['customdata'] = np.concatenate((np.asarray(trace.customdata)[:keep], customdata))
+    trace.update(update)
+
+
+def hover_dates(index):
+    """
+    ISO date strings for hover text, built in one vectorized call; pair with %{text|...} formats
+    """
+    return np.datetime_as_string(index.to_numpy(dtype='datetime64[ns]'), unit='D')
@@ -0,0 +1,218 @@
+import base64
+import hashlib
+import html
+import json
+import os
+
+import numpy as np
+import plotly.offline
+from plotly.utils import PlotlyJSONEncoder
+
+ASSET_DIR = 'assets'
+
+# numpy dtypes plotly.js (>= 2.28) decodes natively from {dtype, bdata, shape} typed-array specs
+TYPED_ARRAY_CODES = {
+    'float64': 'f8', 'float32': 'f4',
+    'int32': 'i4', 'int16': 'i2', 'int8': 'i1',
+    'uint32': 'u4', 'uint16': 'u2', 'uint8': 'u1',
+}
+
+# Figures are drawn only when scrolled near, so batch reports with thousands of charts open quickly
+LOADER = """
+(function () {
+    var templates = {};
+    document.querySelectorAll('script[data-template]').forEach(function (node) {
+        templates[node.dataset.template] = JSON.parse(node.textContent);
+    });
+    function draw(div) {
+        var node = document.querySelector('script[data-figure="' + div.id + '"]');
+        var spec = JSON.parse(node.textContent);
+        spec.layout.template = templates[spec.template];
+        Plotly.newPlot(div, spec.data, spec.layout, {responsive: true});
+    }
+    var figures = document.querySelectorAll('div.figure');
+    if (!('IntersectionObserver' in window)) {
+        figures.forEach(draw);
+        return;
+    }
+    var observer = new IntersectionObserver(function (entries) {
+        entries.forEach(function (entry) {
+            if (entry.isIntersecting) {
+                observer.unobserve(entry.target);
+                draw(entry.target);
+            }
+        });
+    }, {rootMargin: '800px'});
+    figures.forEach(function (div) { observer.observe(div); });
+})();
+"""
+
+
+def plotly_asset_name():
+    return f'plotly-{plotly.offline.get_plotlyjs_version()}.min.js'
+
+
+def ensure_plotly_asset(output_dir):
+    """
+    Write plotly.js once into output_dir/assets and return its path
+    """
+    path = os.path.join(output_dir, ASSET_DIR, plotly_asset_name())
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(plotly.offline.get_plotlyjs())
+        os.replace(temporary, path)
+    return path
+
+
+def typed_array(values):
+    """
+    Plotly typed-array spec (base64 bytes) for a numeric numpy array, or a plain list otherwise
+    """
+    if values.dtype.kind == 'i' and values.dtype.itemsize > 4:
+        if values.size == 0 or (values.min() >= np.iinfo('int32').min and values.max() <= np.iinfo('int32').max):
+            values = values.astype('int32')
+        else:
+            values = values.astype('float64')
+    elif values.dtype.kind == 'u' and values.dtype.itemsize > 4:
+        values = values.astype('float64')
+    elif values.dtype.kind == 'b':
+        values = values.astype('uint8')
+    code = TYPED_ARRAY_CODES.get(values.dtype.name)
+    if code is None:
+        return values.tolist()
+    data = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<')).tobytes()
+    spec = {'dtype': code, 'bdata': base64.b64encode(data).decode('ascii')}
+    if values.ndim > 1:
+        spec['shape'] = ','.join(str(n) for n in values.shape)
+    return spec
+
+
+def compact_arrays(value):
+    """
+    Replace every numeric numpy array in a figure dict with a typed-array spec
+    """
+    if isinstance(value, np.ndarray):
+        return typed_array(value)
+    if isinstance(value, dict):
+        return {key: compact_arrays(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [compact_arrays(item) for item in value]
+    return value
+
+
+def script_json(value):
+    """
+    Compact JSON that is safe to embed inside a <script> element
+    """
+    text = json.dumps(value, cls=PlotlyJSONEncoder, separators=(',', ':'))
+    return text.replace('<', '\\u003c')
+
+
+def encode_figure(fig):
+    """
+    (template key, template JSON, figure JSON) for a figure; the template is split out so a page stores it once
+    """
+    spec = fig.to_plotly_json()
+    layout = dict(spec.get('layout', {}))
+    template = script_json(layout.pop('template', {}))
+    key = hashlib.sha1(template.encode('utf-8')).hexdigest()[:12]
+    figure = script_json({'data': compact_arrays(spec.get('data', [])), 'layout': compact_arrays(layout), 'template': key})
+    return key, template, figure
+
+
+class ReportFragment:
+    """
+    Report content built apart from the page it will go into, e.g. in a worker process.
+
+    Has the same write/add_figure interface as ReportBundle and is added to one with
+    ReportBundle.extend; figures are already encoded, so only strings cross processes.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append((text, None))
+
+    def add_figure(self, fig):
+        self.parts.append((None, encode_figure(fig)))
+
+
+class ReportBundle:
+    """
+    One self-contained HTML report holding any number of figures and HTML sections.
+
+    Every bundle in an output directory loads the same local plotly.js asset instead of
+    embedding its own copy, figures are stored as compact JSON with numeric arrays as
+    base64 typed arrays, and each distinct layout template is written once per page.
+    The page is streamed to a temporary file and moved into place on close, so an
+    interrupted run never leaves a half-written report behind.
+    """
+
+    def __init__(self, path, title, style=''):
+        self.path = path
+        directory = os.path.dirname(path) or '.'
+        asset = ensure_plotly_asset(directory)
+        self._temporary = f'{path}.{os.getpid()}.tmp'
+        self._file = open(self._temporary, 'w', encoding='utf-8')
+        self._figures = 0
+        self._templates = set()
+        self.write(
+            '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+            f'<title>{html.escape(title)}</title>\n'
+            f'<style>\n.figure {{ width: 100%; height: 500px; }}\n{style}</style>\n'
+            f'<script src="{os.path.relpath(asset, directory)}"></script>\n'
+            '</head>\n<body>\n'
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def write(self, text):
+        self._file.write(text)
+
+    def add_figure(self, fig):
+        """
+        Append a figure, drawn client-side from its embedded JSON
+        """
+        self._write_figure(*encode_figure(fig))
+
+    def extend(self, fragment):
+        """
+        Append everything a ReportFragment collected
+        """
+        for text, figure in fragment.parts:
+            if figure is None:
+                self.write(text)
+            else:
+                self._write_figure(*figure)
+
+    def _write_figure(self, key, template, figure):
+        if key not in self._templates:
+            self._templates.add(key)
+            self.write(f'<script type="application/json" data-template="{key}">{template}</script>\n')
+        self._figures += 1
+        div_id = f'figure-{self._figures}'
+        self.write(f'<div class="figure" id="{div_id}"></div>\n'
+                   f'<script type="application/json" data-figure="{div_id}">{figure}</script>\n')
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.write(f'<script>{LOADER}</script>\n</body>\n</html>\n')
+        self._file.close()
+        os.replace(self._temporary, self.path)
+
+    def discard(self):
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self._temporary):
+            os.remove(self._temporary)
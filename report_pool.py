@@ -0,0 +1,113 @@
+import contextlib
+import io
+import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+# Only what PeriodAnalysis reads crosses to the workers
+FRAME_DTYPE = np.dtype([('Date', '<i8'), ('Close', '<f8'), ('Volume', '<f8'), ('DollarVolume', '<f8')])
+
+
+def shared_memory_dir():
+    """
+    RAM-backed directory for frame handoff when the system has one, else the default temp dir
+    """
+    return '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else None
+
+
+def save_frame(df, path):
+    """
+    Write a bar frame's dates, Close, Volume and DollarVolume as one flat record array workers can memory-map
+    """
+    records = np.empty(len(df), dtype=FRAME_DTYPE)
+    records['Date'] = df.index.asi8
+    records['Close'] = df['Close'].to_numpy(dtype='float64')
+    records['Volume'] = df['Volume'].to_numpy(dtype='float64')
+    if 'DollarVolume' in df:
+        records['DollarVolume'] = df['DollarVolume'].to_numpy(dtype='float64')
+    else:
+        records['DollarVolume'] = records['Close'] * records['Volume']
+    np.save(path, records)
+
+
+def load_frame(path):
+    """
+    Memory-map a frame written by save_frame
+    """
+    records = np.load(path, mmap_mode='r')
+    index = pd.DatetimeIndex(np.asarray(records['Date']).view('datetime64[ns]'), name='Date')
+    return pd.DataFrame({'Close': records['Close'], 'Volume': records['Volume'], 'DollarVolume': records['DollarVolume']}, index=index)
+
+
+def _run(generate, path, symbol, args, kwargs):
+    # Capture the worker's progress messages so the parent prints them per symbol, not interleaved
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = generate(load_frame(path), symbol, *args, **kwargs)
+    return output.getvalue(), result, kwargs.get('bundle')
+
+
+class ReportPool:
+    """
+    Runs a report function for many symbols across worker processes.
+
+    Each submitted frame is written once to a memory-mapped file (RAM-backed where the
+    system has /dev/shm) and workers map it instead of receiving a pickled DataFrame.
+    `on_done(symbol, output, result, bundle, error)` is called in the parent as each
+    symbol finishes, with the worker's captured printout, the function's return value
+    and the worker's copy of the `bundle` argument.
+    At most `backlog` frames per process wait in flight, so memory stays bounded when
+    downloads outpace the workers.
+    """
+
+    def __init__(self, generate, processes, on_done, backlog=4):
+        self.generate = generate
+        self.on_done = on_done
+        self.limit = max(1, processes) * backlog
+        self._executor = ProcessPoolExecutor(max_workers=processes)
+        self._directory = tempfile.TemporaryDirectory(prefix='dollarstock-', dir=shared_memory_dir())
+        self._pending = {}
+        self._submitted = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.join()
+        self.close(cancel=exc_type is not None)
+
+    def submit(self, df, symbol, *args, **kwargs):
+        while len(self._pending) >= self.limit:
+            self._collect(FIRST_COMPLETED)
+        self._submitted += 1
+        path = os.path.join(self._directory.name, f'{self._submitted}.npy')
+        save_frame(df, path)
+        future = self._executor.submit(_run, self.generate, path, symbol, args, kwargs)
+        self._pending[future] = (symbol, path)
+
+    def join(self):
+        """
+        Wait for every submitted symbol
+        """
+        while self._pending:
+            self._collect(FIRST_COMPLETED)
+
+    def close(self, cancel=False):
+        self._executor.shutdown(wait=True, cancel_futures=cancel)
+        self._directory.cleanup()
+
+    def _collect(self, return_when):
+        done, _ = wait(self._pending, return_when=return_when)
+        for future in done:
+            symbol, path = self._pending.pop(future)
+            os.remove(path)
+            try:
+                output, result, bundle = future.result()
+            except Exception as e:
+                self.on_done(symbol, '', None, None, e)
+            else:
+                self.on_done(symbol, output, result, bundle, None)
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from compact_bars import NS_PER_DAY, BarUniverse
+from liquidity import metrics_at, window_reach
+from options import RANK_COLUMNS
+
+
+class SymbolPanel:
+    """
+    Close and Volume for many symbols as 2-D date x symbol arrays, NaN where a symbol has no bar
+    """
+
+    def __init__(self, dates, symbols, close, volume):
+        self.dates = dates
+        self.symbols = list(symbols)
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def from_bars(cls, bars):
+        """
+        Build a panel from a {symbol: CompactBars} mapping or a BarUniverse.
+
+        Dates are gathered in a day-indexed table rather than sorted, and the arrays are
+        column-major so each symbol's bars land in one contiguous column.
+        """
+        names = bars.symbols if isinstance(bars, BarUniverse) else list(bars)
+        symbols = sorted(symbol for symbol in names if len(bars[symbol]))
+        if not symbols:
+            return cls(pd.DatetimeIndex([], name='Date'), [], np.empty((0, 0)), np.empty((0, 0)))
+        first = min(int(bars[s].days[0]) for s in symbols)
+        held = np.zeros(max(int(bars[s].days[-1]) for s in symbols) - first + 1, dtype=bool)
+        for symbol in symbols:
+            held[bars[symbol].days - first] = True
+        days = np.flatnonzero(held) + first
+        # Row of every day that has a bar
+        position = np.cumsum(held) - 1
+        close = np.full((len(days), len(symbols)), np.nan, order='F')
+        volume = np.full((len(days), len(symbols)), np.nan, order='F')
+        for column, symbol in enumerate(symbols):
+            compact = bars[symbol]
+            rows = position[compact.days - first]
+            close[rows, column] = compact.close
+            volume[rows, column] = compact.volume
+        dates = pd.DatetimeIndex((days * NS_PER_DAY).astype('datetime64[ns]'), name='Date')
+        return cls(dates, symbols, close, volume)
+
+
+def period_totals(panel, periods):
+    """
+    Days, Volume, DollarVolume and AveragePrice of every symbol in each inclusive period,
+    each array with one leading entry per period.
+
+    Each period is a contiguous block of panel rows, so its totals are NaN-skipping sums
+    over that block alone; with only a few periods that reads far less than cumulative
+    sums over the whole panel would.
+    """
+    lo = panel.dates.searchsorted(pd.DatetimeIndex([pd.Timestamp(start) for start, _ in periods]), side='left')
+    hi = np.maximum(panel.dates.searchsorted(pd.DatetimeIndex([pd.Timestamp(end) for _, end in periods]), side='right'), lo)
+    totals = {name: np.empty((len(periods), len(panel.symbols))) for name in ('Days', 'Volume', 'DollarVolume', 'Close')}
+    for i, (start, stop) in enumerate(zip(lo, hi)):
+        close, volume = panel.close[start:stop], panel.volume[start:stop]
+        priced, traded = ~np.isnan(close), ~np.isnan(volume)
+        totals['Days'][i] = np.count_nonzero(priced, axis=0)
+        totals['Close'][i] = np.sum(close, axis=0, where=priced)
+        totals['Volume'][i] = np.sum(volume, axis=0, where=traded)
+        totals['DollarVolume'][i] = np.sum(close * volume, axis=0, where=priced & traded)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        totals['AveragePrice'] = np.where(totals['Days'] > 0, totals.pop('Close') / totals['Days'], np.nan)
+    totals['Days'] = totals['Days'].astype('int64')
+    return totals
+
+
+def screen(panel, periods, rank_by='dollar_volume', top=100, min_dollar_volume=0.0):
+    """
+    Rank the universe by the change from the first period to the last in one vectorized pass.
+
+    Computes, for every symbol at once, the per-period totals generate_summary_table reports
+    (total volume, average price, total dollar volume) and the percentage change of each
+    between the first and last periods, plus the 20- and 60-day ADV and the dollar-volume
+    z-score on the last panel date of the last period. Symbols with no bars in either period,
+    or with less than `min_dollar_volume` in the first, are dropped before taking the `top`
+    by `rank_by`.
+    """
+    if rank_by not in RANK_COLUMNS:
+        raise ValueError(f"Unknown ranking '{rank_by}' (choose from {', '.join(RANK_COLUMNS)})")
+    totals = period_totals(panel, periods)
+
+    columns = {}
+    for i in range(len(periods)):
+        columns[f'Period {i + 1} Total Volume'] = totals['Volume'][i]
+        columns[f'Period {i + 1} Average Price'] = totals['AveragePrice'][i]
+        columns[f'Period {i + 1} Total Dollar Volume'] = totals['DollarVolume'][i]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        columns['Volume Change %'] = (totals['Volume'][-1] / totals['Volume'][0] - 1.0) * 100.0
+        columns['Average Price Change %'] = (totals['AveragePrice'][-1] / totals['AveragePrice'][0] - 1.0) * 100.0
+        columns['Dollar Volume Change %'] = (totals['DollarVolume'][-1] / totals['DollarVolume'][0] - 1.0) * 100.0
+    # Only the rows the windows reach back over are read, for every symbol at once
+    row = int(panel.dates.searchsorted(pd.Timestamp(periods[-1][1]), side='right')) - 1
+    first = max(row - window_reach(), 0)
+    volume = panel.volume[first:row + 1]
+    liquidity = metrics_at(volume, panel.close[first:row + 1] * volume, row - first) if row >= 0 else {}
+    missing = np.full(len(panel.symbols), np.nan)
+    columns['ADV 20'] = liquidity.get('ADV20', missing)
+    columns['ADV 60'] = liquidity.get('ADV60', missing)
+    columns['Dollar Volume Z'] = liquidity.get('DollarVolumeZ', missing)
+    results = pd.DataFrame(columns, index=pd.Index(panel.symbols, name='Symbol'))
+
+    keep = (totals['Days'][0] > 0) & (totals['Days'][-1] > 0) & (totals['DollarVolume'][0] >= min_dollar_volume)
+    results = results[keep & np.isfinite(results[RANK_COLUMNS[rank_by]].to_numpy())]
+    return results.sort_values(RANK_COLUMNS[rank_by], ascending=False).head(top)
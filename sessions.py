@@ -0,0 +1,129 @@
+import calendar
+import functools
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (MO, AbstractHolidayCalendar, GoodFriday, Holiday, USLaborDay, USMemorialDay, USPresidentsDay,
+                                    USThanksgivingDay, nearest_workday, sunday_to_monday)
+
+from compact_bars import NS_PER_DAY
+
+# Exchange calendars are built for whole blocks of this many years, so nearby histories share one
+CALENDAR_BLOCK_YEARS = 25
+
+
+class ExchangeHolidays(AbstractHolidayCalendar):
+    """
+    Full-day US equity market holidays under the current NYSE rules, plus the one-off closures since 2001
+    """
+
+    rules = [
+        # A New Year's Day on Saturday isn't made up on the Friday before
+        Holiday('New Year\'s Day', month=1, day=1, observance=sunday_to_monday),
+        Holiday('Martin Luther King Jr. Day', month=1, day=1, start_date='1998-01-01', offset=pd.DateOffset(weekday=MO(3))),
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01', observance=nearest_workday),
+        Holiday('Independence Day', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas Day', month=12, day=25, observance=nearest_workday),
+        # One-off closures
+        *(Holiday('September 11', year=2001, month=9, day=day) for day in (11, 12, 13, 14)),
+        Holiday('Reagan Day of Mourning', year=2004, month=6, day=11),
+        Holiday('Ford Day of Mourning', year=2007, month=1, day=2),
+        *(Holiday('Hurricane Sandy', year=2012, month=10, day=day) for day in (29, 30)),
+        Holiday('Bush Day of Mourning', year=2018, month=12, day=5),
+        Holiday('Carter Day of Mourning', year=2025, month=1, day=9),
+    ]
+
+
+def day_numbers(dates):
+    """
+    Days since 1970-01-01 of a DatetimeIndex, array of dates or single date
+    """
+    return pd.DatetimeIndex(np.atleast_1d(dates)).normalize().asi8 // NS_PER_DAY
+
+
+class SessionCalendar:
+    """
+    Trading sessions as a dense table from every calendar day to a session ordinal.
+
+    Each day in the table's range maps to the number of sessions before it: a session's own
+    ordinal, or the next session's for a weekend or holiday. So bars map to ordinals in one
+    array lookup, and the trading days between two dates are the difference of their ordinals.
+    """
+
+    def __init__(self, first_day, is_session):
+        self.first_day = int(first_day)
+        self.is_session = np.asarray(is_session, dtype=bool)
+        self._ordinal = np.cumsum(self.is_session) - self.is_session
+
+    @classmethod
+    def exchange(cls, first_year, last_year):
+        """
+        Weekdays that aren't ExchangeHolidays from January 1 of first_year to December 31 of last_year
+        """
+        start, end = pd.Timestamp(first_year, 1, 1), pd.Timestamp(last_year, 12, 31)
+        days = np.arange(day_numbers(start)[0], day_numbers(end)[0] + 1)
+        holidays = ExchangeHolidays().holidays(start, end).to_numpy(dtype='datetime64[D]')
+        return cls(days[0], np.is_busday(days.astype('datetime64[D]'), holidays=holidays))
+
+    def covers(self, days):
+        """
+        Whether every day is in range and is a session
+        """
+        offsets = np.asarray(days) - self.first_day
+        if not len(offsets):
+            return True
+        if offsets.min() < 0 or offsets.max() >= len(self.is_session):
+            return False
+        return bool(self.is_session[offsets].all())
+
+    def with_sessions(self, days):
+        """
+        A copy that also counts `days` as sessions, for bars on days the rules call closed
+        """
+        is_session = self.is_session.copy()
+        is_session[np.asarray(days) - self.first_day] = True
+        return SessionCalendar(self.first_day, is_session)
+
+    def ordinals(self, dates):
+        """
+        Session ordinal of every date (the next session's for closed days), in one lookup
+        """
+        return self._ordinal[day_numbers(dates) - self.first_day]
+
+    def offsets(self, dates, start):
+        """
+        Trading days from start's session to each date; the first session on or after start is 0
+        """
+        return self.ordinals(dates) - self.ordinals(start)[0]
+
+    def month_ticks(self, start, end):
+        """
+        Tick positions (trading days since start) and month names for start and each month beginning up to end
+        """
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        dates = pd.DatetimeIndex([start]).append(pd.date_range(start + pd.Timedelta(days=1), end, freq='MS'))
+        ticks = self.offsets(dates, start)
+        # Months starting over a weekend or holiday share a session with the tick before; the later month keeps it
+        keep = np.append(ticks[1:] != ticks[:-1], True)
+        return ticks[keep], np.array(calendar.month_name)[dates.month[keep]]
+
+
+@functools.lru_cache(maxsize=8)
+def exchange_calendar(first_year, last_year):
+    return SessionCalendar.exchange(first_year, last_year)
+
+
+def session_calendar(index, start, end):
+    """
+    Exchange calendar covering start..end and every bar in index, with any bar on a closed day counted as a session
+    """
+    days = day_numbers(index)
+    first = min(pd.Timestamp(start).year, pd.Timestamp(days.min() * NS_PER_DAY).year if len(days) else 9999)
+    last = max(pd.Timestamp(end).year, pd.Timestamp(days.max() * NS_PER_DAY).year if len(days) else 0)
+    sessions = exchange_calendar(first - first % CALENDAR_BLOCK_YEARS, last - last % CALENDAR_BLOCK_YEARS + CALENDAR_BLOCK_YEARS - 1)
+    return sessions if sessions.covers(days) else sessions.with_sessions(days)
@@ -1,420 +1,840 @@
-import yfinance as yf
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import pandas as pd
+from datetime import datetime
 import argparse
+import os
 import calendar
+import contextlib
+import functools
+import importlib.util
+from batch import TokenBucket, fetch_many, make_session, rate_limited, read_symbols_file
+from options import DEFAULT_RENDER, DOWNSAMPLE_METHODS, INTRADAY_INTERVALS, PROVIDER_NAMES, RANK_COLUMNS, SUMMARY_FORMATS, RenderOptions
+from timing import Profiler, profiling, span, timed
+# pandas, plotly and the modules built on them are imported by the functions that use
+# them, so --help, argument errors and --summary-only runs start without loading them
 
-def get_stock_data(symbol, start_date, end_date):
+def get_stock_data(symbol, start_date, end_date, provider=None, store=None, interval='1d', chunk_days=None, fetch=None):
     """
-    Fetch stock data from Yahoo Finance
+    Fetch normalized daily bars through the local bar store, or straight from the provider without one.
+
+    Intraday intervals are fetched a chunk at a time (through `fetch` if given) and
+    rolled up to daily bars with a summed DollarVolume as they arrive.
     """
+    from intraday import intraday_daily_bars
+    from providers import YFinanceProvider
     try:
-        stock = yf.Ticker(symbol)
-        df = stock.history(start=start_date, end=end_date)
-        return df
+        provider = provider or YFinanceProvider()
+        if interval != '1d':
+            return intraday_daily_bars(provider, symbol, start_date, end_date, interval, chunk_days=chunk_days, fetch=fetch)
+        if store is not None:
+            return store.get_bars(symbol, start_date, end_date)
+        return provider.fetch(symbol, start_date, end_date)
     except Exception as e:
         print(f"Error fetching data: {e}")
         return None
 
-def create_volume_comparison(df, symbol, first_period_start, first_period_end, second_period_start, second_period_end):
+def volume_comparison_figure(analysis, render=DEFAULT_RENDER):
     """
-    Create volume comparison graph for two specific periods
+    Daily volume of each period, overlaid by trading days since the period start
     """
-    # Create figure
-    fig = go.Figure()
-    
-    # Colors from the reference image
-    colors = {
-        f'Period 1 ({first_period_start.strftime("%Y-%m-%d")} to {first_period_end.strftime("%Y-%m-%d")})': '#000000',
-        f'Period 2 ({second_period_start.strftime("%Y-%m-%d")} to {second_period_end.strftime("%Y-%m-%d")})': '#40B4A6'
-    }
-    
-    # Function to calculate days since period start
-    def days_since_start(date, start_date):
-        return (date.date() - start_date.date()).days
-    
-    # Add traces for each period
-    periods = [
-        (f'Period 1 ({first_period_start.strftime("%Y-%m-%d")} to {first_period_end.strftime("%Y-%m-%d")})', first_period_start, first_period_end),
-        (f'Period 2 ({second_period_start.strftime("%Y-%m-%d")} to {second_period_end.strftime("%Y-%m-%d")})', second_period_start, second_period_end)
-    ]
-    
-    for period_name, start_date, end_date in periods:
-        period_data = df[(df.index >= start_date) & (df.index <= end_date)]
-        if not period_data.empty:
-            # Calculate days since period start
-            x_values = [days_since_start(d, start_date) for d in period_data.index]
-            
-            fig.add_trace(go.Scatter(
-                x=x_values,
-                y=period_data[('Volume', symbol)],
-                name=period_name,
-                mode='lines',
-                line=dict(color=colors[period_name]),
-                hovertemplate='%{text}<br>Volume: %{y:,.0f}<extra></extra>',
-                text=[d.strftime('%B %d, %Y') for d in period_data.index],
-            ))
-    
-    # Create month labels for x-axis
-    month_ticks = []
-    month_labels = []
-    if len(periods[0]) > 0:
-        current_date = periods[0][1]
-        end_date = periods[0][2]
-        while current_date <= end_date:
-            days = days_since_start(current_date, periods[0][1])
-            month_ticks.append(days)
-            month_labels.append(current_date.strftime('%B'))
-            # Move to next month
-            next_month = current_date.month + 1 if current_date.month < 12 else 1
-            next_year = current_date.year + 1 if current_date.month == 12 else current_date.year
-            current_date = datetime(next_year, next_month, 1)
-    
-    # Update layout
-    fig.update_layout(
-        title=f'{symbol} - Trading Volume Comparison',
-        xaxis_title='Days Since Period Start',
-        yaxis_title='Volume',
-        hovermode='x unified',
-        xaxis=dict(
-            ticktext=month_labels,
-            tickvals=month_ticks,
-            tickangle=45,
-            showgrid=True,
-        ),
-        yaxis=dict(
-            tickformat=',d',
-            showgrid=True,
-        ),
-        showlegend=True,
-        plot_bgcolor='white',
-    )
+    import plotly.graph_objects as go
+    from rendering import hover_dates, line_trace
+    with span('compute') as record:
+        daily = [analysis.daily(i) for i in range(len(analysis.periods))]
+        sessions = [analysis.sessions(i) for i in range(len(analysis.periods))]
+        record.rows = sum(len(period_data) for period_data in daily)
+    
+    with span('render'):
+        fig = go.Figure()
+        
+        for period, period_data, period_sessions in zip(analysis.periods, daily, sessions):
+            if not period_data.empty:
+                fig.add_trace(line_trace(
+                    period_sessions,
+                    period_data['Volume'].to_numpy(),
+                    render,
+                    name=period.name,
+                    mode='lines',
+                    line=dict(color=period.color),
+                    hovertemplate='%{text|%B %d, %Y}<br>Volume: %{y:,.0f}<extra></extra>',
+                    text=hover_dates(period_data.index),
+                ))
+        
+        # Create month labels for x-axis
+        tickvals, ticktext = analysis.month_ticks(0)
+        
+        # Update layout
+        fig.update_layout(
+            title=f'{analysis.symbol} - Trading Volume Comparison',
+            xaxis_title='Trading Days Since Period Start',
+            yaxis_title='Volume',
+            hovermode='x unified',
+            xaxis=dict(
+                ticktext=ticktext,
+                tickvals=tickvals,
+                tickangle=45,
+                showgrid=True,
+            ),
+            yaxis=dict(
+                tickformat=',d',
+                showgrid=True,
+            ),
+            showlegend=True,
+            plot_bgcolor='white',
+        )
+    return fig
+
+def changed_rows(analysis, changes):
+    """
+    (period index, daily rows, sessions, replaced) for the last rows of each period analysis.extend changed
+    """
+    for i, (replaced, added) in changes.items():
+        count = replaced + added
+        yield i, analysis.daily(i).iloc[-count:], analysis.sessions(i)[-count:], replaced
+
+def find_trace(fig, name):
+    """
+    The trace called name, or None
+    """
+    traces = list(fig.select_traces(selector=dict(name=name)))
+    return traces[0] if traces else None
+
+def update_volume_figure(fig, analysis, changes):
+    """
+    Patch a volume comparison figure in place with the rows analysis.extend changed; False
+    when a period has no trace yet and the figure needs building again
+    """
+    from rendering import extend_trace, hover_dates
+    with span('patch') as record:
+        record.rows = 0
+        for i, rows, days, replaced in changed_rows(analysis, changes):
+            trace = find_trace(fig, analysis.periods[i].name)
+            if trace is None:
+                return False
+            extend_trace(trace, replaced, days, rows['Volume'].to_numpy(), text=hover_dates(rows.index))
+            record.rows += len(rows)
+    return True
+
+@span('volume_comparison')
+def create_volume_comparison(analysis, render=DEFAULT_RENDER, output_dir='.'):
+    """
+    Create volume comparison graph for the analysis periods
+    """
+    symbol = analysis.symbol
+    fig = volume_comparison_figure(analysis, render)
     
     # Save the plot
-    fig.write_html(f'{symbol}_volume_comparison.html')
-    print(f"Graph has been saved as {symbol}_volume_comparison.html")
+    path = os.path.join(output_dir, f'{symbol}_volume_comparison.html')
+    with span('write'):
+        fig.write_html(path)
+    print(f"Graph has been saved as {path}")
     
     # Print date range information
     print("\nData range information:")
-    for period_name, start_date, end_date in periods:
-        period_data = df[(df.index >= start_date) & (df.index <= end_date)]
+    for i, period in enumerate(analysis.periods):
+        period_data = analysis.daily(i)
         if not period_data.empty:
-            print(f"{period_name}: {period_data.index[0]} to {period_data.index[-1]}")
+            print(f"{period.name}: {period_data.index[0]} to {period_data.index[-1]}")
+    return path
 
-def create_dollar_volume_comparison(df, symbol, first_period_start, first_period_end, second_period_start, second_period_end):
+def dollar_volume_comparison_figure(analysis, render=DEFAULT_RENDER):
     """
-    Create dollar volume comparison graph for two specific periods
+    Daily dollar volume of each period, overlaid by trading days since the period start
     """
-    # Create figure
-    fig = go.Figure()
-    
-    # Colors from the reference image
-    colors = {
-        f'Period 1 ({first_period_start.strftime("%Y-%m-%d")} to {first_period_end.strftime("%Y-%m-%d")})': '#000000',
-        f'Period 2 ({second_period_start.strftime("%Y-%m-%d")} to {second_period_end.strftime("%Y-%m-%d")})': '#40B4A6'
-    }
-    
-    # Function to calculate days since period start
-    def days_since_start(date, start_date):
-        return (date.date() - start_date.date()).days
-    
-    # Calculate dollar volume
-    dollar_volume = df[('Close', symbol)] * df[('Volume', symbol)]
-    df_with_dollar = df.copy()
-    df_with_dollar[('DollarVolume', symbol)] = dollar_volume
-    
-    # Add traces for each period
-    periods = [
-        (f'Period 1 ({first_period_start.strftime("%Y-%m-%d")} to {first_period_end.strftime("%Y-%m-%d")})', first_period_start, first_period_end),
-        (f'Period 2 ({second_period_start.strftime("%Y-%m-%d")} to {second_period_end.strftime("%Y-%m-%d")})', second_period_start, second_period_end)
-    ]
-    
-    for period_name, start_date, end_date in periods:
-        period_data = df_with_dollar[(df_with_dollar.index >= start_date) & (df_with_dollar.index <= end_date)]
-        if not period_data.empty:
-            # Calculate days since period start
-            x_values = [days_since_start(d, start_date) for d in period_data.index]
-            
-            fig.add_trace(go.Scatter(
-                x=x_values,
-                y=period_data[('DollarVolume', symbol)],
-                name=period_name,
-                mode='lines',
-                line=dict(color=colors[period_name]),
-                hovertemplate='%{text}<br>Dollar Volume: $%{y:,.2f}<br>Price: $%{customdata[0]:.2f}<br>Volume: %{customdata[1]:,.0f}<extra></extra>',
-                text=[d.strftime('%B %d, %Y') for d in period_data.index],
-                customdata=list(zip(period_data[('Close', symbol)], period_data[('Volume', symbol)]))
-            ))
-    
-    # Create month labels for x-axis
-    month_ticks = []
-    month_labels = []
-    if len(periods[0]) > 0:
-        current_date = periods[0][1]
-        end_date = periods[0][2]
-        while current_date <= end_date:
-            days = days_since_start(current_date, periods[0][1])
-            month_ticks.append(days)
-            month_labels.append(current_date.strftime('%B'))
-            # Move to next month
-            next_month = current_date.month + 1 if current_date.month < 12 else 1
-            next_year = current_date.year + 1 if current_date.month == 12 else current_date.year
-            current_date = datetime(next_year, next_month, 1)
-    
-    # Update layout
-    fig.update_layout(
-        title=f'{symbol} - Trading Dollar Volume Comparison',
-        xaxis_title='Days Since Period Start',
-        yaxis_title='Dollar Volume ($)',
-        hovermode='x unified',
-        xaxis=dict(
-            ticktext=month_labels,
-            tickvals=month_ticks,
-            tickangle=45,
-            showgrid=True,
-        ),
-        yaxis=dict(
-            tickformat='$,.0f',
-            showgrid=True,
-        ),
-        showlegend=True,
-        plot_bgcolor='white',
-    )
+    import numpy as np
+    import plotly.graph_objects as go
+    from liquidity import ADV_WINDOWS, VWAP_WINDOW
+    from rendering import hover_dates, line_trace
+    with span('compute') as record:
+        daily = [analysis.daily(i) for i in range(len(analysis.periods))]
+        liquidity = [analysis.liquidity_daily(i) for i in range(len(analysis.periods))]
+        sessions = [analysis.sessions(i) for i in range(len(analysis.periods))]
+        record.rows = sum(len(period_data) for period_data in daily)
+    
+    with span('render'):
+        fig = go.Figure()
+        
+        for period, period_data, period_liquidity, days in zip(analysis.periods, daily, liquidity, sessions):
+            if not period_data.empty:
+                fig.add_trace(line_trace(
+                    days,
+                    period_data['DollarVolume'].to_numpy(),
+                    render,
+                    name=period.name,
+                    legendgroup=period.name,
+                    mode='lines',
+                    line=dict(color=period.color),
+                    hovertemplate=('%{text|%B %d, %Y}<br>Dollar Volume: $%{y:,.2f}<br>Price: $%{customdata[0]:.2f}<br>Volume: %{customdata[1]:,.0f}'
+                                   f'<br>VWAP {VWAP_WINDOW}: $%{{customdata[2]:.2f}}<br>Z-Score: %{{customdata[3]:+.2f}}<extra></extra>'),
+                    text=hover_dates(period_data.index),
+                    customdata=np.column_stack((
+                        period_data['Close'].to_numpy(),
+                        period_data['Volume'].to_numpy(),
+                        period_liquidity[f'VWAP{VWAP_WINDOW}'].to_numpy(),
+                        period_liquidity['DollarVolumeZ'].to_numpy(),
+                    )),
+                ))
+                # Rolling averages follow their period's color; all but the shortest start hidden
+                for n, window in enumerate(ADV_WINDOWS):
+                    fig.add_trace(line_trace(
+                        days,
+                        period_liquidity[f'ADV{window}'].to_numpy(),
+                        render,
+                        name=f'{period.name} ADV {window}',
+                        legendgroup=period.name,
+                        mode='lines',
+                        line=dict(color=period.color, dash='dot' if n == 0 else 'dash', width=1),
+                        visible=True if n == 0 else 'legendonly',
+                        hovertemplate=f'ADV {window}: $%{{y:,.2f}}<extra></extra>',
+                    ))
+        
+        # Create month labels for x-axis
+        tickvals, ticktext = analysis.month_ticks(0)
+        
+        # Update layout
+        fig.update_layout(
+            title=f'{analysis.symbol} - Trading Dollar Volume Comparison',
+            xaxis_title='Trading Days Since Period Start',
+            yaxis_title='Dollar Volume ($)',
+            hovermode='x unified',
+            xaxis=dict(
+                ticktext=ticktext,
+                tickvals=tickvals,
+                tickangle=45,
+                showgrid=True,
+            ),
+            yaxis=dict(
+                tickformat='$,.0f',
+                showgrid=True,
+            ),
+            showlegend=True,
+            plot_bgcolor='white',
+        )
+    return fig
+
+def update_dollar_volume_figure(fig, analysis, changes):
+    """
+    Patch a dollar volume comparison figure and its ADV lines in place with the rows
+    analysis.extend changed; False when a trace is missing and the figure needs building again
+    """
+    import numpy as np
+    from liquidity import ADV_WINDOWS, VWAP_WINDOW
+    from rendering import extend_trace, hover_dates
+    with span('patch') as record:
+        record.rows = 0
+        for i, rows, days, replaced in changed_rows(analysis, changes):
+            period = analysis.periods[i]
+            liquidity = analysis.liquidity_daily(i).iloc[-len(rows):]
+            trace = find_trace(fig, period.name)
+            averages = [find_trace(fig, f'{period.name} ADV {window}') for window in ADV_WINDOWS]
+            if trace is None or None in averages:
+                return False
+            extend_trace(trace, replaced, days, rows['DollarVolume'].to_numpy(), text=hover_dates(rows.index),
+                         customdata=np.column_stack((
+                             rows['Close'].to_numpy(),
+                             rows['Volume'].to_numpy(),
+                             liquidity[f'VWAP{VWAP_WINDOW}'].to_numpy(),
+                             liquidity['DollarVolumeZ'].to_numpy(),
+                         )))
+            for average, window in zip(averages, ADV_WINDOWS):
+                extend_trace(average, replaced, days, liquidity[f'ADV{window}'].to_numpy())
+            record.rows += len(rows)
+    return True
+
+@span('dollar_volume_comparison')
+def create_dollar_volume_comparison(analysis, render=DEFAULT_RENDER, output_dir='.'):
+    """
+    Create dollar volume comparison graph for the analysis periods
+    """
+    symbol = analysis.symbol
+    fig = dollar_volume_comparison_figure(analysis, render)
     
     # Save the plot
-    fig.write_html(f'{symbol}_dollar_volume_comparison.html')
-    print(f"Dollar volume graph has been saved as {symbol}_dollar_volume_comparison.html")
+    path = os.path.join(output_dir, f'{symbol}_dollar_volume_comparison.html')
+    with span('write'):
+        fig.write_html(path)
+    print(f"Dollar volume graph has been saved as {path}")
+    return path
 
-def create_monthly_dollar_volume_comparison(df, symbol, first_period_start, first_period_end, second_period_start, second_period_end):
+def monthly_dollar_volume_figure(analysis):
     """
-    Create monthly aggregated dollar volume comparison for two specific periods
+    Monthly dollar volume of each period as grouped bars
     """
-    # Calculate dollar volume
-    dollar_volume = df[('Close', symbol)] * df[('Volume', symbol)]
-    df_with_dollar = df.copy()
-    df_with_dollar[('DollarVolume', symbol)] = dollar_volume
-    
-    # Create monthly aggregation for each period
-    periods = [
-        (f'Period 1 ({first_period_start.strftime("%Y-%m-%d")} to {first_period_end.strftime("%Y-%m-%d")})', first_period_start, first_period_end),
-        (f'Period 2 ({second_period_start.strftime("%Y-%m-%d")} to {second_period_end.strftime("%Y-%m-%d")})', second_period_start, second_period_end)
-    ]
-    
-    # Create figure
-    fig = go.Figure()
-    
-    # Colors from the reference image
-    colors = {
-        f'Period 1 ({first_period_start.strftime("%Y-%m-%d")} to {first_period_end.strftime("%Y-%m-%d")})': '#000000',
-        f'Period 2 ({second_period_start.strftime("%Y-%m-%d")} to {second_period_end.strftime("%Y-%m-%d")})': '#40B4A6'
-    }
+    import plotly.graph_objects as go
+    with span('compute') as record:
+        monthly = [analysis.monthly(i) for i in range(len(analysis.periods))]
+        record.rows = sum(len(monthly_data) for monthly_data in monthly)
     
-    for period_name, start_date, end_date in periods:
-        period_data = df_with_dollar[(df_with_dollar.index >= start_date) & (df_with_dollar.index <= end_date)]
-        if not period_data.empty:
-            monthly_data = period_data.groupby([period_data.index.year, period_data.index.month]).agg({('DollarVolume', symbol): 'sum'})
-            months = [calendar.month_name[m] for y, m in monthly_data.index]
+    with span('render'):
+        fig = go.Figure()
+        
+        for period, monthly_data in zip(analysis.periods, monthly):
+            if not monthly_data.empty:
+                months = [calendar.month_name[m] for m in monthly_data['Month']]
             
-            fig.add_trace(go.Bar(
-                x=months,
-                y=monthly_data[('DollarVolume', symbol)].values,
-                name=period_name,
-                marker_color=colors[period_name],
-                hovertemplate='%{x}<br>Dollar Volume: $%{y:,.2f}<extra></extra>',
-            ))
-    
-    # Update layout
-    fig.update_layout(
-        title=f'{symbol} - Monthly Trading Dollar Volume Comparison',
-        xaxis_title='Month',
-        yaxis_title='Dollar Volume ($)',
-        hovermode='x unified',
-        barmode='group',
-        yaxis=dict(
-            tickformat='$,.0f',
-            showgrid=True,
-        ),
-        showlegend=True,
-        legend=dict(
-            yanchor="top",
-            y=0.99,
-            xanchor="left",
-            x=0.01
-        ),
-        plot_bgcolor='white',
-    )
+                fig.add_trace(go.Bar(
+                    x=months,
+                    y=monthly_data['DollarVolume'].to_numpy(),
+                    name=period.name,
+                    marker_color=period.color,
+                    hovertemplate='%{x}<br>Dollar Volume: $%{y:,.2f}<extra></extra>',
+                ))
+        
+        # Update layout
+        fig.update_layout(
+            title=f'{analysis.symbol} - Monthly Trading Dollar Volume Comparison',
+            xaxis_title='Month',
+            yaxis_title='Dollar Volume ($)',
+            hovermode='x unified',
+            barmode='group',
+            yaxis=dict(
+                tickformat='$,.0f',
+                showgrid=True,
+            ),
+            showlegend=True,
+            legend=dict(
+                yanchor="top",
+                y=0.99,
+                xanchor="left",
+                x=0.01
+            ),
+            plot_bgcolor='white',
+        )
+    return fig
+
+def update_monthly_dollar_volume_figure(fig, analysis, changes):
+    """
+    Replace the bars of each period analysis.extend changed with its updated months; False
+    when a period has no trace yet and the figure needs building again
+    """
+    with span('patch') as record:
+        record.rows = 0
+        for i in changes:
+            period, monthly_data = analysis.periods[i], analysis.monthly(i)
+            trace = find_trace(fig, period.name)
+            if trace is None:
+                return False
+            trace.update(x=[calendar.month_name[m] for m in monthly_data['Month']], y=monthly_data['DollarVolume'].to_numpy())
+            record.rows += len(monthly_data)
+    return True
+
+@span('monthly_dollar_volume')
+def create_monthly_dollar_volume_comparison(analysis, output_dir='.'):
+    """
+    Create monthly aggregated dollar volume comparison for the analysis periods
+    """
+    symbol = analysis.symbol
+    fig = monthly_dollar_volume_figure(analysis)
     
     # Save the plot
-    fig.write_html(f'{symbol}_monthly_dollar_volume_comparison.html')
-    print(f"Monthly dollar volume graph has been saved as {symbol}_monthly_dollar_volume_comparison.html")
+    path = os.path.join(output_dir, f'{symbol}_monthly_dollar_volume_comparison.html')
+    with span('write'):
+        fig.write_html(path)
+    print(f"Monthly dollar volume graph has been saved as {path}")
+    return path
 
-def generate_summary_table(df, symbol, first_period_start, first_period_end, second_period_start, second_period_end):
+@span('summary_table')
+def generate_summary_table(analysis, output_dir='.'):
     """
-    Generate summary statistics for two specific periods
+    Generate summary statistics for the analysis periods
     """
-    # Calculate dollar volume
-    dollar_volume = df[('Close', symbol)] * df[('Volume', symbol)]
-    df_with_dollar = df.copy()
-    df_with_dollar[('DollarVolume', symbol)] = dollar_volume
-    
-    periods = [
-        (f'Period 1 ({first_period_start.strftime("%Y-%m-%d")} to {first_period_end.strftime("%Y-%m-%d")})', first_period_start, first_period_end),
-        (f'Period 2 ({second_period_start.strftime("%Y-%m-%d")} to {second_period_end.strftime("%Y-%m-%d")})', second_period_start, second_period_end)
+    from summary_tables import write_summary_page
+    path = os.path.join(output_dir, f'{analysis.symbol}_trading_summary.html')
+    with span('write'):
+        write_summary_page(path, analysis)
+    print(f"Trading summary has been saved as {path}")
+    return path
+
+@span('window_sweep')
+def write_window_sweep(analysis, start_date, end_date, freq, output_dir='.'):
+    """
+    Write stats for every calendar window and the pairwise dollar volume change between them
+    """
+    from analysis import pairwise_change
+    symbol = analysis.symbol
+    with span('compute') as record:
+        windows = analysis.window_sweep(start_date, end_date, freq)
+        labels = windows['Start'].dt.strftime('%Y-%m-%d')
+        changes = pairwise_change(windows['DollarVolume'], labels)
+        record.rows = len(windows)
+    sweep_path = os.path.join(output_dir, f'{symbol}_{freq}_sweep.csv')
+    changes_path = os.path.join(output_dir, f'{symbol}_{freq}_dollar_volume_changes.csv')
+    with span('write'):
+        windows.to_csv(sweep_path, index=False, date_format='%Y-%m-%d')
+        changes.to_csv(changes_path, float_format='%.2f')
+    print(f"{len(windows)} {freq} windows have been saved as {sweep_path} and {changes_path}")
+    return [sweep_path, changes_path]
+
+@span('aligned')
+def write_aligned(analysis, output_dir='.'):
+    """
+    Write every period's daily dollar volume side by side by trading day, with each period's difference from period 1
+    """
+    with span('compute') as record:
+        aligned = analysis.aligned('DollarVolume')
+        record.rows = len(aligned)
+    path = os.path.join(output_dir, f'{analysis.symbol}_aligned_dollar_volume.csv')
+    with span('write'):
+        aligned.to_csv(path, date_format='%Y-%m-%d', float_format='%.2f')
+    print(f"{len(aligned)} trading days of aligned dollar volume have been saved as {path}")
+    return path
+
+def add_symbol_report(bundle, analysis, render=DEFAULT_RENDER):
+    """
+    Append one symbol's three charts and summary tables to a report bundle
+    """
+    from summary_tables import write_summary_sections
+    bundle.write(f'<section id="{analysis.symbol}">\n')
+    figures = [
+        ('volume_comparison', volume_comparison_figure, (analysis, render)),
+        ('dollar_volume_comparison', dollar_volume_comparison_figure, (analysis, render)),
+        ('monthly_dollar_volume', monthly_dollar_volume_figure, (analysis,)),
     ]
-    
-    # Create period summaries
-    period_summary = []
-    monthly_summary = []
-    
-    for period_name, start_date, end_date in periods:
-        period_data = df_with_dollar[(df_with_dollar.index >= start_date) & (df_with_dollar.index <= end_date)]
-        if not period_data.empty:
-            # Period summary
-            period_summary.append({
-                'Period': period_name,
-                'Date Range': f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
-                'Total Volume': period_data[('Volume', symbol)].sum(),
-                'Average Price': period_data[('Close', symbol)].mean(),
-                'Total Dollar Volume': period_data[('DollarVolume', symbol)].sum(),
-            })
-            
-            # Monthly data
-            monthly_data = period_data.groupby([period_data.index.year, period_data.index.month]).agg({
-                ('Volume', symbol): 'sum',
-                ('Close', symbol): 'mean',
-                ('DollarVolume', symbol): 'sum'
-            })
-            
-            for (year, month), data in monthly_data.iterrows():
-                monthly_summary.append({
-                    'Period': period_name,
-                    'Year': year,
-                    'Month': calendar.month_name[month],
-                    'Total Volume': data[('Volume', symbol)],
-                    'Average Price': data[('Close', symbol)],
-                    'Total Dollar Volume': data[('DollarVolume', symbol)],
-                })
-    
-    # Create HTML table
-    html_content = f"""
-    <html>
-    <head>
-        <style>
-            table {{ border-collapse: collapse; width: 100%; margin: 20px 0; }}
-            th, td {{ border: 1px solid #ddd; padding: 8px; text-align: right; }}
-            th {{ background-color: #40B4A6; color: white; }}
-            tr:nth-child(even) {{ background-color: #f9f9f9; }}
-            .summary-section {{ margin-bottom: 30px; }}
-            .section-title {{ color: #000000; margin: 20px 0; }}
-        </style>
-    </head>
-    <body>
-        <h1>{symbol} Trading Summary</h1>
-        
-        <div class="summary-section">
-            <h2 class="section-title">Period Summary</h2>
-            <table>
-                <tr>
-                    <th>Period</th>
-                    <th>Date Range</th>
-                    <th>Total Volume</th>
-                    <th>Average Price</th>
-                    <th>Total Dollar Volume</th>
-                </tr>
+    for name, build, args in figures:
+        with span(name):
+            fig = build(*args)
+            with span('write'):
+                bundle.add_figure(fig)
+    write_summary_sections(bundle, analysis)
+    bundle.write('</section>\n')
+
+@span('reports')
+def generate_reports(df, symbol, periods, sweep=None, render=DEFAULT_RENDER, output_dir='.', bundle=None, summary_formats=(), summary_only=False,
+                     aligned=False):
     """
-    
-    for summary in period_summary:
-        html_content += f"""
-            <tr>
-                <td>{summary['Period']}</td>
-                <td>{summary['Date Range']}</td>
-                <td>{summary['Total Volume']:,.0f}</td>
-                <td>${summary['Average Price']:.2f}</td>
-                <td>${summary['Total Dollar Volume']:,.2f}</td>
-            </tr>
-        """
-    
-    html_content += """
-            </table>
-        </div>
-        
-        <div class="summary-section">
-            <h2 class="section-title">Monthly Breakdown</h2>
-            <table>
-                <tr>
-                    <th>Period</th>
-                    <th>Year</th>
-                    <th>Month</th>
-                    <th>Total Volume</th>
-                    <th>Average Price</th>
-                    <th>Total Dollar Volume</th>
-                </tr>
+    Write all four reports for one symbol from a single shared analysis.
+
+    With bundle='symbol' they go into one {symbol}_report.html; an open ReportBundle
+    collects them into a batch report instead. Both load plotly.js from output_dir/assets.
+    summary_only writes just the trading summary, without importing plotly.
+    summary_formats adds the period and monthly summaries as CSV, Parquet or Arrow files,
+    and aligned the periods' dollar volume side by side by trading day.
+    Returns the paths of the files written.
     """
-    
-    for summary in monthly_summary:
-        html_content += f"""
-            <tr>
-                <td>{summary['Period']}</td>
-                <td>{summary['Year']}</td>
-                <td>{summary['Month']}</td>
-                <td>{summary['Total Volume']:,.0f}</td>
-                <td>${summary['Average Price']:.2f}</td>
-                <td>${summary['Total Dollar Volume']:,.2f}</td>
-            </tr>
-        """
-    
-    html_content += """
-            </table>
-        </div>
-    </body>
-    </html>
+    from analysis import PeriodAnalysis
+    with span('compute', rows=len(df)):
+        analysis = PeriodAnalysis(df, symbol, periods)
+    return write_reports(analysis, sweep, render, output_dir, bundle, summary_formats, summary_only, aligned)
+
+def write_reports(analysis, sweep=None, render=DEFAULT_RENDER, output_dir='.', bundle=None, summary_formats=(), summary_only=False, aligned=False):
+    """
+    Write the reports generate_reports describes from an existing analysis; returns the paths written
+    """
+    from summary_tables import SUMMARY_STYLE, write_summary_data
+    symbol = analysis.symbol
+    paths = []
+    if summary_only:
+        paths.append(generate_summary_table(analysis, output_dir))
+    elif bundle == 'symbol':
+        from report_bundle import ReportBundle
+        path = os.path.join(output_dir, f'{symbol}_report.html')
+        with ReportBundle(path, f'{symbol} Trading Report', style=SUMMARY_STYLE) as report:
+            add_symbol_report(report, analysis, render)
+        print(f"Report has been saved as {path}")
+        paths.append(path)
+    elif bundle is not None:
+        add_symbol_report(bundle, analysis, render)
+    else:
+        paths.append(create_volume_comparison(analysis, render, output_dir))
+        paths.append(create_dollar_volume_comparison(analysis, render, output_dir))
+        paths.append(create_monthly_dollar_volume_comparison(analysis, output_dir))
+        paths.append(generate_summary_table(analysis, output_dir))
+    if summary_formats:
+        with span('summary_data'):
+            data_paths = write_summary_data(analysis, output_dir, summary_formats)
+        print(f"Summary data has been saved as {', '.join(data_paths)}")
+        paths.extend(data_paths)
+    if aligned:
+        paths.append(write_aligned(analysis, output_dir))
+    if sweep:
+        start_date = min(period.start for period in analysis.periods)
+        end_date = max(period.end for period in analysis.periods)
+        paths.extend(write_window_sweep(analysis, start_date, end_date, sweep, output_dir))
+    return paths
+
+@span('screen')
+def run_screener(bars, periods, rank_by, top, min_dollar_volume, output):
+    """
+    Rank the fetched universe, held as compact bars, on one date x symbol panel and save the results
+    """
+    from screener import SymbolPanel, screen
+    with span('compute', rows=len(bars)):
+        panel = SymbolPanel.from_bars(bars)
+        results = screen(panel, periods, rank_by=rank_by, top=top, min_dollar_volume=min_dollar_volume)
+    with span('write'):
+        results.to_csv(output, float_format='%.4f')
+    compared = f", period {len(periods)} vs period 1" if RANK_COLUMNS[rank_by].endswith('Change %') else f" at the end of period {len(periods)}"
+    print(f"\nTop {len(results)} of {len(panel.symbols)} symbols by {RANK_COLUMNS[rank_by]}{compared}:")
+    print(results[[RANK_COLUMNS[rank_by]]].head(20).to_string(float_format=lambda v: f'{v:,.2f}'))
+    print(f"Screener results have been saved as {output}")
+
+def parse_period(text):
     """
+    Parse a START:END period argument (both YYYY-MM-DD, inclusive)
+    """
+    try:
+        start, end = (datetime.strptime(part, '%Y-%m-%d') for part in text.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid period '{text}', expected YYYY-MM-DD:YYYY-MM-DD")
+    if end < start:
+        raise argparse.ArgumentTypeError(f"period '{text}' ends before it starts")
+    return start, end
+
+def print_profile(profiler):
+    """
+    Print the span tree with calls, seconds, share of the run and rows
+    """
+    print(f"\n{'Stage':<44} {'Calls':>7} {'Seconds':>9} {'Share':>7} {'Rows':>12}")
+    for row in profiler.rows():
+        name = '  ' * row['Span'].count('/') + row['Span'].rsplit('/', 1)[-1]
+        rows = f"{row['Rows']:,}" if row['Rows'] is not None else ''
+        print(f"{name:<44} {row['Calls']:>7,} {row['Seconds']:>9.3f} {row['Share %']:>6.1f}% {rows:>12}")
+
+def print_pipeline(pipeline):
+    """
+    Print each pipeline stage's throughput, utilization, waits and queue depth, and the likely bottleneck
+    """
+    rows = pipeline.report()
+    print(f"\n{'Stage':<10} {'Workers':>7} {'Items':>7} {'Errors':>6} {'Busy s':>8} {'Util':>6} {'Starved s':>9} {'Blocked s':>9} {'Queue max':>9} {'Queue mean':>10} {'Items/s':>8}")
+    for row in rows:
+        print(f"{row['Stage']:<10} {row['Workers']:>7} {row['Items']:>7,} {row['Errors']:>6,} {row['Busy s']:>8.2f} {row['Utilization %']:>5.0f}% "
+              f"{row['Starved s']:>9.2f} {row['Blocked s']:>9.2f} {row['Max queue']:>9} {row['Mean queue']:>10.1f} {row['Items/s']:>8.1f}")
+    busiest = max(rows, key=lambda row: row['Utilization %'])
+    print(f"{pipeline.elapsed:.2f} s in total; busiest stage: {busiest['Stage']} ({busiest['Utilization %']:.0f}% utilized)")
+
+def run_pipeline(args, symbols, periods, fetch, accept, bundle, report_options, report_done, failed):
+    """
+    Fetch, analyze and render the symbols as overlapping stages joined by bounded queues.
+
+    Downloads for later symbols run while earlier ones are aggregated and rendered. When
+    rendering falls behind, the full queues hold the downloads back, so memory stays
+    bounded by the queue sizes rather than the number of symbols.
+    """
+    from analysis import PeriodAnalysis
+    from pipeline import Pipeline, Stage
+    from providers import period_range
+    start_date, end_date = period_range(periods)
+    
+    def analyze(symbol, df):
+        with span('compute', rows=len(df)):
+            return PeriodAnalysis(df, symbol, periods).precompute()
+    
+    def render(symbol, analysis):
+        with span('reports'):
+            return write_reports(analysis, bundle=bundle, **report_options)
+    
+    def stage_failed(stage, symbol, error):
+        print(f"{symbol}: error {'fetching data' if stage == 'fetch' else 'generating reports'}: {error}")
+        failed.append(symbol)
+    
+    stages = [
+        Stage('fetch', lambda symbol, _: fetch(symbol, start_date, end_date), workers=args.workers),
+        Stage('accept', accept, inline=True),
+    ]
+    if not args.screen:
+        # One renderer keeps a batch report's sections in order of arrival
+        stages += [Stage('compute', analyze), Stage('render', render)]
+    pipeline = Pipeline(stages, queue_size=args.queue_size, on_error=stage_failed,
+                        on_done=lambda symbol, paths: report_done(symbol, '', paths, None, None))
+    try:
+        pipeline.run((symbol, None) for symbol in symbols)
+    finally:
+        print_pipeline(pipeline)
+
+def run(args, symbols, periods, render, provider):
+    """
+    Fetch the bars and write the reports (or screen) for parsed command-line arguments
+    """
+    from bar_store import BarStore, default_store_path
+    from compact_bars import BarUniverse, CompactBars
+    from intraday import intraday_daily_bars
+    from manifest import Manifest, report_key
+    from providers import period_range
+    from report_pool import ReportPool
+    
+    # Fetch from the earliest start through the latest end, inclusive
+    start_date, end_date = period_range(periods)
+    last_date = max(end for _, end in periods)
+    
+    # Remote requests share one rate limiter and are retried with backoff
+    fetch = provider.fetch
+    intraday_fetch = provider.fetch_intraday
+    if provider.remote:
+        limiter = TokenBucket(args.rate)
+        fetch = rate_limited(fetch, limiter, retries=args.retries)
+        intraday_fetch = rate_limited(intraday_fetch, limiter, retries=args.retries)
+    
+    # Remote data goes through the local bar store, which downloads only the ranges it doesn't hold yet
+    store = None
+    if provider.remote and not args.no_cache:
+        store = BarStore(fetch, default_store_path(args.cache_dir))
+    
+    # Reports are rebuilt only when their bars or these parameters change
+    report_params = {
+        'periods': [(start.isoformat(), end.isoformat()) for start, end in periods],
+        'sweep': args.sweep,
+        'interval': args.interval,
+        'render': render._asdict(),
+        'summary_formats': sorted(args.summary_formats),
+        'summary_only': args.summary_only,
+        'aligned': args.aligned,
+    }
     
-    # Save to file
-    with open(f'{symbol}_trading_summary.html', 'w') as f:
-        f.write(html_content)
+    if len(symbols) == 1 and not args.screen and not args.save_universe:
+        symbol = symbols[0]
+        print(f"\nFetching data for {symbol} from {start_date.date()} to {last_date.date()}...")
+        df = timed('fetch', get_stock_data)(symbol, start_date, end_date, provider=provider, store=store,
+                            interval=args.interval, chunk_days=args.chunk_days, fetch=intraday_fetch)
+        
+        if df is not None and not df.empty:
+            print("Data retrieved successfully!")
+            print("\nData columns:", df.columns.tolist())
+            print("\nFirst few rows of data:")
+            print(df.head())
+            
+            bundle = 'symbol' if args.bundle else None
+            key = report_key(df, dict(report_params, symbol=symbol, bundle=bundle))
+            with Manifest(args.output_dir) as manifest:
+                if manifest.is_current(symbol, key) and not args.force:
+                    print(f"\n{symbol}: data and parameters unchanged since the last run, reports are up to date (--force rebuilds them)")
+                else:
+                    paths = generate_reports(df, symbol, periods, sweep=args.sweep, render=render, output_dir=args.output_dir,
+                                             bundle=bundle, summary_formats=args.summary_formats,
+                                             summary_only=args.summary_only, aligned=args.aligned)
+                    manifest.record(symbol, key, paths)
+        else:
+            print("No data available for the specified symbol and date range.")
+        return
+    
+    print(f"\nFetching data for {len(symbols)} symbols from {start_date.date()} to {last_date.date()} with {args.workers} workers...")
+    fetch_bars = store.get_bars if store is not None else fetch
+    if args.interval != '1d':
+        fetch_bars = functools.partial(intraday_daily_bars, provider, interval=args.interval, chunk_days=args.chunk_days, fetch=intraday_fetch)
+    failed = []
+    # Screening and --save-universe keep only each symbol's dates, Close and Volume
+    compact = {}
+    # One report for the whole batch, appended to as each symbol arrives
+    bundle = args.bundle
+    batch_report = None
+    if args.bundle == 'batch' and not args.screen:
+        from report_bundle import ReportBundle, ReportFragment
+        from summary_tables import SUMMARY_STYLE
+        batch_report = bundle = ReportBundle(os.path.join(args.output_dir, 'batch_report.html'), 'Trading Report', style=SUMMARY_STYLE)
+    report_options = dict(sweep=args.sweep, render=render, output_dir=args.output_dir, summary_formats=args.summary_formats,
+                          summary_only=args.summary_only, aligned=args.aligned)
+    
+    # A batch report is rebuilt as a whole; per-symbol outputs are tracked in the manifest
+    manifest = None
+    if not args.screen and args.bundle != 'batch':
+        manifest = Manifest(args.output_dir)
+    keys = {}
+    skipped = []
+    
+    def report_done(symbol, output, paths, fragment, error):
+        print(output, end='')
+        if error is not None:
+            print(f"{symbol}: error generating reports: {error}")
+            failed.append(symbol)
+        elif batch_report is not None:
+            # Pooled symbols come back as fragments; serial ones were written into the report directly
+            if fragment is not None:
+                batch_report.extend(fragment)
+        elif manifest is not None:
+            manifest.record(symbol, keys.pop(symbol), paths)
+    
+    def accept(symbol, df):
+        """
+        Keep what screening needs of a fetched symbol; returns its bars if reports are to be built for it
+        """
+        if df is None or df.empty:
+            print(f"{symbol}: no data available for the specified date range.")
+            failed.append(symbol)
+            return None
+        if args.screen or args.save_universe:
+            compact[symbol] = CompactBars.from_frame(df)
+        if args.screen:
+            return None
+        if manifest is not None:
+            keys[symbol] = report_key(df, dict(report_params, symbol=symbol, bundle=bundle))
+            if manifest.is_current(symbol, keys[symbol]) and not args.force:
+                del keys[symbol]
+                skipped.append(symbol)
+                return None
+        return df
     
-    print(f"Trading summary has been saved as {symbol}_trading_summary.html")
+    # Reports are built in worker processes as the downloads arrive
+    pool = None
+    if args.processes > 1 and not args.screen:
+        pool = ReportPool(generate_reports, args.processes, report_done)
+    try:
+        if args.pipeline:
+            run_pipeline(args, symbols, periods, timed('fetch', fetch_bars), accept, bundle, report_options, report_done, failed)
+        else:
+            for symbol, df, error in fetch_many(timed('fetch', fetch_bars), symbols, start_date, end_date, workers=args.workers):
+                if error is not None:
+                    print(f"{symbol}: error fetching data: {error}")
+                    failed.append(symbol)
+                    continue
+                df = accept(symbol, df)
+                if df is None:
+                    continue
+                if pool is not None:
+                    pool.submit(df, symbol, periods, bundle=ReportFragment() if batch_report is not None else bundle, **report_options)
+                else:
+                    try:
+                        paths = generate_reports(df, symbol, periods, bundle=bundle, **report_options)
+                    except Exception as e:
+                        report_done(symbol, '', None, None, e)
+                    else:
+                        report_done(symbol, '', paths, None, None)
+        if pool is not None:
+            pool.join()
+    except BaseException:
+        # Never leave a partial batch report behind
+        if batch_report is not None:
+            batch_report.discard()
+        raise
+    finally:
+        if pool is not None:
+            pool.close(cancel=True)
+        if manifest is not None:
+            manifest.compact()
+            manifest.close()
+    
+    if batch_report is not None:
+        analyzed = sorted(set(symbols) - set(failed))
+        batch_report.write('<nav><h2>Symbols</h2>\n' + ' '.join(f'<a href="#{s}">{s}</a>' for s in analyzed) + '\n</nav>\n')
+        batch_report.close()
+        print(f"\nBatch report has been saved as {batch_report.path}")
+    
+    if args.save_universe:
+        universe = BarUniverse.from_bars(compact)
+        universe.save(args.save_universe)
+        print(f"\nUniverse of {len(universe)} symbols ({universe.nbytes / 2 ** 20:,.1f} MiB) has been saved in {args.save_universe}")
+    
+    if args.screen:
+        run_screener(compact, periods, args.rank_by, args.top, args.min_dollar_volume, os.path.join(args.output_dir, args.screen_output))
+    
+    print(f"\nAnalyzed {len(symbols) - len(failed)} of {len(symbols)} symbols.")
+    if skipped:
+        print(f"{len(skipped)} unchanged since the last run were skipped (--force rebuilds them).")
+    if failed:
+        print("No reports for:", ', '.join(sorted(failed)))
 
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Analyze stock data')
-    parser.add_argument('symbol', help='Stock symbol (e.g., AAPL)')
+    parser.add_argument('symbols', nargs='*', metavar='symbol', help='Stock symbol(s) (e.g., AAPL)')
+    parser.add_argument('--symbols-file', type=str, help='File of symbols to analyze in one run, separated by newlines, commas or spaces')
     parser.add_argument('--first-period-start', type=str, help='Start date for first period (YYYY-MM-DD)')
     parser.add_argument('--first-period-end', type=str, help='End date for first period (YYYY-MM-DD)')
     parser.add_argument('--second-period-start', type=str, help='Start date for second period (YYYY-MM-DD)')
     parser.add_argument('--second-period-end', type=str, help='End date for second period (YYYY-MM-DD)')
+    parser.add_argument('--period', dest='extra_periods', action='append', type=parse_period, default=[], metavar='START:END',
+                        help='Additional period to compare (YYYY-MM-DD:YYYY-MM-DD); repeat for as many periods as needed')
+    parser.add_argument('--interval', choices=['1d'] + list(INTRADAY_INTERVALS), default='1d',
+                        help='Bar size to fetch (default: 1d); intraday bars are streamed in chunks and rolled up to daily totals')
+    parser.add_argument('--chunk-days', type=int, help="Days of intraday bars per request (default: the provider's limit)")
+    parser.add_argument('--aligned', action='store_true', help="Also write the periods' daily dollar volume side by side by trading day, with each period's difference from period 1")
+    parser.add_argument('--sweep', choices=['month', 'quarter', 'year'], help='Also write stats and pairwise dollar volume changes for every calendar window across the periods')
+    parser.add_argument('--screen', action='store_true', help='Rank all symbols by the change from the first period to the last instead of writing per-symbol reports')
+    parser.add_argument('--rank-by', choices=sorted(RANK_COLUMNS), default='dollar_volume', help='Screener ranking (default: dollar_volume)')
+    parser.add_argument('--top', type=int, default=100, help='Number of symbols the screener keeps (default: 100)')
+    parser.add_argument('--min-dollar-volume', type=float, default=0.0, help='Screener drops symbols with less dollar volume than this in the first period')
+    parser.add_argument('--save-universe', type=str, metavar='DIR', help="Also save every fetched symbol's Close and Volume as a compact memory-mappable universe, read back with --provider universe")
+    parser.add_argument('--screen-output', type=str, default='screener_results.csv', help='CSV file for the screener results (default: screener_results.csv)')
+    parser.add_argument('--webgl', action='store_true', help='Draw the daily line charts with WebGL (Scattergl), for long or intraday histories')
+    parser.add_argument('--max-points', type=int, help='Downsample each daily line to about this many points (default: keep every bar)')
+    parser.add_argument('--downsample', choices=DOWNSAMPLE_METHODS, default='lttb', help='Shape-preserving downsampling method for --max-points (default: lttb)')
+    parser.add_argument('--output-dir', type=str, default='.', help='Directory for reports and CSV outputs (default: current directory)')
+    parser.add_argument('--bundle', choices=['symbol', 'batch'], help="Write one HTML report per symbol, or one for the whole batch, sharing a single local plotly.js asset")
+    parser.add_argument('--summary-only', action='store_true', help='Write only the trading summary (plus any --summary-format files and --sweep), no charts; plotly is never imported')
+    parser.add_argument('--summary-format', dest='summary_formats', action='append', choices=sorted(SUMMARY_FORMATS), default=[],
+                        help='Also write the period and monthly summaries as csv, parquet or arrow (IPC) files; repeat for several')
+    parser.add_argument('--provider', choices=sorted(PROVIDER_NAMES), default=os.environ.get('DOLLARSTOCK_PROVIDER', 'yfinance'), help='Market data source (default: yfinance)')
+    parser.add_argument('--data-dir', type=str, default=os.environ.get('DOLLARSTOCK_DATA_DIR'), help="Directory of SYMBOL.csv / SYMBOL.parquet files for the 'files' provider, or of a saved universe for 'universe'")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the 'synthetic' provider")
+    parser.add_argument('--data-url', type=str, default=os.environ.get('DOLLARSTOCK_DATA_URL'), help="Data server URL for the 'http' provider (e.g. a running data_server.py)")
+    parser.add_argument('--cache-dir', type=str, help='Directory for the local bar store (default: $DOLLARSTOCK_CACHE_DIR or ~/.cache/dollarstock)')
+    parser.add_argument('--no-cache', action='store_true', help='Always download from the provider instead of using the local bar store')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent downloads in multi-symbol runs (default: 8)')
+    parser.add_argument('--force', action='store_true', help='Rebuild reports even when their data and parameters are unchanged since the last run')
+    parser.add_argument('--processes', type=int, default=1, help='Worker processes building reports in multi-symbol runs (default: 1, no pool)')
+    parser.add_argument('--pipeline', action='store_true', help='Run multi-symbol fetching, analysis and rendering as overlapping stages with bounded queues, and print per-stage metrics')
+    parser.add_argument('--queue-size', type=int, default=4, help='Items each --pipeline queue holds before the stage feeding it waits (default: 4)')
+    parser.add_argument('--rate', type=float, default=5.0, help='Maximum remote requests per second (default: 5)')
+    parser.add_argument('--retries', type=int, default=3, help='Retries with exponential backoff for failed remote requests (default: 3)')
+    parser.add_argument('--profile', type=str, metavar='PATH', help='Time each stage (fetch, compute, render, write) of every report and save the span tree as JSON')
+    parser.add_argument('--cprofile', type=str, metavar='PATH', help='Also run under cProfile and save the stats for pstats or snakeviz')
     
     args = parser.parse_args()
     
-    symbol = args.symbol
-    first_period_start = datetime.strptime(args.first_period_start, '%Y-%m-%d')
-    first_period_end = datetime.strptime(args.first_period_end, '%Y-%m-%d')
-    second_period_start = datetime.strptime(args.second_period_start, '%Y-%m-%d')
-    second_period_end = datetime.strptime(args.second_period_end, '%Y-%m-%d')
-    
-    # Get the earlier start date and later end date for data fetching
-    start_date = min(first_period_start, second_period_start)
-    end_date = max(first_period_end, second_period_end)
-    
-    print(f"\nFetching data for {symbol} from {start_date.date()} to {end_date.date()}...")
-    
-    # Download the data
-    df = yf.download(symbol, start=start_date, end=end_date, progress=False)
-    
-    if df is not None and not df.empty:
-        print("Data retrieved successfully!")
-        print("\nData columns:", df.columns.tolist())
-        print("\nFirst few rows of data:")
-        print(df.head())
-        
-        create_volume_comparison(df, symbol, first_period_start, first_period_end, second_period_start, second_period_end)
-        create_dollar_volume_comparison(df, symbol, first_period_start, first_period_end, second_period_start, second_period_end)
-        create_monthly_dollar_volume_comparison(df, symbol, first_period_start, first_period_end, second_period_start, second_period_end)
-        generate_summary_table(df, symbol, first_period_start, first_period_end, second_period_start, second_period_end)
-    else:
-        print("No data available for the specified symbol and date range.")
+    symbols = list(args.symbols)
+    if args.symbols_file:
+        symbols.extend(read_symbols_file(args.symbols_file))
+    symbols = list(dict.fromkeys(s.upper() for s in symbols))
+    if not symbols:
+        parser.error('give at least one symbol or --symbols-file')
+    
+    periods = []
+    for start_arg, end_arg in ((args.first_period_start, args.first_period_end), (args.second_period_start, args.second_period_end)):
+        if start_arg and end_arg:
+            periods.append((datetime.strptime(start_arg, '%Y-%m-%d'), datetime.strptime(end_arg, '%Y-%m-%d')))
+        elif start_arg or end_arg:
+            parser.error('each --*-period-start needs its matching --*-period-end')
+    periods.extend(args.extra_periods)
+    if not periods:
+        parser.error('give at least one period with --first-period-start/--first-period-end or --period')
+    if args.screen and len(periods) < 2:
+        parser.error('--screen needs at least two periods to compare')
+    
+    render = RenderOptions(webgl=args.webgl, max_points=args.max_points, method=args.downsample)
+    if args.summary_only and args.bundle:
+        parser.error('--summary-only writes no charts, so it cannot be combined with --bundle')
+    if args.pipeline and args.processes > 1:
+        parser.error('--pipeline renders in this process, so it cannot be combined with --processes')
+    if args.queue_size < 1:
+        parser.error('--queue-size must be at least 1')
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.rate <= 0:
+        parser.error('--rate must be positive')
+    if args.processes < 1:
+        parser.error('--processes must be at least 1')
+    if args.top < 1:
+        parser.error('--top must be at least 1')
+    if args.max_points is not None and args.max_points < 3:
+        parser.error('--max-points must be at least 3')
+    if args.chunk_days is not None and args.chunk_days < 1:
+        parser.error('--chunk-days must be at least 1')
+    if set(args.summary_formats) & {'parquet', 'arrow'} and importlib.util.find_spec('pyarrow') is None:
+        parser.error('--summary-format parquet/arrow needs pyarrow (pip install pyarrow)')
+    os.makedirs(args.output_dir, exist_ok=True)
+    
+    from providers import get_provider
+    try:
+        session = make_session(args.workers) if args.provider in ('yfinance', 'http') else None
+        provider = get_provider(args.provider, data_dir=args.data_dir, seed=args.seed, session=session, url=args.data_url)
+    except ValueError as e:
+        parser.error(str(e))
+    except OSError as e:
+        # A missing or unreadable --data-dir
+        parser.error(f"cannot read the '{args.provider}' data: {e}")
+    
+    profiler = Profiler() if args.profile else None
+    cprofile = None
+    if args.cprofile:
+        import cProfile
+        cprofile = cProfile.Profile()
+    try:
+        with profiling(profiler) if profiler else contextlib.nullcontext(), cprofile or contextlib.nullcontext():
+            run(args, symbols, periods, render, provider)
+    finally:
+        if profiler is not None:
+            profiler.write_json(args.profile)
+            print_profile(profiler)
+            print(f"Timings have been saved as {args.profile}")
+        if cprofile is not None:
+            cprofile.dump_stats(args.cprofile)
+            print(f"cProfile stats have been saved as {args.cprofile} (read with python -m pstats)")
 
 if __name__ == "__main__":
     main()
@@ -1,14 +1,28 @@
+import time
 import streamlit as st
-import yfinance as yf
-import plotly.graph_objects as go
 import pandas as pd
 from datetime import datetime
-import calendar
+from analysis import PERIOD_COLORS, PeriodAnalysis
+from providers import period_range, provider_from_env
+from range_cache import RangeCache
+from rendering import DOWNSAMPLE_METHODS, RenderOptions
+from liquidity import ADV_WINDOWS
+from summary_tables import format_count, format_dollars, format_optional, format_price, format_score
+from timing import Profiler, activate, span
+from stock_analyzer import (dollar_volume_comparison_figure, monthly_dollar_volume_figure, update_dollar_volume_figure,
+                            update_monthly_dollar_volume_figure, update_volume_figure, volume_comparison_figure)
 
 st.set_page_config(page_title="Stock Volume Analysis", layout="wide")
 
 st.title("Stock Volume Analysis")
 
+@st.cache_resource
+def get_bar_cache():
+    """
+    Bar cache shared by every session in this process, so concurrent users share downloads
+    """
+    return RangeCache(provider_from_env().fetch)
+
 # Sidebar inputs
 with st.sidebar:
     st.header("Input Parameters")
@@ -17,213 +31,187 @@ with st.sidebar:
     symbol = st.text_input("Stock Symbol", value="AAPL").upper()
     
     # Date range inputs
-    st.subheader("Period 1")
-    first_period_start = st.date_input("Start Date (Period 1)", value=datetime(2023, 1, 1).date())
-    first_period_end = st.date_input("End Date (Period 1)", value=datetime(2023, 12, 31).date())
-    
-    st.subheader("Period 2")
-    second_period_start = st.date_input("Start Date (Period 2)", value=datetime(2024, 1, 1).date())
-    second_period_end = st.date_input("End Date (Period 2)", value=datetime(2024, 12, 31).date())
+    period_count = st.number_input("Number of Periods", min_value=1, max_value=len(PERIOD_COLORS), value=2)
+    # Periods 1 and 2 default to 2023 and 2024; any further periods step back a year at a time
+    default_years = [2023, 2024] + [2022 - i for i in range(len(PERIOD_COLORS))]
+    periods = []
+    for number in range(1, period_count + 1):
+        year = default_years[number - 1]
+        st.subheader(f"Period {number}")
+        periods.append((
+            st.date_input(f"Start Date (Period {number})", value=datetime(year, 1, 1).date()),
+            st.date_input(f"End Date (Period {number})", value=datetime(year, 12, 31).date()),
+        ))
 
     analyze_button = st.button("Analyze Stock", type="primary")
+    
+    with st.expander("Rendering"):
+        webgl = st.checkbox("WebGL line charts", value=False, help="Faster drawing for long daily histories")
+        max_points = st.number_input("Max points per line (0 = all)", min_value=0, value=0, step=500)
+        downsample = st.selectbox("Downsampling", DOWNSAMPLE_METHODS)
+    render = RenderOptions(webgl=webgl, max_points=max_points or None, method=downsample)
+    
+    with st.expander("Live Refresh"):
+        live = st.toggle("Auto-refresh", value=False, help="Poll for new bars and update the results in place, for periods that run up to today")
+        refresh_seconds = st.number_input("Every (seconds)", min_value=5, value=60, step=5)
+    
+    with st.expander("Cache Statistics"):
+        cache_stats = get_bar_cache().stats()
+        st.caption(f"{cache_stats['entries']} symbols, {cache_stats['bytes'] / 2**20:,.1f} of {cache_stats['max_bytes'] / 2**20:,.0f} MiB")
+        st.caption(f"Hits {cache_stats['hits']:,} · misses {cache_stats['misses']:,} · "
+                   f"coalesced waits {cache_stats['coalesced']:,} · evictions {cache_stats['evictions']:,}")
+
+VIEWS = ["Volume Comparison", "Dollar Volume Comparison", "Monthly Dollar Volume", "Summary Statistics"]
+
+def build_summary_tables(analysis):
+    """
+    Display-formatted period summary and monthly breakdown tables
+    """
+    period_summary = analysis.period_summary()
+    monthly_summary = analysis.monthly_summary()
+    return (
+        pd.DataFrame({
+            'Period': period_summary['Period'],
+            'Total Volume': format_count(period_summary['Total Volume']),
+            'Average Price': format_price(period_summary['Average Price']),
+            'Total Dollar Volume': format_dollars(period_summary['Total Dollar Volume']),
+            'VWAP': format_optional(format_price, period_summary['VWAP']),
+            **{f'ADV {window}': format_optional(format_dollars, period_summary[f'ADV {window}']) for window in ADV_WINDOWS},
+            'Max Dollar Volume Z': format_optional(format_score, period_summary['Max Dollar Volume Z']),
+        }),
+        pd.DataFrame({
+            'Period': monthly_summary['Period'],
+            'Year': monthly_summary['Year'].astype(str),
+            'Month': monthly_summary['MonthName'],
+            'Total Volume': format_count(monthly_summary['Volume']),
+            'Average Price': format_price(monthly_summary['Close']),
+            'Total Dollar Volume': format_dollars(monthly_summary['DollarVolume']),
+        }),
+    )
+
+# Views that can take new bars in place; the rest are built again after a refresh
+VIEW_PATCHERS = {
+    "Volume Comparison": update_volume_figure,
+    "Dollar Volume Comparison": update_dollar_volume_figure,
+    "Monthly Dollar Volume": update_monthly_dollar_volume_figure,
+}
+
+VIEW_BUILDERS = {
+    "Volume Comparison": lambda analysis: volume_comparison_figure(analysis, render),
+    "Dollar Volume Comparison": lambda analysis: dollar_volume_comparison_figure(analysis, render),
+    "Monthly Dollar Volume": monthly_dollar_volume_figure,
+    "Summary Statistics": build_summary_tables,
+}
+
+def get_view(view):
+    """
+    Build a view for the current analysis and render options the first time it is shown, then reuse it
+    """
+    views = st.session_state.views
+    key = (view, render)
+    if key not in views:
+        with span('build'):
+            views[key] = VIEW_BUILDERS[view](st.session_state.analysis)
+    return views[key]
+
+def show_timings():
+    """
+    Debug panel with the timing spans of the current analysis: fetch, compute and each view built and displayed
+    """
+    with st.expander("Timings"):
+        timings = pd.DataFrame(st.session_state.profiler.rows())
+        if len(timings) > 1:
+            st.dataframe(timings, hide_index=True, column_config={
+                'Seconds': st.column_config.NumberColumn(format='%.4f'),
+                'Share %': st.column_config.NumberColumn(format='%.1f'),
+            })
+
+def refresh_analysis():
+    """
+    Fetch the bars since the last one shown, fold them into the analysis and patch the views already built
+    """
+    analysis = st.session_state.analysis
+    st.session_state.refreshed_at = time.time()
+    with span('poll') as record:
+        bars = get_bar_cache().poll(analysis.symbol, analysis.frame.index[-1], st.session_state.poll_end)
+        record.rows = 0 if bars is None else len(bars)
+    with span('update'):
+        changes = analysis.extend(bars)
+        views = st.session_state.views
+        for key in list(views):
+            patch = VIEW_PATCHERS.get(key[0])
+            if changes and (patch is None or not patch(views[key], analysis, changes)):
+                del views[key]
+    added = sum(added for _, added in changes.values())
+    st.session_state.refresh_note = f"Refreshed at {datetime.now():%H:%M:%S}: {added} new bar{'s' if added != 1 else ''}"
+
+@st.fragment(run_every=refresh_seconds if live else None)
+def show_results():
+    # Only the selected view is built, and switching views reruns just this fragment
+    activate(st.session_state.profiler)
+    if live and time.time() - st.session_state.refreshed_at >= refresh_seconds:
+        try:
+            refresh_analysis()
+        except Exception as e:
+            st.warning(f"Refresh failed: {str(e)}")
+    if live and 'refresh_note' in st.session_state:
+        st.caption(st.session_state.refresh_note)
+    view = st.segmented_control("View", VIEWS, default=VIEWS[0], key="view", label_visibility="collapsed") or VIEWS[0]
+    
+    with span(view):
+        if view == "Summary Statistics":
+            period_table, monthly_table = get_view(view)
+            with span('display'):
+                st.header("Period Summary")
+                if not period_table.empty:
+                    st.dataframe(period_table, hide_index=True)
+                
+                st.header("Monthly Breakdown")
+                if not monthly_table.empty:
+                    st.dataframe(monthly_table, hide_index=True)
+        else:
+            figure = get_view(view)
+            with span('display'):
+                st.plotly_chart(figure, use_container_width=True)
+    
+    show_timings()
 
 # Main content
 if analyze_button:
     # Show loading message
     with st.spinner(f'Fetching data for {symbol}...'):
         try:
-            # Get the earlier start date and later end date for data fetching
-            start_date = min(first_period_start, second_period_start)
-            end_date = max(first_period_end, second_period_end)
+            # Fetch from the earliest start through the latest end, inclusive
+            start_date, end_date = period_range(periods)
             
-            # Download the data
-            stock = yf.Ticker(symbol)
-            df = stock.history(start=start_date, end=end_date)
+            # Each analysis gets fresh timings; idle time between views isn't counted
+            st.session_state.profiler = Profiler('analysis', wall_clock=False)
+            activate(st.session_state.profiler)
+            
+            # Download the data (Yahoo Finance unless DOLLARSTOCK_PROVIDER says otherwise),
+            # fetching only the edges the shared cache doesn't hold yet
+            with span('fetch') as record:
+                df = get_bar_cache().get(symbol, start_date, end_date)
+                record.rows = 0 if df is None else len(df)
             
             if df is not None and not df.empty:
-                # Calculate Dollar Volume
-                df['DollarVolume'] = df['Close'] * df['Volume']
+                # Dollar volume, period slices and aggregates are computed once for every view
+                with span('compute', rows=len(df)):
+                    st.session_state.analysis = PeriodAnalysis(df, symbol, periods)
+                st.session_state.views = {}
+                # Live refreshes poll from the last bar through the latest period end
+                st.session_state.poll_end = end_date
+                st.session_state.refreshed_at = time.time()
+                st.session_state.pop('refresh_note', None)
                 
                 st.success("Data retrieved successfully!")
-                
-                # Create tabs for different visualizations
-                tab1, tab2, tab3, tab4 = st.tabs(["Volume Comparison", "Dollar Volume Comparison", 
-                                                "Monthly Dollar Volume", "Summary Statistics"])
-                
-                # Colors for the periods
-                colors = {
-                    f'Period 1 ({first_period_start} to {first_period_end})': '#000000',
-                    f'Period 2 ({second_period_start} to {second_period_end})': '#40B4A6'
-                }
-                
-                # Function to calculate days since period start
-                def days_since_start(date, start_date):
-                    return (date - start_date).days
-                
-                # Volume Comparison Tab
-                with tab1:
-                    fig = go.Figure()
-                    periods = [
-                        (f'Period 1 ({first_period_start} to {first_period_end})', first_period_start, first_period_end),
-                        (f'Period 2 ({second_period_start} to {second_period_end})', second_period_start, second_period_end)
-                    ]
-                    
-                    for period_name, start_date, end_date in periods:
-                        period_data = df[(df.index.date >= start_date) & (df.index.date <= end_date)]
-                        if not period_data.empty:
-                            x_values = [days_since_start(d.date(), start_date) for d in period_data.index]
-                            
-                            fig.add_trace(go.Scatter(
-                                x=x_values,
-                                y=period_data['Volume'],
-                                name=period_name,
-                                mode='lines',
-                                line=dict(color=colors[period_name]),
-                                hovertemplate='%{text}<br>Volume: %{y:,.0f}<extra></extra>',
-                                text=[d.strftime('%B %d, %Y') for d in period_data.index],
-                            ))
-                    
-                    fig.update_layout(
-                        title=f'{symbol} - Trading Volume Comparison',
-                        xaxis_title='Days Since Period Start',
-                        yaxis_title='Volume',
-                        hovermode='x unified',
-                        showlegend=True,
-                        plot_bgcolor='white',
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                # Dollar Volume Comparison Tab
-                with tab2:
-                    fig = go.Figure()
-                    
-                    for period_name, start_date, end_date in periods:
-                        period_data = df[(df.index.date >= start_date) & (df.index.date <= end_date)]
-                        if not period_data.empty:
-                            x_values = [days_since_start(d.date(), start_date) for d in period_data.index]
-                            
-                            fig.add_trace(go.Scatter(
-                                x=x_values,
-                                y=period_data['DollarVolume'],
-                                name=period_name,
-                                mode='lines',
-                                line=dict(color=colors[period_name]),
-                                hovertemplate='%{text}<br>Dollar Volume: $%{y:,.2f}<br>Price: $%{customdata[0]:.2f}<br>Volume: %{customdata[1]:,.0f}<extra></extra>',
-                                text=[d.strftime('%B %d, %Y') for d in period_data.index],
-                                customdata=list(zip(period_data['Close'], period_data['Volume']))
-                            ))
-                    
-                    fig.update_layout(
-                        title=f'{symbol} - Trading Dollar Volume Comparison',
-                        xaxis_title='Days Since Period Start',
-                        yaxis_title='Dollar Volume ($)',
-                        hovermode='x unified',
-                        showlegend=True,
-                        plot_bgcolor='white',
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                # Monthly Dollar Volume Tab
-                with tab3:
-                    monthly_data_all = []
-                    for period_name, start_date, end_date in periods:
-                        period_data = df[(df.index.date >= start_date) & (df.index.date <= end_date)]
-                        if not period_data.empty:
-                            # Calculate monthly aggregates
-                            period_data = period_data.reset_index()
-                            period_data['Year'] = period_data['Date'].dt.year
-                            period_data['Month'] = period_data['Date'].dt.month
-                            monthly_data = period_data.groupby(['Year', 'Month']).agg({
-                                'Volume': 'sum',
-                                'Close': 'mean',
-                                'DollarVolume': 'sum'
-                            }).reset_index()
-                            
-                            monthly_data['Period'] = period_name
-                            monthly_data['MonthLabel'] = monthly_data.apply(
-                                lambda x: f"{calendar.month_name[x['Month']]} {x['Year']}", axis=1)
-                            monthly_data_all.append(monthly_data)
-                    
-                    if monthly_data_all:
-                        monthly_df = pd.concat(monthly_data_all, ignore_index=True)
-                        fig = go.Figure()
-                        
-                        # Sort the data by Year, Month to ensure consistent ordering
-                        monthly_df = monthly_df.sort_values(['Year', 'Month'])
-                        
-                        # Create a common x-axis label for both periods
-                        unique_months = monthly_df.drop_duplicates(['Year', 'Month'])[['Year', 'Month']]
-                        unique_months = unique_months.sort_values(['Year', 'Month'])
-                        month_labels = [calendar.month_name[m] for _, m in zip(unique_months['Year'], unique_months['Month'])]
-                        
-                        # Plot bars for each period
-                        for period_name in colors:
-                            period_data = monthly_df[monthly_df['Period'] == period_name]
-                            if not period_data.empty:
-                                fig.add_trace(go.Bar(
-                                    x=month_labels,
-                                    y=period_data['DollarVolume'],
-                                    name=period_name,
-                                    marker_color=colors[period_name],
-                                    hovertemplate='%{text}<br>Dollar Volume: $%{y:,.2f}<extra></extra>',
-                                    text=period_data.apply(lambda x: f"{calendar.month_name[x['Month']]} {x['Year']}", axis=1)  # Keep full date in hover
-                                ))
-                        
-                        fig.update_layout(
-                            title=f'{symbol} - Monthly Trading Dollar Volume Comparison',
-                            xaxis_title='Month',
-                            yaxis_title='Dollar Volume ($)',
-                            xaxis=dict(
-                                tickangle=45,
-                                type='category'
-                            ),
-                            hovermode='x unified',
-                            barmode='group',
-                            bargap=0.15,
-                            bargroupgap=0.1,
-                            showlegend=True,
-                            plot_bgcolor='white',
-                        )
-                        st.plotly_chart(fig, use_container_width=True)
-                
-                # Summary Statistics Tab
-                with tab4:
-                    st.header("Period Summary")
-                    
-                    summary_data = []
-                    for period_name, start_date, end_date in periods:
-                        period_data = df[(df.index.date >= start_date) & (df.index.date <= end_date)]
-                        if not period_data.empty:
-                            total_volume = int(period_data['Volume'].sum())
-                            avg_price = float(period_data['Close'].mean())
-                            total_dollar_volume = float(period_data['DollarVolume'].sum())
-                            summary_data.append({
-                                'Period': period_name,
-                                'Total Volume': f"{total_volume:,}",
-                                'Average Price': f"${avg_price:.2f}",
-                                'Total Dollar Volume': f"${total_dollar_volume:,.2f}",
-                            })
-                    
-                    if summary_data:
-                        st.dataframe(pd.DataFrame(summary_data), hide_index=True)
-                    
-                    st.header("Monthly Breakdown")
-                    if monthly_data_all:
-                        monthly_breakdown = []
-                        for monthly_data in monthly_data_all:
-                            for _, row in monthly_data.iterrows():
-                                monthly_breakdown.append({
-                                    'Period': row['Period'],
-                                    'Year': str(int(row['Year'])),  # Convert to int and then string to remove comma
-                                    'Month': calendar.month_name[row['Month']],
-                                    'Total Volume': f"{int(row['Volume']):,}",
-                                    'Average Price': f"${float(row['Close']):.2f}",
-                                    'Total Dollar Volume': f"${float(row['DollarVolume']):,.2f}",
-                                })
-                        
-                        if monthly_breakdown:
-                            st.dataframe(pd.DataFrame(monthly_breakdown), hide_index=True)
             else:
+                st.session_state.pop('analysis', None)
                 st.error(f"No data available for {symbol} in the specified date range.")
         except Exception as e:
+            st.session_state.pop('analysis', None)
             st.error(f"Error fetching data for {symbol}: {str(e)}")
+
+# Results stay up across reruns until the next analysis
+if 'analysis' in st.session_state:
+    show_results()
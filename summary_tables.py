@@ -0,0 +1,154 @@
+import html
+import os
+
+import pandas as pd
+
+from liquidity import ADV_WINDOWS
+
+SUMMARY_STYLE = """
+            table { border-collapse: collapse; width: 100%; margin: 20px 0; }
+            th, td { border: 1px solid #ddd; padding: 8px; text-align: right; }
+            th { background-color: #40B4A6; color: white; }
+            tr:nth-child(even) { background-color: #f9f9f9; }
+            .summary-section { margin-bottom: 30px; }
+            .section-title { color: #000000; margin: 20px 0; }
+"""
+
+# Machine-readable summary outputs: format name -> (file extension, writer)
+DATA_FORMATS = {
+    'csv': ('.csv', lambda df, path: df.to_csv(path, index=False, date_format='%Y-%m-%d')),
+    'parquet': ('.parquet', lambda df, path: df.to_parquet(path, index=False)),
+    'arrow': ('.arrow', lambda df, path: df.to_feather(path)),
+}
+
+# Rows are joined and written this many at a time, so memory stays flat for any table size
+ROW_CHUNK = 10000
+
+
+def format_count(values):
+    return pd.Series(values).map('{:,.0f}'.format)
+
+
+def format_price(values):
+    return pd.Series(values).map('${:.2f}'.format)
+
+
+def format_dollars(values):
+    return pd.Series(values).map('${:,.2f}'.format)
+
+
+def format_score(values):
+    return pd.Series(values).map('{:+.2f}'.format)
+
+
+def format_optional(format, values):
+    """
+    format(values) with missing values left blank, for metrics whose window hasn't filled
+    """
+    values = pd.Series(values)
+    return format(values).where(values.notna(), '')
+
+
+def write_table(out, headers, columns):
+    """
+    Stream an HTML table to out, one chunk of rows at a time, from pre-formatted string columns
+    """
+    out.write('<table>\n<tr>' + ''.join(f'<th>{html.escape(h)}</th>' for h in headers) + '</tr>\n')
+    cells = [pd.Series(column, dtype=object).astype(str).map(html.escape).to_numpy(dtype=object) for column in columns]
+    rows = len(cells[0]) if cells else 0
+    for lo in range(0, rows, ROW_CHUNK):
+        chunk = '<tr><td>' + cells[0][lo:lo + ROW_CHUNK]
+        for column in cells[1:]:
+            chunk = chunk + '</td><td>' + column[lo:lo + ROW_CHUNK]
+        out.write('\n'.join(chunk + '</td></tr>'))
+        out.write('\n')
+    out.write('</table>\n')
+
+
+def write_summary_sections(out, analysis):
+    """
+    Stream the trading summary heading, period summary and monthly breakdown tables to out
+    """
+    period_summary = analysis.period_summary()
+    monthly_summary = analysis.monthly_summary()
+    out.write(f'<h1>{html.escape(analysis.symbol)} Trading Summary</h1>\n')
+
+    out.write('<div class="summary-section">\n<h2 class="section-title">Period Summary</h2>\n')
+    adv_columns = [f'ADV {window}' for window in ADV_WINDOWS]
+    write_table(out, ['Period', 'Date Range', 'Total Volume', 'Average Price', 'Total Dollar Volume', 'VWAP'] + adv_columns + ['Max Dollar Volume Z'], [
+        period_summary['Period'],
+        period_summary['Date Range'],
+        format_count(period_summary['Total Volume']),
+        format_price(period_summary['Average Price']),
+        format_dollars(period_summary['Total Dollar Volume']),
+        format_optional(format_price, period_summary['VWAP']),
+        *(format_optional(format_dollars, period_summary[name]) for name in adv_columns),
+        format_optional(format_score, period_summary['Max Dollar Volume Z']),
+    ])
+    out.write('</div>\n')
+
+    out.write('<div class="summary-section">\n<h2 class="section-title">Monthly Breakdown</h2>\n')
+    write_table(out, ['Period', 'Year', 'Month', 'Total Volume', 'Average Price', 'Total Dollar Volume'], [
+        monthly_summary['Period'],
+        monthly_summary['Year'],
+        monthly_summary['MonthName'],
+        format_count(monthly_summary['Volume']),
+        format_price(monthly_summary['Close']),
+        format_dollars(monthly_summary['DollarVolume']),
+    ])
+    out.write('</div>\n')
+
+
+def write_summary_page(path, analysis):
+    """
+    Write a standalone HTML page with the summary tables
+    """
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write(f'<html>\n<head>\n<meta charset="utf-8">\n<style>{SUMMARY_STYLE}</style>\n</head>\n<body>\n')
+        write_summary_sections(out, analysis)
+        out.write('</body>\n</html>\n')
+
+
+def summary_frames(analysis):
+    """
+    Unformatted period and monthly summaries with typed columns, for CSV, Parquet and Arrow outputs
+    """
+    rows = [i for i in range(len(analysis.periods)) if analysis.summary(i) is not None]
+    periods = pd.DataFrame({
+        'Symbol': analysis.symbol,
+        'Period': [analysis.periods[i].name for i in rows],
+        'Start': pd.DatetimeIndex([analysis.periods[i].start for i in rows]),
+        'End': pd.DatetimeIndex([analysis.periods[i].end for i in rows]),
+        'Volume': pd.Series([analysis.summary(i)['Total Volume'] for i in rows], dtype='float64'),
+        'AveragePrice': pd.Series([analysis.summary(i)['Average Price'] for i in rows], dtype='float64'),
+        'DollarVolume': pd.Series([analysis.summary(i)['Total Dollar Volume'] for i in rows], dtype='float64'),
+        'VWAP': pd.Series([analysis.summary(i)['VWAP'] for i in rows], dtype='float64'),
+        **{f'ADV{window}': pd.Series([analysis.summary(i)[f'ADV {window}'] for i in rows], dtype='float64') for window in ADV_WINDOWS},
+        'MaxDollarVolumeZ': pd.Series([analysis.summary(i)['Max Dollar Volume Z'] for i in rows], dtype='float64'),
+    })
+    monthly_summary = analysis.monthly_summary()
+    monthly = pd.DataFrame({
+        'Symbol': analysis.symbol,
+        'Period': monthly_summary['Period'].astype(str),
+        'Year': monthly_summary['Year'].astype('int64'),
+        'Month': monthly_summary['Month'].astype('int64'),
+        'Volume': monthly_summary['Volume'].astype('float64'),
+        'AveragePrice': monthly_summary['Close'].astype('float64'),
+        'DollarVolume': monthly_summary['DollarVolume'].astype('float64'),
+    })
+    return periods, monthly
+
+
+def write_summary_data(analysis, output_dir, formats):
+    """
+    Write {symbol}_period_summary and {symbol}_monthly_summary in each format; returns the paths
+    """
+    periods, monthly = summary_frames(analysis)
+    paths = []
+    for name in formats:
+        extension, write = DATA_FORMATS[name]
+        for table, df in (('period_summary', periods), ('monthly_summary', monthly)):
+            path = os.path.join(output_dir, f'{analysis.symbol}_{table}{extension}')
+            write(df, path)
+            paths.append(path)
+    return paths
@@ -0,0 +1,166 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from bar_store import BarStore, merge_ranges, missing_ranges
+from providers import SyntheticProvider
+
+
+def day(value):
+    return datetime.fromisoformat(value)
+
+
+class RecordingFetch:
+    """
+    Synthetic bars that remember every range asked for, optionally reporting actions on some dates
+    """
+
+    def __init__(self, actions=()):
+        self.provider = SyntheticProvider(seed=0)
+        self.actions = [pd.Timestamp(a) for a in actions]
+        self.calls = []
+
+    def __call__(self, symbol, start, end):
+        self.calls.append((pd.Timestamp(start), pd.Timestamp(end)))
+        df = self.provider.fetch(symbol, start, end)
+        df.attrs['actions'] = [a for a in self.actions if pd.Timestamp(start) <= a < pd.Timestamp(end)]
+        return df
+
+
+class Today:
+    """
+    A today() that tests can move forward
+    """
+
+    def __init__(self, day):
+        self.day = pd.Timestamp(day)
+
+    def __call__(self):
+        return self.day
+
+
+@pytest.fixture
+def fetch():
+    return RecordingFetch()
+
+
+@pytest.fixture
+def store(fetch):
+    store = BarStore(fetch, ':memory:', today=lambda: pd.Timestamp('2024-12-31'))
+    yield store
+    store.close()
+
+
+def test_merge_ranges_joins_overlapping_and_touching():
+    ranges = [(day('2024-03-01'), day('2024-04-01')), (day('2024-01-01'), day('2024-02-01')), (day('2024-01-15'), day('2024-02-10')),
+              (day('2024-02-10'), day('2024-02-20'))]
+    assert merge_ranges(ranges) == [(day('2024-01-01'), day('2024-02-20')), (day('2024-03-01'), day('2024-04-01'))]
+    assert merge_ranges([]) == []
+
+
+def test_missing_ranges():
+    covered = [(day('2024-01-01'), day('2024-02-01')), (day('2024-03-01'), day('2024-04-01'))]
+    assert missing_ranges(covered, day('2023-12-01'), day('2024-05-01')) == [
+        (day('2023-12-01'), day('2024-01-01')), (day('2024-02-01'), day('2024-03-01')), (day('2024-04-01'), day('2024-05-01'))
+    ]
+    assert missing_ranges(covered, day('2024-01-10'), day('2024-01-20')) == []
+    assert missing_ranges(covered, day('2024-01-10'), day('2024-03-10')) == [(day('2024-02-01'), day('2024-03-01'))]
+    assert missing_ranges([], day('2024-01-01'), day('2024-02-01')) == [(day('2024-01-01'), day('2024-02-01'))]
+
+
+def test_overlapping_request_fetches_only_the_gap(store, fetch):
+    store.get_bars('SYNTH', '2024-01-01', '2024-03-01')
+    bars = store.get_bars('SYNTH', '2024-02-01', '2024-04-01')
+    assert fetch.calls == [(pd.Timestamp('2024-01-01'), pd.Timestamp('2024-03-01')), (pd.Timestamp('2024-03-01'), pd.Timestamp('2024-04-01'))]
+    assert store.covered_ranges('SYNTH') == [(day('2024-01-01'), day('2024-04-01'))]
+    expected = fetch.provider.fetch('SYNTH', '2024-02-01', '2024-04-01')
+    pd.testing.assert_frame_equal(bars, expected, check_freq=False, check_dtype=False)
+
+
+def test_adjacent_ranges_merge_into_one(store, fetch):
+    store.get_bars('SYNTH', '2024-01-01', '2024-02-01')
+    store.get_bars('SYNTH', '2024-02-01', '2024-03-01')
+    assert store.covered_ranges('SYNTH') == [(day('2024-01-01'), day('2024-03-01'))]
+    store.get_bars('SYNTH', '2024-01-01', '2024-03-01')
+    assert len(fetch.calls) == 2
+
+
+def test_disjoint_request_fills_the_hole_between(store, fetch):
+    store.get_bars('SYNTH', '2024-01-01', '2024-02-01')
+    store.get_bars('SYNTH', '2024-03-01', '2024-04-01')
+    assert len(store.covered_ranges('SYNTH')) == 2
+    store.get_bars('SYNTH', '2024-01-01', '2024-04-01')
+    assert fetch.calls[-1] == (pd.Timestamp('2024-02-01'), pd.Timestamp('2024-03-01'))
+    assert store.covered_ranges('SYNTH') == [(day('2024-01-01'), day('2024-04-01'))]
+
+
+def test_partial_day_is_stored_but_not_covered(fetch):
+    store = BarStore(fetch, ':memory:', today=lambda: pd.Timestamp('2024-06-05'))
+    bars = store.get_bars('SYNTH', '2024-06-01', '2024-06-06')
+    # Today's bar is served, but coverage stops before it
+    assert bars.index[-1] == pd.Timestamp('2024-06-05')
+    assert store.covered_ranges('SYNTH') == [(day('2024-06-01'), day('2024-06-05'))]
+    store.get_bars('SYNTH', '2024-06-01', '2024-06-06')
+    assert fetch.calls[-1] == (pd.Timestamp('2024-06-05'), pd.Timestamp('2024-06-06'))
+    store.close()
+
+
+def test_future_range_is_never_covered(fetch):
+    store = BarStore(fetch, ':memory:', today=lambda: pd.Timestamp('2024-06-05'))
+    store.get_bars('SYNTH', '2024-06-10', '2024-06-20')
+    assert store.covered_ranges('SYNTH') == []
+    store.close()
+
+
+def test_action_after_held_bars_refetches_the_held_span():
+    fetch = RecordingFetch(actions=['2024-03-15'])
+    today = Today('2024-02-05')
+    store = BarStore(fetch, ':memory:', today=today)
+    store.get_bars('SYNTH', '2024-01-01', '2024-02-01')
+    today.day = pd.Timestamp('2024-04-05')
+    store.get_bars('SYNTH', '2024-03-01', '2024-04-01')
+    # The March download reports a dividend after January's bars were fetched, so they are refetched on the new basis
+    assert fetch.calls[-1] == (pd.Timestamp('2024-01-01'), pd.Timestamp('2024-04-01'))
+    assert store.covered_ranges('SYNTH') == [(day('2024-01-01'), day('2024-04-01'))]
+    store.close()
+
+
+def test_action_after_held_bars_found_when_filling_before_them():
+    fetch = RecordingFetch(actions=['2024-05-15'])
+    today = Today('2024-04-05')
+    store = BarStore(fetch, ':memory:', today=today)
+    store.get_bars('SYNTH', '2024-03-01', '2024-04-01')
+    today.day = pd.Timestamp('2024-06-28')
+    store.get_bars('SYNTH', '2024-01-01', '2024-02-01')
+    # January's download can't report May's split, so the days since March's bars were fetched are checked
+    assert fetch.calls[2] == (pd.Timestamp('2024-04-06'), pd.Timestamp('2024-06-29'))
+    assert fetch.calls[-1] == (pd.Timestamp('2024-01-01'), pd.Timestamp('2024-04-01'))
+    assert store.covered_ranges('SYNTH') == [(day('2024-01-01'), day('2024-04-01'))]
+    store.close()
+
+
+def test_checked_basis_is_not_checked_again():
+    fetch = RecordingFetch()
+    today = Today('2024-04-05')
+    store = BarStore(fetch, ':memory:', today=today)
+    store.get_bars('SYNTH', '2024-03-01', '2024-04-01')
+    today.day = pd.Timestamp('2024-06-28')
+    store.get_bars('SYNTH', '2024-01-01', '2024-02-01')
+    assert len(fetch.calls) == 3
+    assert len(store.covered_ranges('SYNTH')) == 2
+    # Nothing was reported, so the held bars are current as of today and the next gap needs no check
+    store.get_bars('SYNTH', '2023-11-01', '2023-12-01')
+    assert fetch.calls[-1] == (pd.Timestamp('2023-11-01'), pd.Timestamp('2023-12-01'))
+    assert len(fetch.calls) == 4
+    store.close()
+
+
+def test_action_before_basis_day_keeps_held_bars():
+    fetch = RecordingFetch(actions=['2023-11-15'])
+    store = BarStore(fetch, ':memory:', today=lambda: pd.Timestamp('2024-12-31'))
+    store.get_bars('SYNTH', '2024-01-01', '2024-02-01')
+    store.get_bars('SYNTH', '2023-11-01', '2023-12-01')
+    assert fetch.calls[-1] == (pd.Timestamp('2023-11-01'), pd.Timestamp('2023-12-01'))
+    assert len(store.covered_ranges('SYNTH')) == 2
+    store.close()
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import stock_analyzer
+from analysis import PeriodAnalysis
+from options import RenderOptions
+from providers import SyntheticProvider
+
+PERIODS = [(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-12-31')), (pd.Timestamp('2024-01-01'), pd.Timestamp('2024-12-31'))]
+
+
+@pytest.fixture(scope='module')
+def bars():
+    return SyntheticProvider(seed=0).fetch('SYNTH', '2022-06-01', '2025-01-01')
+
+
+def extended(bars, last_held, through, revise=None):
+    """
+    An analysis of the bars up to last_held with every aggregate computed, extended by the
+    bars from last_held through `through`, and the frame it should now match
+    """
+    head = bars[bars.index <= last_held]
+    analysis = PeriodAnalysis(head, 'SYNTH', PERIODS)
+    analysis.precompute()
+    analysis.liquidity()
+    analysis.aligned()
+    new = bars[(bars.index >= head.index[-1]) & (bars.index <= through)].copy()
+    if revise is not None:
+        new.iloc[0, new.columns.get_loc('Volume')] = revise
+    changes = analysis.extend(new)
+    return analysis, changes, pd.concat([head.iloc[:-1], new])
+
+
+def assert_matches(analysis, frame):
+    fresh = PeriodAnalysis(frame, 'SYNTH', PERIODS)
+    for i in range(len(PERIODS)):
+        pd.testing.assert_frame_equal(analysis.daily(i), fresh.daily(i))
+        np.testing.assert_array_equal(analysis.sessions(i), fresh.sessions(i))
+        pd.testing.assert_frame_equal(analysis.monthly(i), fresh.monthly(i), rtol=1e-12)
+        pd.testing.assert_frame_equal(analysis.liquidity_daily(i), fresh.liquidity_daily(i), rtol=1e-9)
+    pd.testing.assert_frame_equal(analysis.period_summary(), fresh.period_summary(), rtol=1e-12)
+    pd.testing.assert_frame_equal(analysis.monthly_summary(), fresh.monthly_summary(), rtol=1e-12)
+    pd.testing.assert_frame_equal(analysis.aligned(), fresh.aligned())
+
+
+def test_extend_across_period_boundary(bars):
+    analysis, changes, frame = extended(bars, '2023-12-27', '2024-01-12')
+    # The held last bar is sent again, so period 1 replaces it; period 2 gets its first bars
+    january = int(((frame.index >= '2024-01-01') & (frame.index <= '2024-01-12')).sum())
+    assert changes == {0: (1, 2), 1: (0, january)}
+    assert_matches(analysis, frame)
+
+
+def test_extend_across_month_boundary(bars):
+    analysis, changes, frame = extended(bars, '2024-05-29', '2024-06-07')
+    assert changes == {1: (1, 7)}
+    assert analysis.monthly(1)['Month'].tolist()[-2:] == [5, 6]
+    assert_matches(analysis, frame)
+
+
+def test_extend_replaces_revised_last_bar(bars):
+    analysis, changes, frame = extended(bars, '2024-03-15', '2024-03-15', revise=123456789.0)
+    assert changes == {1: (1, 0)}
+    assert analysis.frame['Volume'].iloc[-1] == 123456789.0
+    assert_matches(analysis, frame)
+
+
+def test_extend_ignores_older_bars(bars):
+    analysis = PeriodAnalysis(bars[bars.index <= '2024-03-15'], 'SYNTH', PERIODS)
+    assert analysis.extend(bars[bars.index < '2024-03-15']) == {}
+    assert analysis.extend(bars.iloc[:0]) == {}
+
+
+@pytest.mark.parametrize('render', [RenderOptions(False, None, 'lttb'), RenderOptions(True, 100, 'minmax')])
+def test_patched_figures_match_rebuilt(bars, render):
+    head = bars[bars.index <= '2024-05-29']
+    analysis = PeriodAnalysis(head, 'SYNTH', PERIODS)
+    figures = [
+        stock_analyzer.volume_comparison_figure(analysis, render),
+        stock_analyzer.dollar_volume_comparison_figure(analysis, render),
+        stock_analyzer.monthly_dollar_volume_figure(analysis),
+    ]
+    changes = analysis.extend(bars[(bars.index >= head.index[-1]) & (bars.index <= '2024-06-07')])
+    assert stock_analyzer.update_volume_figure(figures[0], analysis, changes)
+    assert stock_analyzer.update_dollar_volume_figure(figures[1], analysis, changes)
+    assert stock_analyzer.update_monthly_dollar_volume_figure(figures[2], analysis, changes)
+
+    rebuilt = [
+        stock_analyzer.volume_comparison_figure(analysis, render),
+        stock_analyzer.dollar_volume_comparison_figure(analysis, render),
+        stock_analyzer.monthly_dollar_volume_figure(analysis),
+    ]
+    for figure, fresh in zip(figures, rebuilt):
+        assert [trace.name for trace in figure.data] == [trace.name for trace in fresh.data]
+        for trace, fresh_trace in zip(figure.data, fresh.data):
+            if render.max_points is None:
+                np.testing.assert_array_equal(np.asarray(trace.x), np.asarray(fresh_trace.x))
+                np.testing.assert_allclose(np.asarray(trace.y, dtype='float64'), np.asarray(fresh_trace.y, dtype='float64'), rtol=1e-9)
+                if fresh_trace.customdata is not None:
+                    np.testing.assert_allclose(np.asarray(trace.customdata, dtype='float64'),
+                                               np.asarray(fresh_trace.customdata, dtype='float64'), rtol=1e-9)
+            else:
+                # Downsampled traces keep their last point, so new points continue from it
+                assert np.asarray(trace.x)[-1] == np.asarray(fresh_trace.x)[-1]
+                assert np.asarray(trace.y)[-1] == pytest.approx(np.asarray(fresh_trace.y)[-1])
+
+
+def test_patch_asks_for_rebuild_without_a_trace(bars):
+    head = bars[bars.index <= '2023-12-27']
+    analysis = PeriodAnalysis(head, 'SYNTH', PERIODS)
+    figure = stock_analyzer.volume_comparison_figure(analysis)
+    # Period 2 had no bars, so its trace doesn't exist yet
+    changes = analysis.extend(bars[(bars.index >= head.index[-1]) & (bars.index <= '2024-01-12')])
+    assert not stock_analyzer.update_volume_figure(figure, analysis, changes)
@@ -0,0 +1,205 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from providers import SyntheticProvider
+from range_cache import RangeCache
+
+
+class CountingFetch:
+    """
+    Synthetic bars that count the ranges asked for; `gate`, when set, holds every fetch until it is opened
+    """
+
+    def __init__(self, gate=None):
+        self.provider = SyntheticProvider(seed=0)
+        self.gate = gate
+        self.started = threading.Event()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol, start, end):
+        gate = self.gate
+        with self._lock:
+            self.calls.append((symbol, pd.Timestamp(start), pd.Timestamp(end)))
+        self.started.set()
+        if gate is not None:
+            assert gate.wait(10)
+        return self.provider.fetch(symbol, start, end)
+
+
+class Clock:
+    """
+    A time.time() that tests move by hand
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def cache_for(fetch, **kwargs):
+    kwargs.setdefault('today', lambda: pd.Timestamp('2024-12-31'))
+    return RangeCache(fetch, **kwargs)
+
+
+def test_sub_range_is_served_from_memory():
+    fetch = CountingFetch()
+    cache = cache_for(fetch)
+    cache.get('SYNTH', '2024-01-01', '2024-04-01')
+    bars = cache.get('synth', '2024-02-01', '2024-03-01')
+    assert len(fetch.calls) == 1
+    pd.testing.assert_frame_equal(bars, fetch.provider.fetch('SYNTH', '2024-02-01', '2024-03-01'), check_freq=False)
+    assert cache.stats()['hits'] == 1
+
+
+def test_wider_request_fetches_only_the_edges():
+    fetch = CountingFetch()
+    cache = cache_for(fetch)
+    cache.get('SYNTH', '2024-03-01', '2024-04-01')
+    bars = cache.get('SYNTH', '2024-02-01', '2024-05-01')
+    assert fetch.calls[1:] == [
+        ('SYNTH', pd.Timestamp('2024-02-01'), pd.Timestamp('2024-03-01')),
+        ('SYNTH', pd.Timestamp('2024-04-01'), pd.Timestamp('2024-05-01')),
+    ]
+    assert bars.index.is_monotonic_increasing and bars.index.is_unique
+    pd.testing.assert_frame_equal(bars, fetch.provider.fetch('SYNTH', '2024-02-01', '2024-05-01'), check_freq=False)
+    cache.get('SYNTH', '2024-02-01', '2024-05-01')
+    assert len(fetch.calls) == 3
+
+
+def test_concurrent_gets_share_one_download():
+    gate = threading.Event()
+    fetch = CountingFetch(gate)
+    cache = cache_for(fetch)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('SYNTH', '2024-01-01', '2024-04-01'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    assert fetch.started.wait(10)
+    gate.set()
+    for thread in threads:
+        thread.join(10)
+    assert len(fetch.calls) == 1
+    assert len(results) == 8
+    for bars in results[1:]:
+        pd.testing.assert_frame_equal(bars, results[0])
+    stats = cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] + stats['coalesced'] == 7
+
+
+def test_other_symbols_do_not_wait_on_a_download():
+    gate = threading.Event()
+    fetch = CountingFetch(gate)
+    cache = cache_for(fetch)
+    slow = threading.Thread(target=cache.get, args=('SLOW', '2024-01-01', '2024-04-01'))
+    slow.start()
+    assert fetch.started.wait(10)
+    fetch.gate = None
+    assert len(cache.get('FAST', '2024-01-01', '2024-04-01'))
+    assert 'FAST' in cache and 'SLOW' not in cache
+    gate.set()
+    slow.join(10)
+    assert 'SLOW' in cache
+
+
+def test_failed_download_is_retried_by_the_next_get():
+    fetch = CountingFetch()
+    failures = [ConnectionError('down')]
+
+    def flaky(symbol, start, end):
+        if failures:
+            raise failures.pop()
+        return fetch(symbol, start, end)
+
+    cache = cache_for(flaky)
+    with pytest.raises(ConnectionError):
+        cache.get('SYNTH', '2024-01-01', '2024-04-01')
+    assert 'SYNTH' not in cache
+    assert len(cache.get('SYNTH', '2024-01-01', '2024-04-01'))
+
+
+def test_least_recently_used_symbol_is_evicted():
+    fetch = CountingFetch()
+    probe = cache_for(fetch)
+    probe.get('A', '2024-01-01', '2024-04-01')
+    entry_bytes = probe.stats()['bytes']
+
+    cache = cache_for(fetch, max_bytes=int(entry_bytes * 2.5))
+    cache.get('A', '2024-01-01', '2024-04-01')
+    cache.get('B', '2024-01-01', '2024-04-01')
+    # A is used again, so B is now the least recently used
+    cache.get('A', '2024-02-01', '2024-03-01')
+    cache.get('C', '2024-01-01', '2024-04-01')
+    assert 'A' in cache and 'C' in cache and 'B' not in cache
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 2 and stats['bytes'] <= stats['max_bytes']
+
+
+def test_entry_larger_than_the_budget_is_kept_alone():
+    fetch = CountingFetch()
+    cache = cache_for(fetch, max_bytes=1)
+    cache.get('A', '2024-01-01', '2024-04-01')
+    cache.get('B', '2024-01-01', '2024-04-01')
+    assert 'B' in cache and 'A' not in cache
+    assert cache.stats()['entries'] == 1
+
+
+def test_todays_bar_is_refetched_after_the_ttl():
+    fetch = CountingFetch()
+    clock = Clock()
+    cache = cache_for(fetch, today_ttl=300, clock=clock, today=lambda: pd.Timestamp('2024-06-05'))
+    cache.get('SYNTH', '2024-06-01', '2024-06-06')
+    clock.now += 299
+    cache.get('SYNTH', '2024-06-01', '2024-06-06')
+    assert len(fetch.calls) == 1
+    clock.now += 2
+    cache.get('SYNTH', '2024-06-01', '2024-06-06')
+    # Only from the last held bar, today's partial one
+    assert fetch.calls[-1] == ('SYNTH', pd.Timestamp('2024-06-05'), pd.Timestamp('2024-06-06'))
+    # The refresh restarts the TTL
+    clock.now += 100
+    cache.get('SYNTH', '2024-06-01', '2024-06-06')
+    assert len(fetch.calls) == 2
+
+
+def test_past_ranges_never_go_stale():
+    fetch = CountingFetch()
+    clock = Clock()
+    cache = cache_for(fetch, today_ttl=300, clock=clock, today=lambda: pd.Timestamp('2024-06-05'))
+    cache.get('SYNTH', '2024-05-01', '2024-06-06')
+    clock.now += 3600
+    cache.get('SYNTH', '2024-05-01', '2024-05-20')
+    assert len(fetch.calls) == 1
+
+
+def test_left_edge_fetch_keeps_todays_refresh_time():
+    fetch = CountingFetch()
+    clock = Clock()
+    cache = cache_for(fetch, today_ttl=300, clock=clock, today=lambda: pd.Timestamp('2024-06-05'))
+    cache.get('SYNTH', '2024-06-01', '2024-06-06')
+    clock.now += 200
+    cache.get('SYNTH', '2024-05-01', '2024-06-06')
+    assert fetch.calls[-1] == ('SYNTH', pd.Timestamp('2024-05-01'), pd.Timestamp('2024-06-01'))
+    # Still 300 seconds from the first download, not the left edge
+    clock.now += 150
+    cache.get('SYNTH', '2024-05-01', '2024-06-06')
+    assert fetch.calls[-1] == ('SYNTH', pd.Timestamp('2024-06-05'), pd.Timestamp('2024-06-06'))
+
+
+def test_poll_merges_only_contiguous_bars():
+    fetch = CountingFetch()
+    cache = cache_for(fetch)
+    cache.get('SYNTH', '2024-01-01', '2024-02-01')
+    cache.poll('SYNTH', '2024-01-31', '2024-02-10')
+    cache.get('SYNTH', '2024-01-01', '2024-02-10')
+    assert len(fetch.calls) == 2
+    # A gap would leave the entry claiming days it never fetched
+    cache.poll('SYNTH', '2024-03-01', '2024-03-10')
+    cache.get('SYNTH', '2024-02-15', '2024-03-10')
+    assert fetch.calls[-1] == ('SYNTH', pd.Timestamp('2024-02-10'), pd.Timestamp('2024-03-10'))
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sessions import day_numbers, exchange_calendar, session_calendar
+
+
+@pytest.fixture(scope='module')
+def sessions():
+    return exchange_calendar(2000, 2049)
+
+
+def is_session(sessions, date):
+    return sessions.covers(day_numbers(date))
+
+
+@pytest.mark.parametrize('year, count', [(2001, 248), (2012, 250), (2024, 252), (2025, 250)])
+def test_sessions_per_year(sessions, year, count):
+    assert sessions.offsets(pd.Timestamp(year + 1, 1, 1), pd.Timestamp(year, 1, 1))[0] == count
+
+
+@pytest.mark.parametrize('date', ['2024-01-01', '2024-01-15', '2024-03-29', '2024-06-19', '2024-07-04', '2024-11-28', '2024-12-25',
+                                  '2022-12-26', '2021-07-05'])
+def test_holidays_are_closed(sessions, date):
+    assert not is_session(sessions, date)
+
+
+@pytest.mark.parametrize('date', ['2021-06-18', '2021-12-31', '2024-07-03', '2024-11-29', '2024-12-24'])
+def test_days_that_only_look_like_holidays_are_sessions(sessions, date):
+    # No Juneteenth before 2022, no Friday make-up for a Saturday New Year, and half days still trade
+    assert is_session(sessions, date)
+
+
+def test_september_2001_closure(sessions):
+    dates = pd.date_range('2001-09-10', '2001-09-17')
+    assert [is_session(sessions, date) for date in dates] == [True, False, False, False, False, False, False, True]
+    # Every closed day maps to the session that follows, so the reopening is one trading day on
+    np.testing.assert_array_equal(sessions.offsets(dates, '2001-09-10'), [0, 1, 1, 1, 1, 1, 1, 1])
+
+
+@pytest.mark.parametrize('date', ['2004-06-11', '2007-01-02', '2012-10-29', '2012-10-30', '2018-12-05', '2025-01-09'])
+def test_one_off_closures(sessions, date):
+    assert not is_session(sessions, date)
+    # A closed day takes the ordinal of the session after it
+    assert sessions.ordinals(date)[0] == sessions.ordinals(pd.Timestamp(date) + pd.Timedelta(days=1))[0]
+
+
+def test_carter_day_of_mourning(sessions):
+    np.testing.assert_array_equal(sessions.offsets(pd.DatetimeIndex(['2025-01-08', '2025-01-09', '2025-01-10']), '2025-01-08'), [0, 1, 1])
+
+
+def test_ordinals_across_a_weekend(sessions):
+    dates = pd.date_range('2024-06-07', '2024-06-10')
+    # Friday, Saturday, Sunday, Monday: the weekend takes Monday's ordinal
+    ordinals = sessions.ordinals(dates)
+    assert ordinals[1] == ordinals[2] == ordinals[3] == ordinals[0] + 1
+    # Counting from a Saturday starts at the next session
+    assert sessions.offsets('2024-06-10', '2024-06-08')[0] == 0
+    assert sessions.offsets('2024-06-14', '2024-06-08')[0] == 4
+
+
+def test_ordinals_across_a_long_weekend(sessions):
+    # Good Friday 2024, then Easter weekend
+    assert sessions.offsets('2024-04-01', '2024-03-28')[0] == 1
+
+
+def test_bars_on_closed_days_count_as_sessions(sessions):
+    index = pd.DatetimeIndex(['2025-01-08', '2025-01-09', '2025-01-10'])
+    calendar = session_calendar(index, '2025-01-01', '2025-12-31')
+    assert calendar is not exchange_calendar(2025, 2049)
+    np.testing.assert_array_equal(calendar.offsets(index, '2025-01-08'), [0, 1, 2])
+    # The shared calendar is left as it was
+    np.testing.assert_array_equal(exchange_calendar(2025, 2049).offsets(index, '2025-01-08'), [0, 1, 1])
+    assert calendar.offsets(pd.Timestamp(2026, 1, 1), pd.Timestamp(2025, 1, 1))[0] == 251
+
+
+def test_bars_on_sessions_share_the_cached_calendar():
+    index = pd.bdate_range('2024-06-03', '2024-06-14')
+    assert session_calendar(index, '2024-01-01', '2024-12-31') is exchange_calendar(2000, 2024)
+    # A history crossing a block boundary gets a calendar covering both blocks
+    calendar = session_calendar(pd.DatetimeIndex(['2024-12-31', '2025-01-02']), '2024-12-01', '2025-01-31')
+    assert calendar.offsets('2025-01-02', '2024-12-31')[0] == 1
+
+
+def test_month_ticks(sessions):
+    ticks, names = sessions.month_ticks('2024-06-03', '2024-08-15')
+    # June 2024 has 19 sessions (Juneteenth) and July 22 (Independence Day)
+    np.testing.assert_array_equal(ticks, [0, 19, 41])
+    assert names.tolist() == ['June', 'July', 'August']
+
+
+def test_month_tick_colliding_with_the_start_keeps_the_later_month(sessions):
+    # A Saturday start and July 1 both land on Monday July 1's session
+    ticks, names = sessions.month_ticks('2024-06-29', '2024-09-30')
+    np.testing.assert_array_equal(ticks, [0, 22, 44])
+    assert names.tolist() == ['July', 'August', 'September']
+    # New Year's Day closed: the start and January both map to January 2
+    ticks, names = sessions.month_ticks('2023-12-30', '2024-02-15')
+    np.testing.assert_array_equal(ticks, [0, 21])
+    assert names.tolist() == ['January', 'February']
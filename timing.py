@@ -0,0 +1,169 @@
+import contextlib
+import contextvars
+import functools
+import json
+import threading
+import time
+
+# Standard library only: stock_analyzer imports this at startup
+
+# The profiler collecting spans in this context, and the span new ones nest under.
+# Threads started with a copy of the caller's context (see batch.fetch_many) keep both.
+_active = contextvars.ContextVar('dollarstock_profiler', default=None)
+_current = contextvars.ContextVar('dollarstock_span', default=None)
+
+
+class SpanNode:
+    """
+    Accumulated time, call count and row count of every span with the same name under the same parent
+    """
+
+    __slots__ = ('name', 'seconds', 'calls', 'rows', 'children')
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.calls = 0
+        self.rows = None
+        self.children = {}
+
+    def to_dict(self):
+        node = {'name': self.name, 'seconds': round(self.seconds, 6), 'calls': self.calls}
+        if self.rows is not None:
+            node['rows'] = self.rows
+        if self.children:
+            node['children'] = [child.to_dict() for child in self.children.values()]
+        return node
+
+
+class SpanRecord:
+    """
+    Handle yielded by span(); set `rows` once the row count is known
+    """
+
+    __slots__ = ('rows',)
+
+    def __init__(self, rows=None):
+        self.rows = rows
+
+
+class Profiler:
+    """
+    Tree of hierarchical timing spans for one run.
+
+    Spans with the same name under the same parent are merged, so a batch of thousands
+    of symbols still yields one 'fetch' node with its total time, call count and rows.
+    Safe to use from several threads. The root's time is the wall time since the profiler
+    was created, or with wall_clock=False (for interactive sessions with idle time between
+    spans) the sum of its children.
+    """
+
+    def __init__(self, name='run', wall_clock=True):
+        self.root = SpanNode(name)
+        self.wall_clock = wall_clock
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _record(self, node, seconds, rows):
+        with self._lock:
+            node.seconds += seconds
+            node.calls += 1
+            if rows is not None:
+                node.rows = (node.rows or 0) + int(rows)
+
+    def _child(self, parent, name):
+        with self._lock:
+            node = parent.children.get(name)
+            if node is None:
+                node = parent.children[name] = SpanNode(name)
+            return node
+
+    def report(self):
+        """
+        The span tree as nested dicts
+        """
+        with self._lock:
+            if self.wall_clock:
+                self.root.seconds = time.perf_counter() - self.started
+            else:
+                self.root.seconds = sum(child.seconds for child in self.root.children.values())
+            self.root.calls = 1
+            return self.root.to_dict()
+
+    def rows(self):
+        """
+        One row per span: slash-separated path, calls, seconds, rows and share of the root's time
+        """
+        report = self.report()
+        total = report['seconds'] or 1.0
+        flat = []
+
+        def walk(node, prefix):
+            path = f"{prefix}/{node['name']}" if prefix else node['name']
+            flat.append({'Span': path, 'Calls': node['calls'], 'Seconds': node['seconds'],
+                         'Rows': node.get('rows'), 'Share %': node['seconds'] / total * 100.0})
+            for child in node.get('children', []):
+                walk(child, path)
+
+        walk(report, '')
+        return flat
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+
+
+@contextlib.contextmanager
+def profiling(profiler):
+    """
+    Collect the spans opened inside the block (and in threads started from it) into profiler
+    """
+    active, current = _active.set(profiler), _current.set(profiler.root)
+    try:
+        yield profiler
+    finally:
+        _current.reset(current)
+        _active.reset(active)
+
+
+def activate(profiler):
+    """
+    Collect every later span in this context into profiler, for code that can't wrap itself in profiling()
+    """
+    _active.set(profiler)
+    _current.set(profiler.root if profiler is not None else None)
+
+
+@contextlib.contextmanager
+def span(name, rows=None):
+    """
+    Time the block as a child of the current span; a no-op unless a profiler is active
+    """
+    profiler = _active.get()
+    record = SpanRecord(rows)
+    if profiler is None:
+        yield record
+        return
+    parent = _current.get() or profiler.root
+    node = profiler._child(parent, name)
+    token = _current.set(node)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        _current.reset(token)
+        profiler._record(node, time.perf_counter() - start, record.rows)
+
+
+def timed(name, function):
+    """
+    Wrap function so every call is a span, with the length of its result as the row count
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with span(name) as record:
+            result = function(*args, **kwargs)
+            if hasattr(result, '__len__'):
+                record.rows = len(result)
+            return result
+    return wrapper